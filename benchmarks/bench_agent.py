@@ -0,0 +1,483 @@
+# benchmarks/bench_agent.py
+# OpenAI/Ollama/Tavily 없이 legal_rag_agent 전체 그래프(model/graph/langgraph.py)를 동시성별로 실행해
+# 질문당 지연(p50/p95), 처리량, 질문당 LLM 호출 수, 노드별 소요 시간을 측정합니다.
+# LLM은 지연 시간을 설정할 수 있는 결정적 가짜 채팅 모델, 법률 검색은 data/의 PDF에 대한 BM25 검색,
+# 웹 검색은 로컬 가짜 Retriever로 대체합니다. (registry.override로 주입하므로 그래프 코드는 그대로 실행)
+#
+# 실행: python -m benchmarks.bench_agent [--concurrency 1 4 16] [--questions 32] [--llm-ms 300] [--llm-cache]
+#       [--fail-p95-ms 5000] [--fail-llm-calls 20] [--json result.json]
+# --fail-* 기준을 넘으면 종료 코드 1을 반환하므로 CI에서 성능 회귀 검사로 사용할 수 있습니다.
+# 낮은 동시성으로 같은 기준을 확인하는 pytest 래퍼는 tests/test_bench_agent.py 입니다.
+# 추측 검색 효과는 SPECULATIVE_RETRIEVAL=1 python -m benchmarks.bench_agent 로 비교합니다.
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from glob import glob
+from typing import Any, Dict, List, Optional
+
+# 그래프 모듈을 import하기 전에 설정합니다. (체크포인트는 메모리에, 평가 에이전트는 추가 검색 없이)
+# 가짜 임베딩으로는 법률 대표 벡터가 의미가 없으므로 라우팅은 가짜 LLM 라우터로 합니다.
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("EVALUATION_MAX_TOOL_CALLS", "0")
+os.environ.setdefault("LOCAL_ROUTER_ENABLED", "0")
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, BaseCallbackHandler, \
+    CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import RunnableLambda
+
+from model.cache.llm_cache import LLMCallCache
+from model.cache.semantic_cache import SemanticCache
+from model.graph.evaluation import get_evaluation_jobs
+from model.graph.langgraph import get_legal_rag_agent
+from schemas.schema import ExtractedInformation, InformationStrip, RefinedQuestion, RouteSelection
+from util.budget import QueryBudget
+from util.registry import registry
+from vectorDB.article_store import ArticleStore
+from vectorDB.law_loader import build_law_documents
+from vectorDB.retrieval import law_filter
+from vectorDB.sparse_index import SparseIndex
+
+# 가짜 라우터가 질문의 키워드로 법률을 고를 때 사용하는 표 (수집된 법률 이름과 공백 없이 비교)
+LAW_KEYWORDS = {
+    "개인정보보호법": ["개인정보", "CCTV", "영상정보", "유출"],
+    "근로기준법": ["근로", "임금", "해고", "사업장", "퇴직", "연차"],
+    "주택임대차보호법": ["임대차", "전월세", "전세", "월세", "보증금", "갱신"],
+}
+
+BASE_QUESTIONS = [
+    "사업장에서 CCTV를 설치할 때 주의해야 할 법적 사항은 무엇인가요?",
+    "전월세 계약 갱신 요구권의 행사 기간과 조건은 어떻게 되나요?",
+    "개인정보 유출 시 기업이 취해야 할 법적 조치는 무엇인가요?",
+    "근로기준법 제60조 내용을 알려주세요",
+    "최근 전세 사기 피해 사례와 대응 방법은 무엇인가요?",
+    "요즘 많이 쓰는 노트북 추천해 주세요",
+]
+
+
+def _ratio_hit(text: str, ratio: float) -> bool:
+    """text의 해시로 ratio 비율만큼 참을 반환합니다. (실행마다 같은 결과)"""
+    return zlib.crc32(text.encode("utf-8")) % 1000 < ratio * 1000
+
+
+def _human_text(messages: List[BaseMessage]) -> str:
+    humans = [m.content for m in messages if isinstance(m, HumanMessage)]
+    return str(humans[-1]) if humans else ""
+
+
+# --- 가짜 LLM ---
+class FakeChatModel(BaseChatModel):
+    """
+    호출당 고정 지연 + 출력 토큰당 지연을 흉내 내는 결정적 채팅 모델입니다.
+    같은 입력에는 항상 같은 응답을 돌려주고, 구조화 출력(라우팅/문서 평가/질문 재작성)은 입력에서 규칙으로 만듭니다.
+    """
+    call_ms: float = 300.0
+    token_ms: float = 2.0
+    answer_tokens: int = 120
+    # 문서 평가에서 통과시키는 문서 비율, 라우팅에서 웹 검색을 함께 고르는 질문 비율
+    pass_ratio: float = 0.7
+    web_ratio: float = 0.3
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-bench"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        system = " ".join(str(m.content) for m in messages if isinstance(m, SystemMessage))
+        if "60점 만점" in system:
+            return json.dumps({
+                "scores": {"accuracy": 8, "relevance": 8, "completeness": 7, "citation_accuracy": 7,
+                           "clarity_conciseness": 8, "objectivity": 9},
+                "total_score": 47,
+                "brief_evaluation": "벤치마크용 가짜 평가입니다.",
+            }, ensure_ascii=False)
+        words = _human_text(messages).split()[:10] or ["답변"]
+        return " ".join(words[i % len(words)] for i in range(self.answer_tokens))
+
+    def _result(self, text: str, messages: List[BaseMessage]) -> ChatResult:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 2
+        output_tokens = len(text.split())
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _delay(self, text: str) -> float:
+        return (self.call_ms + self.token_ms * len(text.split())) / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._respond(messages)
+        time.sleep(self._delay(text))
+        return self._result(text, messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self._respond(messages)
+        await asyncio.sleep(self._delay(text))
+        return self._result(text, messages)
+
+    def bind_tools(self, tools, **kwargs):
+        # 평가 에이전트는 EVALUATION_MAX_TOOL_CALLS=0으로 도구 없이 실행되므로 도구를 호출하지 않습니다.
+        return self
+
+    # --- 구조화 출력 ---
+    def _route(self, question: str, prompt: str) -> RouteSelection:
+        listed = [line[2:].strip() for line in prompt.splitlines() if line.startswith("- ")]
+        laws = [
+            law for law in listed
+            if any(keyword in question for keyword in LAW_KEYWORDS.get(law.replace(" ", ""), []))
+        ]
+        # 법률 질문은 일부만 웹 검색을 함께 하고, 법률과 무관한 질문은 웹 검색 또는 llm_fallback으로 보냅니다.
+        web_search = _ratio_hit(question, self.web_ratio) if laws else "추천" not in question
+        return RouteSelection(laws=laws, web_search=web_search)
+
+    def _extract(self, text: str) -> ExtractedInformation:
+        if not _ratio_hit(text, self.pass_ratio):
+            return ExtractedInformation(strips=[], query_relevance=0.3)
+        content = text.rsplit("[문서 내용]", 1)[-1].strip()[:200]
+        return ExtractedInformation(
+            strips=[InformationStrip(content=content, source="벤치마크 문서", relevance_score=0.9, faithfulness_score=0.9)],
+            query_relevance=0.9,
+        )
+
+    def with_structured_output(self, schema, **kwargs):
+        async def _invoke(prompt_value, config=None):
+            if isinstance(prompt_value, str):
+                # 라우터는 route_prompt.format()으로 만든 "System: ...\nHuman: ..." 문자열을 넘깁니다.
+                system, _, human = prompt_value.rpartition("\nHuman: ")
+                messages = [SystemMessage(content=system), HumanMessage(content=human)]
+            else:
+                messages = prompt_value.to_messages()
+            # 일반 호출과 같은 지연/콜백/캐시를 거친 뒤 응답 대신 규칙으로 구조화 출력을 만듭니다.
+            await self.ainvoke(messages, config=config)
+            text = _human_text(messages)
+            if schema is RouteSelection:
+                return self._route(text, str(messages[0].content))
+            if schema is ExtractedInformation:
+                return self._extract(text)
+            if schema is RefinedQuestion:
+                question = text.split("\\n")[0].removeprefix("원래 질문: ")
+                return RefinedQuestion(question_refined=f"{question} 관련 조문", reason="벤치마크용 재작성")
+            raise ValueError(f"지원하지 않는 구조화 출력입니다: {schema}")
+
+        return RunnableLambda(_invoke, name=f"fake_structured_{getattr(schema, '__name__', 'output')}")
+
+
+# --- 가짜 Retriever ---
+class FakeLawRetriever(BaseRetriever):
+    """
+    data/의 PDF 청크에 대한 BM25 검색. 점수를 0~1 사이 relevance_score로 바꿔 재순위화 결과처럼 반환합니다.
+    추측 검색용 acandidates()/afrom_candidates()는 후보 candidate_k개를 가져온 뒤 점수 순 상위 k개를 고릅니다.
+    """
+    sparse_index: SparseIndex
+    documents: Dict[str, Document]
+    laws: Optional[List[str]] = None
+    k: int = 3
+    candidate_k: int = 15
+    latency_ms: float = 20.0
+
+    def _search(self, query: str, k: Optional[int] = None) -> List[Document]:
+        results = self.sparse_index.search(query, k or self.k, where=law_filter(self.laws))
+        return [
+            Document(page_content=self.documents[doc_id].page_content,
+                     metadata={**self.documents[doc_id].metadata, "relevance_score": score / (score + 10.0)})
+            for doc_id, score in results
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.latency_ms / 1000)
+        return self._search(query)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._search(query)
+
+    async def acandidates(self, query: str) -> List[Document]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._search(query, self.candidate_k)
+
+    async def afrom_candidates(self, query: str, candidates: List[Document]) -> List[Document]:
+        return sorted(candidates, key=lambda doc: doc.metadata["relevance_score"], reverse=True)[:self.k]
+
+
+class FakeWebRetriever(BaseRetriever):
+    """Tavily 대신 질문으로 만든 가짜 검색 결과를 돌려주는 Retriever (metadata["source"]에 URL)"""
+    k: int = 2
+    latency_ms: float = 200.0
+
+    def _results(self, query: str) -> List[Document]:
+        key = zlib.crc32(query.encode("utf-8"))
+        return [
+            Document(page_content=f"{query}에 대한 웹 문서 {i}입니다. " * 5,
+                     metadata={"source": f"https://example.com/{key}/{i}"})
+            for i in range(self.k)
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.latency_ms / 1000)
+        return self._results(query)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._results(query)
+
+
+def install_fakes(args, workdir: str):
+    """가짜 LLM/Retriever/저장소를 registry에 주입합니다. PDF는 한 번만 파싱해 희소 인덱스와 조문 저장소를 만듭니다."""
+    sparse_index = SparseIndex()
+    documents: Dict[str, Document] = {}
+    article_store = ArticleStore(os.path.join(workdir, "articles.sqlite3"))
+    for pdf in sorted(glob(os.path.join(args.data_dir, "*.pdf"))):
+        law_name, collection_name, chunk_docs, article_docs = build_law_documents(pdf)
+        for doc in chunk_docs:
+            sparse_index.add(doc.metadata["chunk_id"], doc.page_content, doc.metadata)
+            documents[doc.metadata["chunk_id"]] = doc
+        article_store.upsert(collection_name, article_docs)
+        print(f"---{law_name}: 청크 {len(chunk_docs)}개, 조문 {len(article_docs)}개---")
+
+    llm_cache = False
+    if args.llm_cache:
+        llm_cache = LLMCallCache(path=os.path.join(workdir, "llm_cache.sqlite3"))
+        registry.override("llm_cache", llm_cache)
+    llm = FakeChatModel(
+        call_ms=args.llm_ms, token_ms=args.token_ms, answer_tokens=args.answer_tokens,
+        pass_ratio=args.pass_ratio, web_ratio=args.web_ratio, cache=llm_cache,
+        callbacks=[llm_cache.inflight_handler] if llm_cache else None,
+    )
+
+    registry.override("llm", llm)
+    registry.override("tool_selector", llm.with_structured_output(RouteSelection))
+    registry.override("law_retriever_factory", lambda laws=None: FakeLawRetriever(
+        sparse_index=sparse_index, documents=documents, laws=laws, latency_ms=args.retrieval_ms,
+    ))
+    registry.override("retriever:web", FakeWebRetriever(latency_ms=args.web_ms))
+    registry.override("article_store", article_store)
+    registry.override("semantic_cache", SemanticCache(
+        DeterministicFakeEmbedding(size=64), directory=os.path.join(workdir, "semantic_cache")
+    ))
+
+
+# --- 측정 ---
+class NodeRecorder(BaseCallbackHandler):
+    """그래프 노드별 소요 시간과 LLM 호출 수를 모읍니다. sub-agent 노드는 "search_law›retrieve"처럼 기록합니다."""
+    run_inline = True
+
+    def __init__(self):
+        self.node_seconds: Dict[str, float] = defaultdict(float)
+        self.node_llm_calls: Dict[str, int] = defaultdict(int)
+        self._started: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _label(metadata: dict) -> Optional[str]:
+        node = metadata.get("langgraph_node")
+        if node is None:
+            return None
+        parent = metadata.get("langgraph_checkpoint_ns", "").split(":", 1)[0]
+        return f"{parent}›{node}" if parent and parent != node else node
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        if kwargs.get("name") == metadata.get("langgraph_node"):
+            with self._lock:
+                self._started[run_id] = (self._label(metadata), time.perf_counter())
+
+    def _finish(self, run_id):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                self.node_seconds[started[0]] += time.perf_counter() - started[1]
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        label = self._label(metadata or {})
+        with self._lock:
+            self.node_llm_calls[label or "(그래프 밖)"] += 1
+
+
+async def run_question(question: str, wait_evaluation: bool) -> dict:
+    recorder = NodeRecorder()
+    budget = QueryBudget()
+    config = {
+        "configurable": {"thread_id": str(uuid.uuid4()), "budget": budget},
+        "callbacks": [budget, recorder],
+    }
+    start = time.perf_counter()
+    error = None
+    try:
+        await get_legal_rag_agent().ainvoke({"question": question}, config=config)
+    except Exception as e:
+        error = str(e)
+    latency = time.perf_counter() - start
+
+    evaluation_latency = None
+    if wait_evaluation and error is None:
+        state = await get_legal_rag_agent().aget_state({"configurable": {"thread_id": config["configurable"]["thread_id"]}})
+        if state.values.get("evaluation_job") and await get_evaluation_jobs().result(state.values["evaluation_job"]):
+            evaluation_latency = time.perf_counter() - start
+    return {
+        "latency": latency,
+        "evaluation_latency": evaluation_latency,
+        "llm_calls": budget.llm_calls,
+        "tokens": budget.tokens,
+        "node_seconds": dict(recorder.node_seconds),
+        "node_llm_calls": dict(recorder.node_llm_calls),
+        "error": error,
+    }
+
+
+def make_questions(count: int) -> List[str]:
+    """예시 질문을 돌려 가며 count개를 만듭니다. 반복되는 질문에는 번호를 붙여 캐시 효과를 없앱니다."""
+    questions = []
+    for i in range(count):
+        question = BASE_QUESTIONS[i % len(BASE_QUESTIONS)]
+        round_index = i // len(BASE_QUESTIONS)
+        questions.append(f"{question} (사례 {round_index})" if round_index else question)
+    return questions
+
+
+def _percentile(values: List[float], n: int = 20) -> float:
+    return statistics.quantiles(values, n=n)[-1] if len(values) > 1 else values[0]
+
+
+async def run_level(questions: List[str], concurrency: int, wait_evaluation: bool) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question):
+        async with semaphore:
+            return await run_question(question, wait_evaluation)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(q) for q in questions))
+    wall_time = time.perf_counter() - start
+
+    ok = [r for r in results if r["error"] is None]
+    latencies = [r["latency"] for r in ok] or [0.0]
+    node_seconds, node_llm_calls = defaultdict(float), defaultdict(int)
+    for r in ok:
+        for node, seconds in r["node_seconds"].items():
+            node_seconds[node] += seconds
+        for node, calls in r["node_llm_calls"].items():
+            node_llm_calls[node] += calls
+    evaluation = [r["evaluation_latency"] for r in ok if r["evaluation_latency"] is not None]
+    count = max(len(ok), 1)
+    return {
+        "concurrency": concurrency,
+        "questions": len(results),
+        "errors": [r["error"] for r in results if r["error"] is not None],
+        "wall_time": round(wall_time, 3),
+        "throughput": round(len(ok) / wall_time, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(_percentile(latencies) * 1000, 1),
+        "evaluation_p95_ms": round(_percentile(evaluation) * 1000, 1) if evaluation else None,
+        "llm_calls_per_question": round(sum(r["llm_calls"] for r in ok) / count, 2),
+        "max_llm_calls": max((r["llm_calls"] for r in ok), default=0),
+        "tokens_per_question": round(sum(r["tokens"] for r in ok) / count, 1),
+        "nodes": {
+            node: {"ms_per_question": round(node_seconds[node] * 1000 / count, 1),
+                   "llm_calls_per_question": round(node_llm_calls.get(node, 0) / count, 2)}
+            for node in sorted(node_seconds, key=node_seconds.get, reverse=True)
+        },
+    }
+
+
+def report(result: dict):
+    print(
+        f"동시성 {result['concurrency']:>3} | 질문 {result['questions']:>4}개 | 처리량 {result['throughput']:6.2f}건/초 | "
+        f"p50 {result['p50_ms']:8.1f}ms | p95 {result['p95_ms']:8.1f}ms | "
+        f"LLM 호출 {result['llm_calls_per_question']:5.2f}회/질문 (최대 {result['max_llm_calls']}) | 오류 {len(result['errors'])}개"
+    )
+    if result["evaluation_p95_ms"] is not None:
+        print(f"    백그라운드 평가 완료까지 p95 {result['evaluation_p95_ms']:.1f}ms")
+    for node, stats in result["nodes"].items():
+        print(f"    {node:<36} {stats['ms_per_question']:8.1f}ms/질문 | LLM 호출 {stats['llm_calls_per_question']:5.2f}회/질문")
+
+
+async def run(args) -> List[dict]:
+    """가짜 모델을 주입하고 동시성 단계별로 질문을 실행한 결과를 반환합니다."""
+    with tempfile.TemporaryDirectory(prefix="bench_agent_") as workdir:
+        install_fakes(args, workdir)
+        questions = make_questions(args.questions)
+        print(
+            f"=== 질문 {len(questions)}개 (LLM {args.llm_ms}ms + 토큰당 {args.token_ms}ms, "
+            f"법률 검색 {args.retrieval_ms}ms, 웹 검색 {args.web_ms}ms, LLM 캐시 {'사용' if args.llm_cache else '없음'}) ==="
+        )
+        results = []
+        for concurrency in args.concurrency:
+            result = await run_level(questions, concurrency, args.wait_evaluation)
+            report(result)
+            results.append(result)
+        if args.llm_cache:
+            print(f"---LLM 캐시: {registry.get('llm_cache').stats()}---")
+        if registry.is_loaded("speculative_retrievals"):
+            print(f"---추측 검색: {registry.get('speculative_retrievals').stats()}---")
+    return results
+
+
+def check(results: List[dict], args) -> List[str]:
+    """성능 회귀 기준(--fail-*)을 넘은 항목을 반환합니다."""
+    failures = []
+    for result in results:
+        if result["errors"]:
+            failures.append(f"동시성 {result['concurrency']}: 오류 {len(result['errors'])}개 ({result['errors'][0]})")
+        if args.fail_p95_ms and result["p95_ms"] > args.fail_p95_ms:
+            failures.append(f"동시성 {result['concurrency']}: p95 {result['p95_ms']}ms > {args.fail_p95_ms}ms")
+        if args.fail_llm_calls and result["max_llm_calls"] > args.fail_llm_calls:
+            failures.append(f"동시성 {result['concurrency']}: 질문당 LLM 호출 {result['max_llm_calls']}회 > {args.fail_llm_calls}회")
+    return failures
+
+
+async def main(args) -> int:
+    results = await run(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    failures = check(results, args)
+    for failure in failures:
+        print(f"실패: {failure}")
+    return 1 if failures else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="legal_rag_agent 오프라인 end-to-end 벤치마크")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="동시에 실행할 질문 수 (여러 개 지정)")
+    parser.add_argument("--questions", type=int, default=24, help="동시성 단계마다 실행할 질문 수")
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="가짜 LLM 호출당 고정 지연")
+    parser.add_argument("--token-ms", type=float, default=2.0, help="가짜 LLM 출력 토큰당 지연")
+    parser.add_argument("--answer-tokens", type=int, default=120, help="가짜 LLM 답변 길이(토큰)")
+    parser.add_argument("--retrieval-ms", type=float, default=20.0, help="가짜 법률 검색 지연")
+    parser.add_argument("--web-ms", type=float, default=200.0, help="가짜 웹 검색 지연")
+    parser.add_argument("--pass-ratio", type=float, default=0.7, help="문서 평가를 통과하는 문서 비율")
+    parser.add_argument("--web-ratio", type=float, default=0.3, help="법률 질문 중 웹 검색도 함께 하는 비율")
+    parser.add_argument("--llm-cache", action="store_true", help="LLM 호출 캐시 사용 (동시성 단계 사이에도 유지)")
+    parser.add_argument("--wait-evaluation", action="store_true", help="백그라운드 답변 평가 완료 시간도 측정")
+    parser.add_argument("--data-dir", default="data", help="법률 PDF 디렉토리")
+    parser.add_argument("--fail-p95-ms", type=float, default=0.0, help="p95 지연이 이 값을 넘으면 실패 (0이면 검사 안 함)")
+    parser.add_argument("--fail-llm-calls", type=int, default=0, help="질문당 LLM 호출이 이 값을 넘으면 실패 (0이면 검사 안 함)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
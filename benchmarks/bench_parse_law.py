@@ -0,0 +1,239 @@
+# benchmarks/bench_parse_law.py
+# 단일 패스 파서(util.parse_law)와 이전 정규표현식 파서들의 속도를 비교합니다.
+# 단일 패스 파서(parse_law, parse_law_tree, 수집 경로 parse_law_tree + split_article)가 수집에 쓰던 이전 파서보다 느리면 종료 코드 1을 반환합니다.
+#
+# 실행: python -m benchmarks.bench_parse_law [--repeat 5] [--synthetic 200 800 3200]
+
+import argparse
+import os
+import re
+import sys
+import time
+from glob import glob
+
+from util.parse_law import parse_law, parse_law_tree, split_article
+
+
+# --- 이전 구현 (비교용으로 그대로 보존) ---
+# util/parse_law.py 의 parse_law, parse_law_v2
+def legacy_util_parse_law(law_text):
+    # 서문 분리
+    # '^'로 시작하여 '제1장' 또는 '제1조' 직전까지의 모든 텍스트를 탐색 
+    preamble_pattern = r'^(.*?)(?=제1장|제1조)'
+    preamble = re.search(preamble_pattern, law_text, re.DOTALL)
+    if preamble:
+        preamble = preamble.group(1).strip()
+    
+    # 장 분리 
+    # '제X장' 형식의 제목과 그 뒤에 오는 모든 조항을 하나의 그룹화 
+    chapter_pattern = r'(제\d+장\s+.+?)\n((?:제\d+조(?:의\d+)?(?:\(\w+\))?.*?)(?=제\d+장|부칙|$))'
+    chapters = re.findall(chapter_pattern, law_text, re.DOTALL)
+    
+    # 부칙 분리
+    # '부칙'으로 시작하는 모든 텍스트를 탐색 
+    appendix_pattern = r'(부칙.*)'
+    appendix = re.search(appendix_pattern, law_text, re.DOTALL)
+    if appendix:
+        appendix = appendix.group(1)
+    
+    # 파싱 결과를 저장할 딕셔너리 초기화
+    parsed_law = {'서문': preamble, '장': {}, '부칙': appendix}
+    
+    # 각 장 내에서 조 분리
+    for chapter_title, chapter_content in chapters:
+        # 조 분리 패턴
+        # 1. '제X조'로 시작 ('제X조의Y' 형식도 가능)
+        # 2. 조 번호 뒤에 반드시 '(항목명)' 형식의 제목이 와야 함 
+        # 3. 다음 조가 시작되기 전까지 또는 문서의 끝까지의 모든 내용을 포함
+        article_pattern = r'(제\d+조(?:의\d+)?\s*\([^)]+\).*?)(?=제\d+조(?:의\d+)?\s*\([^)]+\)|$)'
+        
+        # 정규표현식을 이용해 모든 조항을 탐색 
+        articles = re.findall(article_pattern, chapter_content, re.DOTALL)
+        
+        # 각 조항의 앞뒤 공백을 제거하고 결과 딕셔너리에 저장
+        parsed_law['장'][chapter_title.strip()] = [article.strip() for article in articles]
+    
+    return parsed_law
+
+# 파싱 함수를 수정 (장이 없이 조문으로만 구성된 경우)
+def legacy_util_parse_law_v2(law_text):
+    # 서문 분리
+    preamble_pattern = r'^(.*?)(?=제1장|제1조)'
+    preamble = re.search(preamble_pattern, law_text, re.DOTALL)
+    if preamble:
+        preamble = preamble.group(1).strip()
+    
+    # 장 분리 
+    chapter_pattern = r'(제\d+장\s+.+?)\n((?:제\d+조(?:의\d+)?(?:\(\w+\))?.*?)(?=제\d+장|부칙|$))'
+    chapters = re.findall(chapter_pattern, law_text, re.DOTALL)
+    
+    # 부칙 분리
+    appendix_pattern = r'(부칙.*)'
+    appendix = re.search(appendix_pattern, law_text, re.DOTALL)
+    if appendix:
+        appendix = appendix.group(1)
+    
+    parsed_law = {'서문': preamble, '부칙': appendix}
+    
+    # 조 분리 패턴
+    article_pattern = r'(제\d+조(?:의\d+)?\s*\([^)]+\).*?)(?=제\d+조(?:의\d+)?\s*\([^)]+\)|$)'
+    
+    if chapters:  # 장이 있는 경우
+        parsed_law['장'] = {}
+        for chapter_title, chapter_content in chapters:
+            articles = re.findall(article_pattern, chapter_content, re.DOTALL)
+            parsed_law['장'][chapter_title.strip()] = [article.strip() for article in articles]
+    else:  # 장이 없는 경우
+        # 서문과 부칙을 제외한 본문에서 조문 추출
+        main_text = re.sub(preamble_pattern, '', law_text, flags=re.DOTALL)
+        main_text = re.sub(appendix_pattern, '', main_text, flags=re.DOTALL)
+        articles = re.findall(article_pattern, main_text, re.DOTALL)
+        parsed_law['조문'] = [article.strip() for article in articles]
+    
+    return parsed_law
+
+# vectorDB/imbeding.py 의 parse_law
+def legacy_imbeding_parse_law(law_text):
+    """
+    법률 텍스트를 서문, 장, 조문, 부칙으로 분리하여 딕셔너리로 반환합니다.
+    """
+    preamble_pattern = r'^(.*?)(?=제1장|제1조)'
+    preamble = re.search(preamble_pattern, law_text, re.DOTALL)
+    if preamble:
+        preamble = preamble.group(1).strip()
+    else:
+        preamble = ""
+
+    chapter_pattern = r'(제\d+장\s+.+?)\n((?:제\d+조(?:의\d+)?(?:\(\w+\))?.*?)(?=제\d+장|부칙|$))'
+    chapters = re.findall(chapter_pattern, law_text, re.DOTALL)
+
+    appendix_pattern = r'(부칙.*)'
+    appendix = re.search(appendix_pattern, law_text, re.DOTALL)
+    if appendix:
+        appendix = appendix.group(1).strip()
+    else:
+        appendix = ""
+
+    parsed_law = {'서문': preamble, '장': {}, '부칙': appendix}
+
+    article_pattern = r'(제\d+조(?:의\d+)?\s*\([^)]+\).*?)(?=제\d+조(?:의\d+)?\s*\([^)]+\)|$)'
+
+    if chapters:
+        for chapter_title, chapter_content in chapters:
+            articles = re.findall(article_pattern, chapter_content, re.DOTALL)
+            parsed_law['장'][chapter_title.strip()] = [article.strip() for article in articles]
+    else:
+        main_text = re.sub(preamble_pattern, '', law_text, flags=re.DOTALL)
+        main_text = re.sub(appendix_pattern, '', main_text, flags=re.DOTALL)
+        articles = re.findall(article_pattern, main_text, re.DOTALL)
+        parsed_law['조문'] = [article.strip() for article in articles]
+
+    return parsed_law
+
+# --- 벤치마크 ---
+# vectorDB/law_loader.py 의 CHUNK_MAX_CHARS 기본값
+CHUNK_MAX_CHARS = 500
+
+
+def ingest_parse(law_text):
+    """수집(build_law_documents)과 같은 경로: 조문 단위로 파싱한 뒤 조문마다 항/호 청크로 나눕니다."""
+    tree = parse_law_tree(law_text)
+    for article in tree['articles']:
+        split_article(article, CHUNK_MAX_CHARS)
+    return tree
+
+
+PARSERS = {
+    "legacy util.parse_law": legacy_util_parse_law,
+    "legacy util.parse_law_v2": legacy_util_parse_law_v2,
+    "legacy imbeding.parse_law": legacy_imbeding_parse_law,
+    "parse_law (single pass)": parse_law,
+    "parse_law_tree (single pass)": parse_law_tree,
+    "parse_law_tree + split_article": ingest_parse,
+    "parse_law_tree (with_paragraphs)": lambda law_text: parse_law_tree(law_text, with_paragraphs=True),
+}
+# 단일 패스 파서는 수집에 쓰던 이전 파서(vectorDB/imbeding.py)보다 빨라야 합니다. (repeat번 중 최솟값으로 비교)
+BASELINE_PARSER = "legacy imbeding.parse_law"
+# 모든 조문의 항/호 노드까지 만드는 경우는 이전 파서에 없던 작업이므로 시간만 출력합니다.
+GATED_PARSERS = ["parse_law (single pass)", "parse_law_tree (single pass)", "parse_law_tree + split_article"]
+
+
+def count_articles(parsed):
+    """파서 결과에서 조문 수를 셉니다."""
+    if 'articles' in parsed:
+        return len(parsed['articles'])
+    return sum(len(a) for a in (parsed.get('장') or {}).values()) + len(parsed.get('조문') or [])
+
+
+def make_synthetic_law(num_articles, articles_per_chapter=20):
+    """조문 수를 조절할 수 있는 가상의 법률 텍스트를 만듭니다."""
+    lines = ["가상법", "[시행 2024. 1. 1.] [법률 제1호, 2024. 1. 1., 제정]"]
+    for i in range(1, num_articles + 1):
+        if (i - 1) % articles_per_chapter == 0:
+            lines.append(f"제{(i - 1) // articles_per_chapter + 1}장 가상의 장")
+        lines.append(f"제{i}조(가상 조문 {i}) ① 사용자는 제{max(1, i - 1)}조제1항에 따라 근로자에게 다음 각 호의 사항을 알려야 한다.")
+        lines.extend(f"{j}. 가상 호 {j}의 내용으로 임금, 근로시간, 휴일에 관한 사항" for j in range(1, 4))
+        # 줄바꿈으로 뒤 조문 인용이 줄 맨 앞에 오는 경우 (조문 제목으로 잘못 인식하면 사이 조문이 빠짐)
+        lines.append(f"제{i + 5}조(가상 조문 {i + 5}) 및 제{i + 6}조에 따른 사항은 예외로 한다.")
+        lines.append("② 제1항에 따른 통지는 서면으로 하여야 한다. <개정 2020. 5. 26.>")
+    lines.append("부칙 <제1호, 2024. 1. 1.>")
+    lines.append("제1조(시행일) 이 법은 공포한 날부터 시행한다.")
+    return "\n".join(lines)
+
+
+def time_parser(func, text, repeat):
+    """repeat번 실행한 중 가장 짧은 시간(초)과 결과를 반환합니다."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(texts, repeat):
+    """파서별 시간을 출력하고, 수집에 쓰던 이전 파서보다 느린 단일 패스 파서 목록을 반환합니다."""
+    regressions = []
+    for label, text in texts:
+        print(f"=== {label} ({len(text):,}자) ===")
+        baseline = None
+        timings = {}
+        for name, func in PARSERS.items():
+            elapsed, parsed = time_parser(func, text, repeat)
+            baseline = baseline or elapsed
+            timings[name] = elapsed
+            print(f"{name:<32} {elapsed * 1000:10.2f} ms  x{baseline / elapsed:6.2f}  조문 {count_articles(parsed)}개")
+        baseline_time = timings[BASELINE_PARSER]
+        regressions.extend(
+            f"{label}: {name} {timings[name] * 1000:.2f}ms > {BASELINE_PARSER} {baseline_time * 1000:.2f}ms"
+            for name in GATED_PARSERS if timings[name] > baseline_time
+        )
+        print()
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="법률 파서 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5, help="파서별 반복 실행 횟수 (최솟값 사용)")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[200, 800, 3200],
+                        help="가상 법률의 조문 수 (규모별 시간 증가 확인용)")
+    args = parser.parse_args()
+
+    texts = []
+    pdf_files = sorted(glob(os.path.join('data', '*.pdf')))
+    if pdf_files:
+        from vectorDB.law_loader import get_law_name, load_law_text
+        texts.extend((get_law_name(path), load_law_text(path)) for path in pdf_files)
+    else:
+        print("data 폴더에 PDF 파일이 없어 가상 법률로만 측정합니다.")
+    for n in args.synthetic:
+        text = make_synthetic_law(n)
+        # 인용문을 조문 제목으로 잘못 인식하지 않는지 함께 확인합니다.
+        parsed_count = count_articles(parse_law_tree(text))
+        assert parsed_count == n, f"가상 법률 {n}개 조문 중 {parsed_count}개만 파싱되었습니다."
+        texts.append((f"가상 법률 {n}개 조문", text))
+
+    regressions = run(texts, args.repeat)
+    for regression in regressions:
+        print(f"실패: {regression}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,116 @@
+# benchmarks/bench_rerank.py
+# 여러 법률 sub-agent가 동시에 재순위화를 요청하는 상황(fan-out)에서
+# Retriever별 개별 추론(이전 방식)과 공유 RerankService(마이크로 배치 + 점수 캐시)의 처리량과 p95 지연을 비교합니다.
+#
+# 실행: python -m benchmarks.bench_rerank [--fanout 4] [--docs 15] [--rounds 20] [--model fake|real]
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from vectorDB.rerank import RERANK_MODEL_NAME, RerankService
+
+
+class FakeCrossEncoder:
+    """
+    CPU cross-encoder의 비용 구조(호출당 고정 비용 + 쌍당 비용, 한 번에 하나의 추론)를 흉내 내는 모델입니다.
+    실제 모델 없이 배치 효과만 비교할 때 사용합니다.
+    """
+
+    def __init__(self, call_ms: float = 30.0, pair_ms: float = 2.0):
+        self.call_ms = call_ms
+        self.pair_ms = pair_ms
+        self._lock = threading.Lock()
+
+    def score(self, pairs):
+        with self._lock:
+            time.sleep((self.call_ms + self.pair_ms * len(pairs)) / 1000)
+        return [float(len(query) % 7 + len(text) % 11) for query, text in pairs]
+
+
+def make_requests(fanout, num_docs, rounds, repeat_ratio):
+    """라운드마다 fanout개의 (질문, 문서 목록) 요청을 만듭니다. repeat_ratio 비율의 라운드는 이전 질문을 반복합니다."""
+    repeat_every = round(1 / repeat_ratio) if repeat_ratio else 0
+    requests = []
+    for r in range(rounds):
+        question_id = r - 1 if repeat_every and r and r % repeat_every == 0 else r
+        requests.append([
+            (f"질문 {question_id}", [
+                Document(page_content=f"법률{law} 조문 {i} 내용 " * 5, metadata={"chunk_id": f"law{law}/{i}"})
+                for i in range(num_docs)
+            ])
+            for law in range(fanout)
+        ])
+    return requests
+
+
+async def run_baseline(model, requests):
+    """Retriever마다 별도로 모델을 호출하는 이전 방식 (CrossEncoderReranker의 비동기 호출과 동일하게 스레드에서 실행)"""
+    loop = asyncio.get_running_loop()
+
+    async def one(query, docs):
+        start = time.perf_counter()
+        await loop.run_in_executor(None, model.score, [(query, doc.page_content) for doc in docs])
+        return time.perf_counter() - start
+
+    latencies, forward_passes = [], 0
+    for round_requests in requests:
+        latencies.extend(await asyncio.gather(*(one(q, docs) for q, docs in round_requests)))
+        forward_passes += len(round_requests)
+    return latencies, forward_passes
+
+
+async def run_service(model, requests, batch_size, wait_ms):
+    service = RerankService(model, batch_size=batch_size, max_wait_ms=wait_ms)
+
+    async def one(query, docs):
+        start = time.perf_counter()
+        await service.ascore(query, docs)
+        return time.perf_counter() - start
+
+    latencies = []
+    for round_requests in requests:
+        latencies.extend(await asyncio.gather(*(one(q, docs) for q, docs in round_requests)))
+    return latencies, service.forward_passes
+
+
+def report(label, latencies, wall_time, forward_passes):
+    p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+    print(
+        f"{label:<14} 요청 {len(latencies):>4}개 | 처리량 {len(latencies) / wall_time:7.1f}건/초 | "
+        f"p50 {statistics.median(latencies) * 1000:7.1f}ms | p95 {p95 * 1000:7.1f}ms | forward pass {forward_passes}회"
+    )
+
+
+async def main(args):
+    if args.model == "real":
+        from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+        model = HuggingFaceCrossEncoder(model_name=RERANK_MODEL_NAME)
+    else:
+        model = FakeCrossEncoder()
+    requests = make_requests(args.fanout, args.docs, args.rounds, args.repeat_ratio)
+    print(f"=== fan-out {args.fanout} × 문서 {args.docs}개 × {args.rounds}라운드 (모델: {args.model}) ===")
+
+    start = time.perf_counter()
+    latencies, passes = await run_baseline(model, requests)
+    report("개별 추론", latencies, time.perf_counter() - start, passes)
+
+    start = time.perf_counter()
+    latencies, passes = await run_service(model, requests, args.batch_size, args.wait_ms)
+    report("RerankService", latencies, time.perf_counter() - start, passes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="재순위화 fan-out 벤치마크")
+    parser.add_argument("--fanout", type=int, default=4, help="동시에 재순위화하는 Retriever 수")
+    parser.add_argument("--docs", type=int, default=15, help="Retriever당 재순위화할 문서 수")
+    parser.add_argument("--rounds", type=int, default=20, help="반복 횟수")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="이전 질문을 반복하는 라운드 비율 (점수 캐시 효과 확인용)")
+    parser.add_argument("--batch-size", type=int, default=64, help="RerankService 최대 배치 쌍 수")
+    parser.add_argument("--wait-ms", type=float, default=10.0, help="RerankService 배치 대기 시간")
+    parser.add_argument("--model", choices=["fake", "real"], default="fake", help="fake: 비용 모형, real: bge-reranker-v2-m3")
+    asyncio.run(main(parser.parse_args()))
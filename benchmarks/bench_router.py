@@ -0,0 +1,75 @@
+# benchmarks/bench_router.py
+# 로컬 라우터(법률 대표 벡터, vectorDB/law_router.py)와 LLM 라우터의 결정을 같은 질문들로 비교합니다.
+# 로컬 라우터가 확신한(confident) 질문 비율과, 그 질문들에서 LLM 라우터와 법률 목록/웹 검색 여부가 일치한 비율을 출력합니다.
+# 실제 임베딩 모델, 수집된 벡터 DB, LLM API 키가 필요합니다.
+#
+# 실행: python -m benchmarks.bench_router [--questions-file questions.txt] [--json result.json]
+
+import argparse
+import asyncio
+import json
+
+from model.graph.nodes import _route_locally, _route_with_llm
+from vectorDB.retrieval import get_available_laws
+
+SAMPLE_QUESTIONS = [
+    "근로기준법 제60조 내용을 알려주세요",
+    "근로기준법 제23조를 위반하면 어떻게 되나요?",
+    "주택임대차보호법 제6조의3 계약갱신요구권 관련 최근 판례",
+    "개인정보 보호법 제15조에 따른 수집 동의 요건은?",
+    "사업장에서 CCTV를 설치할 때 주의해야 할 법적 사항은 무엇인가요?",
+    "전월세 계약 갱신 요구권의 행사 기간과 조건은 어떻게 되나요?",
+    "개인정보 유출 시 기업이 취해야 할 법적 조치는 무엇인가요?",
+    "해고 예고는 며칠 전에 해야 하나요?",
+    "연차 유급휴가는 1년에 며칠인가요?",
+    "임대인이 보증금을 돌려주지 않으면 어떻게 해야 하나요?",
+    "회사가 직원 이메일을 열람해도 되나요?",
+    "최근 전세 사기 피해 사례와 대응 방법은 무엇인가요?",
+    "요즘 최저임금은 얼마인가요?",
+    "요즘 많이 쓰는 노트북 추천해 주세요",
+]
+
+
+async def compare(questions):
+    available_laws = get_available_laws()
+    rows = []
+    for question in questions:
+        local = await _route_locally(question, available_laws)
+        laws, web_search = await _route_with_llm(question, available_laws)
+        rows.append({
+            "question": question,
+            "confident": bool(local and local["confident"]),
+            "local": {"laws": local["laws"], "web_search": local["web_search"]} if local else None,
+            "llm": {"laws": laws, "web_search": web_search},
+            "agree": bool(local) and set(local["laws"]) == set(laws) and local["web_search"] == web_search,
+        })
+    return rows
+
+
+def report(rows):
+    confident = [row for row in rows if row["confident"]]
+    agreed = [row for row in confident if row["agree"]]
+    for row in rows:
+        mark = ("일치" if row["agree"] else "불일치") if row["confident"] else "LLM 사용"
+        print(f"[{mark:<5}] {row['question']}\n        로컬 {row['local']} / LLM {row['llm']}")
+    print()
+    print(f"로컬 라우터 확신: {len(confident)}/{len(rows)}개 질문")
+    if confident:
+        print(f"확신한 질문 중 LLM 라우터와 일치: {len(agreed)}/{len(confident)} ({len(agreed) / len(confident):.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 라우터와 LLM 라우터 결정 비교")
+    parser.add_argument("--questions-file", help="한 줄에 질문 하나씩 적은 파일 (없으면 내장 질문 사용)")
+    parser.add_argument("--json", help="질문별 비교 결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    questions = SAMPLE_QUESTIONS
+    if args.questions_file:
+        with open(args.questions_file, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    rows = asyncio.run(compare(questions))
+    report(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
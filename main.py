@@ -1,15 +1,47 @@
 # main.py
 
 import gradio as gr
+import os
+import asyncio
 import uuid
-from typing import List, Tuple
+from typing import AsyncIterator, List, Tuple
 from dotenv import load_dotenv
 
-from model.graph.langgraph import legal_rag_agent
+from model.graph.langgraph import get_legal_rag_agent
+from model.graph.evaluation import get_evaluation_jobs, is_pending
+from model.graph.nodes import FINAL_ANSWER_TAG
+from util.batching import LRUCache
+from util.budget import QueryBudget
+from util.registry import registry
+from util.tracing import GraphTracer, start_metrics_server
+from vectorDB.retrieval import get_available_laws
 
 # 환경 변수 로드
 load_dotenv()
 
+# --- 서버 설정 ---
+# 동시에 처리할 요청 수 (Gradio 큐 워커 수)
+GRADIO_CONCURRENCY = int(os.getenv("GRADIO_CONCURRENCY", "16"))
+# 메모리에 유지할 최대 브라우저 세션 수 (오래 사용하지 않은 세션부터 제거)
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+# 답변을 보여준 뒤 백그라운드 평가 결과를 화면에 붙이기 위해 기다리는 최대 시간(초)
+EVALUATION_UI_WAIT = float(os.getenv("EVALUATION_UI_WAIT", "30"))
+
+# 진행 상황으로 보여줄 노드 (상위 그래프 노드와 sub-agent 노드)
+NODE_PROGRESS = {
+    "lookup_article": "조문 조회",
+    "check_cache": "답변 캐시 확인",
+    "analyze_question": "질문 분석 및 검색 대상 선택",
+    "search_law": "법률 검색",
+    "search_web": "인터넷 검색",
+    "retrieve": "문서 검색",
+    "extract_and_evaluate": "문서 평가",
+    "rewrite_query": "질문 재작성",
+    "generate_answer": "답변 작성",
+    "llm_fallback": "답변 작성",
+    "evaluate_answer": "답변 평가 시작",
+}
+
 # 예시 질문
 example_questions = [
     "사업장에서 CCTV를 설치할 때 주의해야 할 법적 사항은 무엇인가요?",
@@ -18,83 +50,192 @@ example_questions = [
 ]
 
 # 챗봇 클래스
-class ChatBot:
+class ChatSession:
+    """브라우저 세션 하나의 대화 스레드. 같은 세션의 요청은 lock으로 순서대로 처리합니다."""
+
     def __init__(self):
         self.thread_id = str(uuid.uuid4())
-        self.user_decision_pending = False
+        self.lock = asyncio.Lock()
+
+
+class ChatBot:
+    """
+    Gradio 세션(session_hash)마다 별도의 대화 스레드를 사용하는 챗봇입니다.
+    승인(y/n) 대기 여부는 세션 변수 대신 체크포인트의 다음 노드(human_review)로 판단하므로
+    한 사용자의 응답이 다른 사용자의 그래프를 재개하지 않습니다.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.sessions = LRUCache(max_sessions)
+
+    def _get_session(self, request: gr.Request) -> ChatSession:
+        session_id = getattr(request, "session_hash", None) or "default"
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = ChatSession()
+            self.sessions.put(session_id, session)
+        return session
+
+    def end_session(self, request: gr.Request):
+        """브라우저 탭이 닫히면 세션을 제거합니다. (대화 상태는 체크포인터의 TTL로 정리됩니다)"""
+        self.sessions.pop(getattr(request, "session_hash", None) or "default")
+
+    def _get_config(self, session: ChatSession):
+        return {"configurable": {"thread_id": session.thread_id}}
 
-    def _get_config(self):
-        return {"configurable": {"thread_id": self.thread_id}}
+    async def _is_decision_pending(self, config) -> bool:
+        snapshot = await get_legal_rag_agent().aget_state(config)
+        return "human_review" in (snapshot.next or ())
 
-    def _process_stream_and_get_response(self, stream, initial_message):
+    async def _rotate_if_finished(self, session: ChatSession, config):
+        """승인 단계 없이 끝난 대화(llm_fallback)는 다음 질문을 새 스레드에서 시작합니다."""
+        if not await self._is_decision_pending(config):
+            session.thread_id = str(uuid.uuid4())
+
+    async def _process_stream_and_get_response(self, stream, initial_message):
         final_answer = initial_message
-        for chunk in stream:
+        async for chunk in stream:
             if "generate_answer" in chunk:
                 final_answer = chunk["generate_answer"].get("final_answer", final_answer)
         return final_answer
-    
-    def chat(self, message: str, history: List[Tuple[str, str]]) -> str:
-        print(f"Thread ID: {self.thread_id}")
-        config = self._get_config()
+
+    async def _stream_until_review(self, inputs, config, title: str) -> AsyncIterator[str]:
+        """
+        그래프를 human_review 직전까지 실행하면서 노드별 진행 상황과 최종 답변 토큰을 스트리밍합니다.
+        FINAL_ANSWER_TAG가 붙은 체인의 토큰만 답변으로 보여주고, 끝나면 자체 평가와 함께 완성된 응답을 보냅니다.
+        """
+        progress: List[str] = []
+        answer = ""
+        # 실행마다 새 예산을 만들어 모든 LLM 호출을 집계하고, 노드가 남은 예산을 보고 작업을 줄이게 합니다.
+        # 노드별 span(소요 시간, 토큰, 문서 수 등)은 GraphTracer가 JSONL 파일과 /metrics 지표로 내보냅니다.
+        budget = QueryBudget()
+        tracer = GraphTracer(trace_id=f"{config['configurable']['thread_id']}/{uuid.uuid4().hex[:8]}")
+        run_config = {
+            **config,
+            "callbacks": [budget, tracer],
+            "configurable": {**config["configurable"], "budget": budget},
+        }
+        async for event in get_legal_rag_agent().astream_events(inputs, config=run_config, version="v2"):
+            kind = event["event"]
+            metadata = event.get("metadata", {})
+            if kind == "on_chain_start" and event["name"] == metadata.get("langgraph_node"):
+                # 상위 그래프 노드와 sub-agent 노드를 구분해 "법률 검색 › 문서 검색"처럼 표시합니다.
+                parent = metadata.get("langgraph_checkpoint_ns", "").split(":", 1)[0]
+                label = NODE_PROGRESS.get(event["name"])
+                if label and parent != event["name"] and parent in NODE_PROGRESS:
+                    label = f"{NODE_PROGRESS[parent]} › {label}"
+                if label and answer:
+                    # 답변 스트리밍이 끝난 뒤의 단계(답변 평가)는 답변 아래에 표시합니다.
+                    yield f"**{title}:**\n{answer}\n\n---\n⏳ {label}"
+                elif label:
+                    progress.append(label)
+                    yield "\n".join(f"⏳ {line}" for line in progress)
+            elif kind == "on_chat_model_stream" and FINAL_ANSWER_TAG in event.get("tags", []):
+                answer += event["data"]["chunk"].content
+                yield f"**{title}:**\n{answer}"
+
+        print(f"---질문 예산 사용: {budget.summary()}---")
+        if registry.is_loaded("llm_cache"):
+            print(f"---LLM 캐시: {registry.get('llm_cache').stats()}---")
+        if registry.is_loaded("speculative_retrievals"):
+            print(f"---추측 검색: {registry.get('speculative_retrievals').stats()}---")
+
+        current_state = await get_legal_rag_agent().aget_state(config)
+        final_answer = current_state.values.get("final_answer", answer or "답변을 생성 중입니다...")
+        if not (current_state.next and "human_review" in current_state.next):
+            # llm_fallback처럼 승인 단계 없이 끝난 경우
+            yield f"**{title}:**\n{final_answer}"
+            return
+        eval_report = current_state.values.get('evaluation_report', {})
+        yield self._format_review(title, final_answer, eval_report)
+        if is_pending(eval_report):
+            # 답변은 바로 보여주고, 백그라운드 평가가 끝나면 점수를 붙여 다시 보냅니다.
+            eval_report = await get_evaluation_jobs().result(
+                current_state.values.get("evaluation_job"), timeout=EVALUATION_UI_WAIT
+            )
+            if eval_report is not None:
+                yield self._format_review(title, final_answer, eval_report)
+
+    @staticmethod
+    def _format_review(title: str, final_answer: str, eval_report: dict) -> str:
+        if is_pending(eval_report):
+            evaluation = "⏳ 자체 평가를 진행 중입니다."
+        else:
+            evaluation = f"- **점수:** {eval_report.get('total_score', 'N/A')}/60\n- **평가:** {eval_report.get('brief_evaluation', 'N/A')}"
+        return f"""**{title}:**\n{final_answer}\n\n---\n**자체 평가:**\n{evaluation}\n\n**이 답변이 마음에 드시나요? (y/n)** 거절할 때 'n 이유'로 의견을 남기면 반영해 다시 작성합니다. 출처가 잘못되었다면 '출처'를 언급해 주세요."""
+
+    async def chat(self, message: str, history: List[Tuple[str, str]], request: gr.Request) -> AsyncIterator[str]:
+        session = self._get_session(request)
+        async with session.lock:
+            async for partial in self._chat(session, message):
+                yield partial
+
+    async def _chat(self, session: ChatSession, message: str) -> AsyncIterator[str]:
+        print(f"Thread ID: {session.thread_id}")
+        config = self._get_config(session)
         
         try:
-            if not self.user_decision_pending:
-                # Breakpoint까지 실행
-                inputs = {"question": message}
-                legal_rag_agent.invoke(inputs, config=config)
-                
-                # Breakpoint에서 현재 상태 가져오기
-                current_state = legal_rag_agent.get_state(config)
-                final_answer = current_state.values.get("final_answer", "답변을 생성 중입니다...")
-                eval_report = current_state.values.get('evaluation_report', {})
-                
-                response = f"""**생성된 답변:**\n{final_answer}\n\n---\n**자체 평가:**\n- **점수:** {eval_report.get('total_score', 'N/A')}/60\n- **평가:** {eval_report.get('brief_evaluation', 'N/A')}\n\n**이 답변이 마음에 드시나요? (y/n)**"""
-                
-                self.user_decision_pending = True
-                return response
+            if not await self._is_decision_pending(config):
+                # Breakpoint까지 실행하면서 진행 상황과 답변을 스트리밍
+                async for partial in self._stream_until_review({"question": message}, config, "생성된 답변"):
+                    yield partial
+                await self._rotate_if_finished(session, config)
             else:
-                user_input = message.lower().strip()
+                # 거절할 때는 'n 출처가 틀렸어요'처럼 이유를 함께 적을 수 있습니다.
+                user_input, _, feedback = message.strip().partition(" ")
+                user_input = user_input.lower()
                 if user_input == 'y':
                     decision = "approved"
-                    legal_rag_agent.update_state(config, {"user_decision": decision})
-                    final_stream = legal_rag_agent.stream(None, config=config)
-                    final_response = self._process_stream_and_get_response(final_stream, "승인되었습니다.")
-                    self.user_decision_pending = False
+                    await get_legal_rag_agent().aupdate_state(config, {"user_decision": decision})
+                    final_stream = get_legal_rag_agent().astream(None, config={**config, "callbacks": [GraphTracer()]})
+                    final_response = await self._process_stream_and_get_response(final_stream, "승인되었습니다.")
                     # 새로운 대화를 위해 스레드 ID 변경
-                    self.thread_id = str(uuid.uuid4()) 
-                    return "답변이 승인되었습니다. 새로운 질문을 해주세요."
+                    session.thread_id = str(uuid.uuid4())
+                    yield "답변이 승인되었습니다. 새로운 질문을 해주세요."
                 elif user_input == 'n':
                     decision = "rejected"
-                    legal_rag_agent.update_state(config, {"user_decision": decision})
+                    await get_legal_rag_agent().aupdate_state(
+                        config, {"user_decision": decision, "user_feedback": feedback.strip()}
+                    )
                     
                     # 거부 후 다시 실행
-                    legal_rag_agent.invoke(None, config=config)
-                    
-                    current_state = legal_rag_agent.get_state(config)
-                    final_answer = current_state.values.get("final_answer", "답변을 재작성 중입니다...")
-                    eval_report = current_state.values.get('evaluation_report', {})
-                    
-                    response = f"""**재작성된 답변:**\n{final_answer}\n\n---\n**자체 평가:**\n- **점수:** {eval_report.get('total_score', 'N/A')}/60\n- **평가:** {eval_report.get('brief_evaluation', 'N/A')}\n\n**이 답변이 마음에 드시나요? (y/n)**"""
-                    
-                    self.user_decision_pending = True
-                    return response
+                    async for partial in self._stream_until_review(None, config, "재작성된 답변"):
+                        yield partial
+                    await self._rotate_if_finished(session, config)
                 else:
-                    return "올바른 입력을 해주세요. (y 또는 n)"
+                    yield "올바른 입력을 해주세요. (y 또는 n, 예: 'n 출처가 잘못되었어요')"
 
         except Exception as e:
             print(f"Error occurred: {e}")
-            self.user_decision_pending = False
-            return "죄송합니다. 오류가 발생했습니다. 다시 시도해 주세요."
+            # 승인 대기 중인 스레드를 버리고 새 스레드에서 다시 시작합니다.
+            session.thread_id = str(uuid.uuid4())
+            yield "죄송합니다. 오류가 발생했습니다. 다시 시도해 주세요."
 
 # 챗봇 인스턴스 생성 및 Gradio 인터페이스 실행
+# chat은 코루틴이고 세션마다 상태가 분리되어 있으므로 Gradio가 여러 사용자의 질문을 동시에 처리합니다.
+# 안내 문구에 쓰는 법률 목록은 조문 저장소(SQLite)를 열어야 하므로, import 시점이 아니라 인터페이스를 만들 때 가져옵니다.
 chatbot_instance = ChatBot()
-demo = gr.ChatInterface(
-    fn=chatbot_instance.chat,
-    title="⚖️ LangGraph 기반 법률 AI 에이전트",
-    description="주택임대차보호법, 근로기준법, 개인정보보호법에 대해 질문해보세요.",
-    examples=example_questions,
-    theme=gr.themes.Soft()
-)
+
+@registry.resource("demo")
+def _create_demo():
+    demo = gr.ChatInterface(
+        fn=chatbot_instance.chat,
+        title="⚖️ LangGraph 기반 법률 AI 에이전트",
+        # 안내 문구의 법률 목록은 수집된 데이터에서 가져옵니다.
+        description=f"{', '.join(get_available_laws()) or '수집된 법률'}에 대해 질문해보세요.",
+        examples=example_questions,
+        theme=gr.themes.Soft()
+    )
+    with demo:
+        demo.unload(chatbot_instance.end_session)
+    demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY)
+    return demo
 
 if __name__ == "__main__":
-    demo.launch()
\ No newline at end of file
+    demo = registry.get("demo")
+    # 모델/Retriever는 처음 사용할 때 생성되므로, 서버가 뜨는 동안 백그라운드에서 미리 생성해 둡니다.
+    if os.getenv("WARMUP_ON_START", "1") == "1":
+        registry.warmup(background=True)
+    # Prometheus 형식 지표를 Gradio 앱 옆의 별도 포트(METRICS_PORT)로 제공합니다.
+    start_metrics_server()
+    demo.launch()
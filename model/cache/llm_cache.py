@@ -0,0 +1,240 @@
+# model/cache/llm_cache.py
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from util.tracing import CACHE_HIT_KEY
+
+# --- LLM 호출 캐시 설정 ---
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./cache/llm_cache.sqlite3")
+# 캐시 파일에 저장할 응답의 최대 크기(바이트). 넘으면 오래 사용하지 않은 항목부터 삭제합니다.
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# 몇 번 저장할 때마다 크기 제한을 확인할지
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "50"))
+# 같은 요청이 이미 실행 중일 때 그 결과를 기다리는 최대 시간(초). 넘으면 직접 호출합니다.
+LLM_CACHE_INFLIGHT_TIMEOUT = float(os.getenv("LLM_CACHE_INFLIGHT_TIMEOUT", "60"))
+
+
+# 실행 중인 LLM 호출의 run_id. InflightReleaseHandler가 on_chat_model_start에서 설정하고,
+# 같은 호출의 캐시 조회(alookup)가 이 값으로 자기가 맡은 singleflight 항목을 기록합니다.
+_current_run: ContextVar[Optional[UUID]] = ContextVar("llm_cache_run", default=None)
+
+
+def _mark_cache_hit(return_val: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+    """캐시에서 돌려주는 응답에 표시를 남겨 예산/트레이싱 콜백이 실제 호출과 구분하게 합니다. (원본은 그대로 둠)"""
+    return [
+        generation.model_copy(update={"generation_info": {**(generation.generation_info or {}), CACHE_HIT_KEY: True}})
+        for generation in return_val
+    ]
+
+
+class InflightReleaseHandler(BaseCallbackHandler):
+    """
+    LLM 호출이 끝나거나 실패하면 그 호출이 맡은 singleflight 항목을 바로 풀어 주는 콜백입니다. (모델의 callbacks에 등록)
+    실패하면 aupdate가 불리지 않으므로, 기다리던 호출은 이 콜백의 on_llm_error에서 None을 받고 직접 호출합니다.
+    run_inline으로 LLM 호출과 같은 작업에서 실행되어야 alookup이 run_id를 볼 수 있습니다.
+    """
+
+    run_inline = True
+
+    def __init__(self, cache: "LLMCallCache"):
+        self.cache = cache
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        _current_run.set(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            **kwargs: Any) -> None:
+        _current_run.set(run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.cache._finish(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.cache._finish(run_id)
+
+
+class LLMCallCache(BaseCache):
+    """
+    temperature=0 LLM 호출의 응답을 SQLite에 저장하는 캐시입니다. (ChatOpenAI의 cache로 사용)
+    - 키는 프롬프트 메시지와 llm_string(모델 이름, 파라미터, 구조화 출력 스키마/도구 등 바인딩 인자)의 해시입니다.
+    - 전체 크기가 max_bytes를 넘으면 오래 사용하지 않은 항목부터 삭제합니다.
+    - 같은 키의 비동기 호출이 이미 실행 중이면 새로 호출하지 않고 그 결과를 기다립니다. (singleflight)
+      먼저 호출한 쪽이 실패해도 기다리던 호출이 바로 풀리도록 모델의 callbacks에 inflight_handler를 함께 등록합니다.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 evict_every: int = LLM_CACHE_EVICT_EVERY, inflight_timeout: float = LLM_CACHE_INFLIGHT_TIMEOUT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.inflight_timeout = inflight_timeout
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._writes = 0
+        self._inflight: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        # LLM 호출(run_id)별로 그 호출이 맡은 singleflight 항목
+        self._led_by: Dict[UUID, List[Tuple[str, asyncio.Future]]] = {}
+        self.inflight_handler = InflightReleaseHandler(self)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used);
+            """
+        )
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    # --- 저장소 ---
+    def _get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        try:
+            return loads(row[0])
+        except Exception:
+            return None
+
+    def _put(self, key: str, return_val: RETURN_VAL_TYPE):
+        value = dumps(list(return_val))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), time.time()),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self.evict_every and self._writes % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self):
+        """최근 사용 순으로 누적 크기가 max_bytes를 넘는 항목을 삭제합니다. (self._lock 안에서 호출)"""
+        deleted = self._conn.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS running FROM llm_cache
+                ) WHERE running > ?
+            )
+            """,
+            (self.max_bytes,),
+        ).rowcount
+        self._conn.commit()
+        if deleted:
+            print(f"---LLM 캐시 정리: {deleted}개 삭제---")
+
+    # --- BaseCache 인터페이스 ---
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self._get(self._key(prompt, llm_string))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _mark_cache_hit(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._put(self._key(prompt, llm_string), return_val)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        loop = asyncio.get_running_loop()
+        if key not in self._inflight:
+            value = await loop.run_in_executor(None, self._get, key)
+            if value is not None:
+                self.hits += 1
+                return _mark_cache_hit(value)
+            if key not in self._inflight:
+                # 이 호출이 실제 LLM을 부르고, 같은 키의 다른 호출은 결과를 기다립니다.
+                self._lead(key, loop)
+                self.misses += 1
+                return None
+
+        value = await self._wait(key, loop)
+        if value is None:
+            self.misses += 1
+            return None
+        # 먼저 호출한 쪽의 결과를 그대로 받으므로 이 호출도 캐시 적중으로 표시합니다.
+        self.coalesced += 1
+        return _mark_cache_hit(value)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        await asyncio.get_running_loop().run_in_executor(None, self._put, key, return_val)
+        self._release(key, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    # --- 실행 중인 호출 합치기 (singleflight) ---
+    def _lead(self, key: str, loop: asyncio.AbstractEventLoop):
+        future = loop.create_future()
+        self._inflight[key] = (loop, future)
+        # 호출이 실패하면 inflight_handler의 on_llm_error에서 풀어 줍니다.
+        run_id = _current_run.get()
+        if run_id is not None:
+            self._led_by.setdefault(run_id, []).append((key, future))
+        # 콜백 없이 호출이 취소된 경우에 대비해, 이 호출을 실행한 작업이 끝날 때도 풀어 줍니다.
+        task = asyncio.current_task()
+        if task is not None:
+            task.add_done_callback(lambda _: self._release(key, None, future))
+
+    def _finish(self, run_id: UUID):
+        """LLM 호출 run_id가 맡은 항목 중 아직 결과를 받지 못한 항목을 None으로 풀어 줍니다. (실패 시)"""
+        for key, future in self._led_by.pop(run_id, []):
+            self._release(key, None, future)
+
+    def _release(self, key: str, return_val: Optional[RETURN_VAL_TYPE], future: Optional[asyncio.Future] = None):
+        """기다리던 호출에 결과(실패 시 None)를 전달합니다. future를 주면 그 호출이 등록한 항목만 해제합니다."""
+        entry = self._inflight.get(key)
+        if entry is None or (future is not None and entry[1] is not future):
+            return
+        del self._inflight[key]
+        if not entry[1].done():
+            entry[1].set_result(return_val)
+
+    async def _wait(self, key: str, loop: asyncio.AbstractEventLoop) -> Optional[RETURN_VAL_TYPE]:
+        entry = self._inflight.get(key)
+        if entry is None or entry[0] is not loop:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry[1]), self.inflight_timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,187 @@
+# model/cache/semantic_cache.py
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from vectorDB.law_versions import get_law_versions
+from vectorDB.sparse_index import extract_citations
+
+# --- 시맨틱 캐시 설정 ---
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", "./cache/semantic_cache")
+# 질문 임베딩의 코사인 유사도가 이 값 이상이면 같은 질문으로 봅니다.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+
+class SemanticCache:
+    """
+    사용자가 승인한 답변을 질문 임베딩으로 저장하는 캐시입니다.
+    유사도 임계값, TTL, LRU 개수 제한을 적용하고 디스크에 저장합니다.
+    답변에 사용된 법률이 다시 수집되어 내용이 바뀌면(버전 변경) 해당 항목은 무효화됩니다.
+    조문 번호만 다른 질문('제23조 위반 시 벌칙'과 '제24조 위반 시 벌칙')은 임베딩이 거의 같으므로,
+    질문의 조문 인용과 검색한 법률이 저장된 항목과 정확히 같을 때만 적중으로 봅니다.
+    """
+
+    def __init__(self, embeddings: Embeddings, directory: str = SEMANTIC_CACHE_DIR,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: float = SEMANTIC_CACHE_TTL,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.directory = directory
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        # 정규화한 질문 벡터 행렬. _ids[i]가 _matrix[i]의 항목 ID입니다. (조회마다 행렬을 새로 만들지 않음)
+        self._ids: List[str] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    # --- 저장/불러오기 ---
+    @property
+    def _cache_path(self):
+        return os.path.join(self.directory, "cache.npz")
+
+    def _load(self):
+        # 항목(JSON)과 벡터를 한 파일에 저장하고 항목 ID로 맞춰 읽습니다. (한쪽에만 있는 ID는 버림)
+        if not os.path.exists(self._cache_path):
+            return
+        with np.load(self._cache_path) as data:
+            entries = json.loads(str(data["entries"]))
+            rows = {str(entry_id): i for i, entry_id in enumerate(data["ids"])}
+            matrix = np.asarray(data["vectors"], dtype=np.float32)
+        kept = []
+        for entry in entries:
+            if "citations" not in entry or entry.get("id") not in rows:
+                # 조문 인용을 기록하지 않던 이전 형식의 항목이나 벡터가 없는 항목은 버립니다.
+                continue
+            self.entries[entry["id"]] = entry
+            kept.append(rows[entry["id"]])
+        self._ids = list(self.entries)
+        self._matrix = matrix[kept] if kept else np.zeros((0, 0), dtype=np.float32)
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ids=np.array(self._ids, dtype=str), vectors=self._matrix,
+                     entries=np.array(json.dumps([self.entries[i] for i in self._ids], ensure_ascii=False)))
+        os.replace(tmp_path, self._cache_path)
+
+    # --- 조회/저장 ---
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    @staticmethod
+    def _key(question: str, laws: Optional[List[str]]) -> Tuple[List[str], Optional[List[str]]]:
+        """적중 조건으로 쓰는 (조문 인용, 법률) 키. 법률을 모르면 None"""
+        return sorted(set(extract_citations(question))), sorted(set(laws)) if laws is not None else None
+
+    def _is_valid(self, entry: dict, now: float, versions: dict) -> bool:
+        if now - entry["created_at"] > self.ttl:
+            return False
+        return all(versions.get(law) == version for law, version in entry["law_versions"].items())
+
+    def _evict(self, now: float):
+        """만료되었거나 근거 법률이 다시 수집된 항목을 지우고, 개수 제한을 넘으면 오래 쓰지 않은 항목부터 지웁니다."""
+        versions = get_law_versions()
+        expired = [i for i, e in self.entries.items() if not self._is_valid(e, now, versions)]
+        overflow = max(0, len(self.entries) - len(expired) - self.max_entries)
+        expired_set = set(expired)
+        expired += [i for i in self.entries if i not in expired_set][:overflow]
+        self._remove(expired)
+
+    def _remove(self, entry_ids: List[str]):
+        entry_ids = {i for i in entry_ids if i in self.entries}
+        if not entry_ids:
+            return
+        for entry_id in entry_ids:
+            del self.entries[entry_id]
+        keep = [row for row, entry_id in enumerate(self._ids) if entry_id not in entry_ids]
+        self._ids = [self._ids[row] for row in keep]
+        self._matrix = self._matrix[keep]
+
+    def _search(self, vector, question: str, laws: Optional[List[str]]) -> Optional[dict]:
+        query = self._normalize(vector)
+        citations, laws = self._key(question, laws)
+        with self._lock:
+            now = time.time()
+            self._evict(now)
+            if not self._ids:
+                self.misses += 1
+                return None
+            scores = self._matrix @ query
+            # 유사도가 높은 순으로 보면서 조문 인용과 법률이 같은 첫 항목을 사용합니다.
+            for row in np.argsort(-scores):
+                if scores[row] < self.threshold:
+                    break
+                entry = self.entries[self._ids[row]]
+                if entry["citations"] != citations or (laws is not None and entry["laws"] != laws):
+                    continue
+                self.entries.move_to_end(entry["id"])
+                self.hits += 1
+                return {**entry, "similarity": float(scores[row])}
+            self.misses += 1
+            return None
+
+    def lookup(self, question: str, laws: Optional[List[str]] = None) -> Optional[dict]:
+        """
+        유사한 질문의 캐시 항목을 반환합니다. 없으면 None을 반환합니다.
+        laws를 주면 그 법률로 검색해 만든 답변만 사용합니다. (조문 인용은 항상 같아야 함)
+        """
+        return self._search(self.embeddings.embed_query(question), question, laws)
+
+    async def alookup(self, question: str, laws: Optional[List[str]] = None) -> Optional[dict]:
+        return self._search(await self.embeddings.aembed_query(question), question, laws)
+
+    def _put(self, vector, question: str, answer: str, evaluation_report: Optional[dict],
+             laws: List[str]) -> str:
+        versions = get_law_versions()
+        citations, laws = self._key(question, laws)
+        entry_id = uuid.uuid4().hex
+        with self._lock:
+            self.entries[entry_id] = {
+                "id": entry_id,
+                "question": question,
+                "answer": answer,
+                "evaluation_report": evaluation_report or {},
+                "citations": citations,
+                "laws": laws,
+                "law_versions": {law: versions.get(law) for law in laws},
+                "created_at": time.time(),
+            }
+            row = self._normalize(vector)[None, :]
+            self._matrix = np.concatenate([self._matrix, row]) if self._ids else row
+            self._ids.append(entry_id)
+            self._evict(time.time())
+            self._save()
+        return entry_id
+
+    def put(self, question: str, answer: str, evaluation_report: Optional[dict] = None,
+            laws: Optional[List[str]] = None) -> str:
+        """승인된 답변을 근거 법률 목록과 함께 저장하고 항목 ID를 반환합니다."""
+        return self._put(self.embeddings.embed_query(question), question, answer, evaluation_report, laws or [])
+
+    async def aput(self, question: str, answer: str, evaluation_report: Optional[dict] = None,
+                   laws: Optional[List[str]] = None) -> str:
+        vector = await self.embeddings.aembed_query(question)
+        return self._put(vector, question, answer, evaluation_report, laws or [])
+
+    def invalidate(self, entry_id: str):
+        """사용자가 거절한 캐시 답변 등을 삭제합니다."""
+        with self._lock:
+            self._remove([entry_id])
+            self._save()
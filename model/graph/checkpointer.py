@@ -0,0 +1,206 @@
+# model/graph/checkpointer.py
+
+import asyncio
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, AsyncIterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+# --- 체크포인터 설정 ---
+# sqlite: 디스크 기반(재시작 후에도 유지, 같은 호스트의 여러 워커 프로세스가 공유), memory: 프로세스 메모리(테스트용)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "./checkpoints/legal_rag_agent.sqlite3")
+# 마지막 사용 후 이 시간(초)이 지난 대화 스레드는 삭제합니다.
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", str(24 * 3600)))
+# 보관할 최대 스레드 수와 최대 저장 용량(바이트). 넘으면 오래된 스레드부터 삭제합니다.
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "5000"))
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(512 * 1024 * 1024)))
+# 스레드(네임스페이스)별로 남겨 둘 최근 체크포인트 수. 재개(resume)에는 마지막 체크포인트만 필요합니다.
+CHECKPOINT_HISTORY = int(os.getenv("CHECKPOINT_HISTORY", "3"))
+# 몇 번 저장할 때마다 TTL/용량 정리를 수행할지
+CHECKPOINT_PRUNE_EVERY = int(os.getenv("CHECKPOINT_PRUNE_EVERY", "50"))
+# 이보다 큰 직렬화 값만 압축합니다.
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "512"))
+
+_ZLIB_SUFFIX = "+zlib"
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    JsonPlusSerializer 결과를 zlib으로 압축하는 직렬화기입니다.
+    검색된 Document와 InformationStrip처럼 반복이 많은 한국어 본문이 상태의 대부분을 차지하므로 크기가 크게 줄어듭니다.
+    압축한 값은 타입 이름에 '+zlib'을 붙여 구분하므로 압축하지 않은 이전 값도 그대로 읽을 수 있습니다.
+    """
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None,
+                 min_size: int = CHECKPOINT_COMPRESS_MIN_BYTES, level: int = 6):
+        self.inner = inner or JsonPlusSerializer()
+        self.min_size = min_size
+        self.level = level
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) >= self.min_size:
+            return type_ + _ZLIB_SUFFIX, zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(_ZLIB_SUFFIX):
+            return self.inner.loads_typed((type_[:-len(_ZLIB_SUFFIX)], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+
+class PrunedSqliteSaver(SqliteSaver):
+    """
+    TTL과 용량 제한이 있는 SQLite 체크포인터입니다.
+    - 스레드별 마지막 사용 시각을 기록하고, 일정 횟수 저장마다 만료된 스레드와 용량/개수 제한을 넘는 오래된 스레드를 삭제합니다.
+    - 각 스레드에는 최근 CHECKPOINT_HISTORY개의 체크포인트만 남깁니다.
+    - 비동기 메서드는 동기 구현을 스레드 풀에서 실행하므로 그래프의 ainvoke/astream에서 그대로 사용할 수 있습니다.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, ttl: float = CHECKPOINT_TTL,
+                 max_threads: int = CHECKPOINT_MAX_THREADS, max_bytes: int = CHECKPOINT_MAX_BYTES,
+                 history: int = CHECKPOINT_HISTORY, prune_every: int = CHECKPOINT_PRUNE_EVERY,
+                 serde: Optional[SerializerProtocol] = None):
+        super().__init__(conn, serde=serde or CompressedSerializer())
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.history = history
+        self.prune_every = prune_every
+        self._puts = 0
+
+    @classmethod
+    def from_path(cls, path: str = CHECKPOINT_PATH, **kwargs) -> "PrunedSqliteSaver":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # 여러 워커 프로세스가 같은 파일을 쓸 수 있도록 WAL 모드를 사용하고, 삭제한 페이지는 점진적으로 반환합니다.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return cls(conn, **kwargs)
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS thread_activity (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_thread_activity_updated ON thread_activity (updated_at);
+            """
+        )
+
+    # --- 저장 및 정리 ---
+    def put(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) VALUES (?, ?)",
+                (thread_id, time.time()),
+            )
+            self._trim_history(cur, thread_id, checkpoint_ns)
+
+        self._puts += 1
+        if self.prune_every and self._puts % self.prune_every == 0:
+            self.prune()
+        return next_config
+
+    def _trim_history(self, cur, thread_id: str, checkpoint_ns: str):
+        """해당 스레드/네임스페이스의 최근 history개를 제외한 체크포인트와 쓰기 기록을 삭제합니다."""
+        keep = """
+            SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT ?
+        """
+        params = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.history)
+        for table in ("checkpoints", "writes"):
+            cur.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})",
+                params,
+            )
+
+    def _delete_threads(self, cur, thread_ids: Sequence[str]):
+        for table in ("checkpoints", "writes", "thread_activity"):
+            cur.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def prune(self) -> int:
+        """만료된 스레드와 개수/용량 제한을 넘는 오래된 스레드를 삭제하고 삭제한 스레드 수를 반환합니다."""
+        with self.cursor() as cur:
+            expired = [row[0] for row in cur.execute(
+                "SELECT thread_id FROM thread_activity WHERE updated_at < ?", (time.time() - self.ttl,)
+            ).fetchall()]
+            self._delete_threads(cur, expired)
+
+            # 최근 사용 순으로 스레드별 저장 크기를 구해, 개수/용량 제한 안에 드는 스레드만 남깁니다.
+            sizes = cur.execute(
+                """
+                SELECT a.thread_id,
+                       COALESCE((SELECT SUM(LENGTH(checkpoint) + LENGTH(metadata)) FROM checkpoints c
+                                 WHERE c.thread_id = a.thread_id), 0)
+                     + COALESCE((SELECT SUM(LENGTH(value)) FROM writes w WHERE w.thread_id = a.thread_id), 0)
+                FROM thread_activity a ORDER BY a.updated_at DESC
+                """
+            ).fetchall()
+            total, overflow = 0, []
+            for index, (thread_id, size) in enumerate(sizes):
+                total += size
+                if index >= self.max_threads or total > self.max_bytes:
+                    overflow.append(thread_id)
+            self._delete_threads(cur, overflow)
+            cur.execute("PRAGMA incremental_vacuum")
+
+        removed = len(expired) + len(overflow)
+        if removed:
+            print(f"---체크포인트 정리: 스레드 {removed}개 삭제 (만료 {len(expired)}개)---")
+        return removed
+
+    # --- 비동기 인터페이스 (동기 구현을 스레드 풀에서 실행) ---
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.put_writes, config, writes, task_id, task_path)
+
+
+def create_checkpointer(backend: str = CHECKPOINT_BACKEND):
+    """설정된 백엔드의 체크포인터를 생성합니다."""
+    if backend == "memory":
+        return MemorySaver()
+    if backend == "sqlite":
+        return PrunedSqliteSaver.from_path()
+    raise ValueError(f"지원하지 않는 체크포인터 백엔드입니다: {backend}")
@@ -0,0 +1,127 @@
+# model/graph/evaluation.py
+
+import asyncio
+import contextvars
+import json
+import os
+import uuid
+from typing import List, Optional
+
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import BaseTool, StructuredTool
+from langgraph.prebuilt import create_react_agent
+
+from model.llm import get_llm
+from model.prompts.prompt import evaluation_prompt
+from model.tools.langchain_tools import tools
+from util.batching import LRUCache
+from util.registry import registry
+
+# --- 답변 평가 설정 ---
+# 평가 에이전트가 추가 검색 도구를 호출할 수 있는 최대 횟수 (0이면 이번 실행에서 검색한 근거 문서만으로 평가)
+EVALUATION_MAX_TOOL_CALLS = int(os.getenv("EVALUATION_MAX_TOOL_CALLS", "1"))
+# 평가 에이전트에 넘길 근거 문서의 최대 길이(문자)
+EVALUATION_MAX_EVIDENCE_CHARS = int(os.getenv("EVALUATION_MAX_EVIDENCE_CHARS", "12000"))
+EVALUATION_TIMEOUT = float(os.getenv("EVALUATION_TIMEOUT", "90"))
+# 결과를 보관할 최근 평가 작업 수
+EVALUATION_MAX_JOBS = int(os.getenv("EVALUATION_MAX_JOBS", "1000"))
+
+# 평가가 끝나기 전까지 상태에 넣어 두는 보고서
+PENDING_REPORT = {"status": "pending", "total_score": "N/A", "brief_evaluation": "평가 중입니다."}
+
+
+def is_pending(report: Optional[dict]) -> bool:
+    return bool(report) and report.get("status") == "pending"
+
+
+def _budgeted_tools(max_calls: int) -> List[BaseTool]:
+    """호출 횟수가 max_calls로 제한된 검색 도구. 한도를 넘으면 검색 대신 안내 문구를 돌려줍니다."""
+    if max_calls <= 0:
+        return []
+    remaining = [max_calls]
+
+    def wrap(base: BaseTool) -> BaseTool:
+        async def _run(**kwargs):
+            if remaining[0] <= 0:
+                return "도구 호출 한도를 모두 사용했습니다. 제공된 근거 문서만으로 평가하세요."
+            remaining[0] -= 1
+            return await base.ainvoke(kwargs)
+
+        return StructuredTool.from_function(
+            coroutine=_run, name=base.name, description=base.description, args_schema=base.args_schema
+        )
+
+    return [wrap(base) for base in tools]
+
+
+def _parse_report(content: str) -> dict:
+    """평가 에이전트 출력에서 JSON 보고서를 꺼냅니다. (코드 블록 등으로 감싼 경우 포함)"""
+    start, end = content.find("{"), content.rfind("}")
+    try:
+        return json.loads(content[start:end + 1])
+    except ValueError:
+        return {"total_score": "N/A", "brief_evaluation": "평가 결과를 해석하지 못했습니다."}
+
+
+async def evaluate_answer(question: str, answer: str, evidence: List[str],
+                          max_tool_calls: int = EVALUATION_MAX_TOOL_CALLS) -> dict:
+    """이번 실행에서 검색한 근거 문서로 답변을 평가합니다. 근거가 부족할 때만 제한된 횟수로 추가 검색합니다."""
+    evidence_text = "\n\n".join(evidence)[:EVALUATION_MAX_EVIDENCE_CHARS] or "(검색된 근거 문서 없음)"
+    content = (
+        f'"""[질문]\n{question}\n\n[답변]\n{answer}\n\n[근거 문서]\n{evidence_text}"""\n'
+        f"추가 검색 도구는 최대 {max_tool_calls}회까지만 사용할 수 있습니다."
+    )
+    reviewer = create_react_agent(get_llm(), tools=_budgeted_tools(max_tool_calls), state_modifier=evaluation_prompt)
+    try:
+        # UI 스트림이 끝난 뒤에도 실행되므로 상위 실행의 콜백, 스레드 ID, 체크포인터와 분리합니다.
+        response = await asyncio.wait_for(
+            reviewer.ainvoke(
+                {"messages": [HumanMessage(content=content)]},
+                config={"callbacks": [], "configurable": {}, "recursion_limit": 2 * max_tool_calls + 5},
+            ),
+            EVALUATION_TIMEOUT,
+        )
+    except Exception as e:
+        print(f"---답변 평가 실패: {e}---")
+        return {"total_score": "N/A", "brief_evaluation": "평가를 완료하지 못했습니다."}
+    return _parse_report(response["messages"][-1].content)
+
+
+class EvaluationJobs:
+    """
+    답변 평가를 백그라운드 작업으로 실행하고 작업 ID로 결과를 조회합니다.
+    답변은 평가를 기다리지 않고 바로 사용자에게 보여주고, 점수는 준비되는 대로 붙입니다.
+    """
+
+    def __init__(self, max_jobs: int = EVALUATION_MAX_JOBS):
+        self._tasks = LRUCache(max_jobs)
+
+    def start(self, question: str, answer: str, evidence: List[str]) -> str:
+        job_id = str(uuid.uuid4())
+        # 노드 실행 컨텍스트(상위 그래프 설정)를 물려받으면 평가 에이전트가 사용자 스레드에 체크포인트를 쓰므로
+        # 빈 컨텍스트에서 실행합니다. (create_task의 context 인자는 Python 3.11부터 있으므로 Context.run으로 생성)
+        task = contextvars.Context().run(asyncio.create_task, evaluate_answer(question, answer, evidence))
+        self._tasks.put(job_id, task)
+        return job_id
+
+    def peek(self, job_id: Optional[str]) -> Optional[dict]:
+        """완료된 평가 결과를 반환합니다. 아직 진행 중이거나 없는 작업이면 None"""
+        task = self._tasks.get(job_id) if job_id else None
+        return task.result() if task is not None and task.done() and not task.cancelled() else None
+
+    async def result(self, job_id: Optional[str], timeout: Optional[float] = None) -> Optional[dict]:
+        """평가가 끝날 때까지 최대 timeout초 기다립니다. 시간이 지나거나 작업이 없으면 None"""
+        task = self._tasks.get(job_id) if job_id else None
+        if task is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+@registry.resource("evaluation_jobs")
+def _create_evaluation_jobs():
+    return EvaluationJobs()
+
+get_evaluation_jobs = registry.getter("evaluation_jobs")
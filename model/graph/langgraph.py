@@ -1,14 +1,20 @@
 # model/graph/langgraph.py
 
+import asyncio
+
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 
 from schemas.schema import (
-    ResearchAgentState, PersonalRagState, LaborRagState, HousingRagState, SearchRagState
+    ResearchAgentState, LawRagState, SearchRagState
 )
 from model.graph.nodes import create_rag_nodes, analyze_question_tool_search, route_datasources_tool_search, \
-    answer_final, llm_fallback, evaluate_answer_node, human_review_node
-from model.tools.langchain_tools import personal_law_search, labor_law_search, housing_law_search, web_search
+    answer_final, llm_fallback, evaluate_answer_node, human_review_node, lookup_article_node, route_article_lookup, \
+    check_cache_node, route_cache, route_human_review
+from model.tools.langchain_tools import law_search, web_search
+from model.graph.checkpointer import create_checkpointer
+from util.budget import get_budget
+from util.registry import registry
 
 # --- Corrective RAG 에이전트 생성 함수 ---
 def create_rag_agent(law_name: str, search_tool: callable, state_type: type):
@@ -33,38 +39,76 @@ def create_rag_agent(law_name: str, search_tool: callable, state_type: type):
     return workflow.compile()
 
 # --- 각 RAG 에이전트 컴파일 ---
-personal_law_agent = create_rag_agent("개인정보보호법", personal_law_search, PersonalRagState)
-labor_law_agent = create_rag_agent("근로기준법", labor_law_search, LaborRagState)
-housing_law_agent = create_rag_agent("주택임대차보호법", housing_law_search, HousingRagState)
+# 법률 에이전트는 라우터가 고른 법률(laws)들을 하나의 통합 인덱스에서 한 번에 검색합니다.
+law_agent = create_rag_agent("법률", law_search, LawRagState)
 search_web_agent = create_rag_agent("인터넷 검색", web_search, SearchRagState)
 
 # --- Supervisor 노드 정의 ---
-def personal_rag_node_supervisor(state: ResearchAgentState) -> dict:
-    question = state["question"]
-    result = personal_law_agent.invoke({"question": question})
-    return {"answers": [result["node_answer"]]}
-
-def labor_rag_node_supervisor(state: ResearchAgentState) -> dict:
-    question = state["question"]
-    result = labor_law_agent.invoke({"question": question})
-    return {"answers": [result["node_answer"]]}
-
-def housing_rag_node_supervisor(state: ResearchAgentState) -> dict:
-    question = state["question"]
-    result = housing_law_agent.invoke({"question": question})
-    return {"answers": [result["node_answer"]]}
-
-def web_rag_node_supervisor(state: ResearchAgentState) -> dict:
-    question = state["question"]
-    result = search_web_agent.invoke({"question": question})
-    return {"answers": [result["node_answer"]]}
+def format_evidence(documents) -> list:
+    """sub-agent가 마지막으로 검색한 문서를 답변 평가의 근거로 남깁니다. (평가 시 다시 검색하지 않도록)"""
+    def source(doc):
+        law_article = " ".join(filter(None, [doc.metadata.get("law"), doc.metadata.get("article")]))
+        return doc.metadata.get("url") or law_article or doc.metadata.get("source", "알 수 없음")
+
+    return [f"{doc.page_content}\n(출처: {source(doc)})" for doc in documents]
+
+async def run_within_budget(name: str, coro, config: RunnableConfig):
+    """
+    질문 예산의 남은 시간 안에 sub-agent를 실행합니다. 시간을 넘기면 취소하고 None을 반환합니다. (다른 검색 결과로 답변)
+    실행하는 동안 sub-agent 답변 생성(generate_node_answer) 1회의 호출 몫을 예약해 문서 평가가 쓰지 못하게 합니다.
+    """
+    budget = get_budget(config)
+    if budget is None:
+        return await coro
+    budget.reserve(1)
+    try:
+        return await asyncio.wait_for(coro, budget.remaining_time())
+    except asyncio.TimeoutError:
+        budget.skip(f"{name} 시간 초과로 취소 ({budget.elapsed():.1f}초)")
+        return None
+    finally:
+        budget.release(1)
+
+def research_question(state: ResearchAgentState) -> str:
+    """출처가 잘못되었다는 의견으로 다시 검색할 때는 의견을 질문에 덧붙여 다른 문서를 찾게 합니다."""
+    if state.get("review_action") == "research" and state.get("user_feedback"):
+        return f"{state['question']}\n(이전 검색 결과에 대한 사용자 의견: {state['user_feedback']})"
+    return state["question"]
+
+# config를 넘겨 sub-agent 내부 노드의 진행 이벤트도 상위 그래프의 astream_events로 전달되게 합니다.
+async def law_rag_node_supervisor(state: ResearchAgentState, config: RunnableConfig) -> dict:
+    question = research_question(state)
+    result = await run_within_budget(
+        "search_law", law_agent.ainvoke(
+            {"question": question, "laws": state.get("laws", []), "prefetch_id": state.get("prefetch_id")},
+            config=config,
+        ), config
+    )
+    if result is None:
+        return {"answers": {}}
+    return {
+        "answers": {"search_law": result["node_answer"]},
+        "evidence": {"search_law": format_evidence(result.get("documents", []))},
+    }
+
+async def web_rag_node_supervisor(state: ResearchAgentState, config: RunnableConfig) -> dict:
+    question = research_question(state)
+    result = await run_within_budget(
+        "search_web", search_web_agent.ainvoke({"question": question}, config=config), config
+    )
+    if result is None:
+        return {"answers": {}}
+    return {
+        "answers": {"search_web": result["node_answer"]},
+        "evidence": {"search_web": format_evidence(result.get("documents", []))},
+    }
 
 # --- Supervisor 그래프 빌드 ---
 nodes = {
+    "lookup_article": lookup_article_node,
+    "check_cache": check_cache_node,
     "analyze_question": analyze_question_tool_search,
-    "search_personal": personal_rag_node_supervisor,
-    "search_labor": labor_rag_node_supervisor,
-    "search_housing": housing_rag_node_supervisor,
+    "search_law": law_rag_node_supervisor,
     "search_web": web_rag_node_supervisor,
     "generate_answer": answer_final,
     "llm_fallback": llm_fallback,
@@ -77,28 +121,52 @@ search_builder = StateGraph(ResearchAgentState)
 for node_name, node_func in nodes.items():
     search_builder.add_node(node_name, node_func)
 
-search_builder.add_edge(START, "analyze_question")
+# 조문 번호 조회 질문은 supervisor 그래프를 거치지 않고 바로 사용자 검토로 넘어갑니다.
+search_builder.add_edge(START, "lookup_article")
+search_builder.add_conditional_edges(
+    "lookup_article",
+    route_article_lookup,
+    {"found": "human_review", "not_found": "check_cache"}
+)
+# 이전에 승인된 답변과 비슷한 질문이면 라우팅/검색/평가를 건너뛰고 사용자 검토로 넘어갑니다.
+search_builder.add_conditional_edges(
+    "check_cache",
+    route_cache,
+    {"hit": "human_review", "miss": "analyze_question"}
+)
 search_builder.add_conditional_edges(
     "analyze_question",
     route_datasources_tool_search,
-    ["search_personal", "search_labor", "search_housing", "search_web", "llm_fallback"]
+    ["search_law", "search_web", "llm_fallback"]
 )
 
-for node in ["search_personal", "search_labor", "search_housing", "search_web"]:
+for node in ["search_law", "search_web"]:
     search_builder.add_edge(node, "generate_answer")
 
 search_builder.add_edge("generate_answer", "evaluate_answer")
 search_builder.add_edge("evaluate_answer", "human_review")
+# 거절되면 이전 검색 결과로 답변만 다시 쓰거나(generate_answer), 출처가 문제인 검색 노드만 다시 실행합니다.
+# 검색 결과가 없는 답변(캐시/조문 조회)만 처음부터 다시 라우팅합니다.
 search_builder.add_conditional_edges(
     "human_review",
-    lambda x: "approved" if x.get("user_decision") == "approved" else "rejected",
+    route_human_review,
     {
         "approved": END,
-        "rejected": "analyze_question"
+        "generate_answer": "generate_answer",
+        "search_law": "search_law",
+        "search_web": "search_web",
+        "analyze_question": "analyze_question",
     }
 )
 search_builder.add_edge("llm_fallback", END)
 
 # --- 최종 그래프 컴파일 ---
-memory = MemorySaver()
-legal_rag_agent = search_builder.compile(checkpointer=memory, interrupt_before=["human_review"])
\ No newline at end of file
+# 대화 상태는 TTL/용량 제한이 있는 SQLite 체크포인터에 저장합니다. (CHECKPOINT_BACKEND=memory로 메모리 저장 가능)
+# import만으로 SQLite 파일/디렉터리가 생기지 않도록 처음 사용할 때 체크포인터를 만들고 컴파일합니다.
+registry.register("checkpointer", create_checkpointer)
+
+@registry.resource("legal_rag_agent")
+def _create_legal_rag_agent():
+    return search_builder.compile(checkpointer=registry.get("checkpointer"), interrupt_before=["human_review"])
+
+get_legal_rag_agent = registry.getter("legal_rag_agent")
@@ -1,133 +1,488 @@
 # model/graph/nodes.py
 
-from typing import Literal, List
-import json
+from typing import Literal, List, Optional
+import asyncio
+import contextvars
+import os
+import time
 
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
 from schemas.schema import (
-    ResearchAgentState, PersonalRagState, LaborRagState, HousingRagState, SearchRagState,
-    ExtractedInformation, RefinedQuestion
+    ResearchAgentState, ExtractedInformation, InformationStrip, RefinedQuestion
 )
 from model.prompts.prompt import (
     get_extract_prompt, get_rewrite_prompt, get_answer_prompt,
-    route_prompt, rag_prompt, fallback_prompt
+    route_prompt, rag_prompt, regenerate_prompt, fallback_prompt, article_explain_prompt
 )
-from model.tools.langchain_tools import (
-    personal_law_search, labor_law_search, housing_law_search, web_search, tools
-)
-from model.llm import llm, structured_llm_tool_selector
-from langgraph.prebuilt import create_react_agent
+from model.llm import get_llm, get_tool_selector
+from model.cache.semantic_cache import SemanticCache
+from model.graph.evaluation import PENDING_REPORT, get_evaluation_jobs, is_pending
+from model.graph.speculation import SPECULATIVE_RETRIEVAL, get_speculative_retrievals
+from model.tools.langchain_tools import law_search_from_candidates
+from util.budget import get_budget
+from util.registry import registry
+from vectorDB.article_store import match_article_query
+from vectorDB.retrieval import get_article_store, get_available_laws, get_law_router, get_query_embeddings
+
+# --- 문서 평가 설정 ---
+# 문서별 추출/평가 LLM 호출을 동시에 몇 개까지 실행할지 지정합니다.
+GRADING_MAX_CONCURRENCY = int(os.getenv("GRADING_MAX_CONCURRENCY", "8"))
+QUERY_RELEVANCE_THRESHOLD = 0.8
+STRIP_RELEVANCE_THRESHOLD = 0.7
+STRIP_FAITHFULNESS_THRESHOLD = 0.7
+# 재순위화 최고 점수가 이 값 이상이면 LLM 추출/평가 없이 해당 문서들을 바로 근거로 사용합니다. (0이면 사용 안 함)
+RERANK_EARLY_EXIT_SCORE = float(os.getenv("RERANK_EARLY_EXIT_SCORE", "0.9"))
+# sub-agent의 검색-평가-재작성 반복 최대 횟수
+RAG_MAX_ITERATIONS = int(os.getenv("RAG_MAX_ITERATIONS", "2"))
+
+# --- 라우팅 설정 ---
+# 질문 임베딩과 법률별 대표 벡터로 먼저 라우팅하고, 확신이 낮을 때만 LLM 라우터를 호출합니다.
+LOCAL_ROUTER_ENABLED = os.getenv("LOCAL_ROUTER_ENABLED", "1") == "1"
+
+# 사용자에게 보여줄 최종 답변을 만드는 체인에 붙이는 태그. UI는 이 태그가 붙은 LLM 토큰만 스트리밍합니다.
+FINAL_ANSWER_TAG = "final_answer"
 
 # --- Corrective RAG 노드 생성 함수 ---
-def create_rag_nodes(law_name: str, search_tool: callable, state_type: type):
-    
-    def retrieve_documents(state: state_type) -> state_type:
-        print(f"---{law_name} 문서 검색---")
-        query = state.get("rewritten_query", state["question"])
-        docs = search_tool.invoke(query)
-        return {"documents": docs}
+def create_rag_nodes(law_name: str, search_tool: callable, state_type: type,
+                     max_concurrency: int = GRADING_MAX_CONCURRENCY):
+    """
+    law_name은 프롬프트의 전문 분야 이름입니다. 상태에 laws(검색할 법률 목록)가 있으면
+    그 법률들로 검색을 제한하고 프롬프트에도 해당 법률 이름을 사용합니다.
+    """
+    def _label(state) -> str:
+        return ", ".join(state.get("laws") or []) or law_name
 
-    def extract_and_evaluate_information(state: state_type) -> state_type:
-        print(f"---{law_name} 정보 추출 및 평가---")
+    # 프롬프트와 LLM 체인은 전문 분야 이름별로 처음 사용할 때 한 번만 구성합니다.
+    def chains(label: str) -> dict:
+        def _create_chains():
+            llm = get_llm()
+            source_example = f"{label.split(', ')[0]} 제15조" if "법" in label else "블로그 (www.example.com)"
+            return {
+                "extract": get_extract_prompt(label) | llm.with_structured_output(ExtractedInformation),
+                "rewrite": get_rewrite_prompt(label) | llm.with_structured_output(RefinedQuestion),
+                "answer": get_answer_prompt(label, source_example) | llm | StrOutputParser(),
+            }
+        return registry.get_or_create(f"rag_chains:{label}", _create_chains)
+
+    async def _grade_document(inputs: dict, config: RunnableConfig) -> dict:
+        start = time.perf_counter()
+        result = await chains(inputs["label"])["extract"].ainvoke(inputs["prompt"], config=config)
+        return {"result": result, "elapsed": time.perf_counter() - start}
+
+    # 문서 하나를 평가하고 소요 시간을 함께 반환하는 Runnable (abatch 대상)
+    grade_document = RunnableLambda(_grade_document, name="grade_document")
+
+    def _grading_inputs(state: state_type) -> List[dict]:
+        label = _label(state)
+        return [
+            {"label": label, "prompt": {"question": state["question"], "document_content": doc.page_content}}
+            for doc in state["documents"]
+        ]
+
+    def _collect_strips(state: state_type, outputs: list, wall_time: float) -> dict:
+        """평가 결과에 임계값을 적용하고 문서별 소요 시간을 기록합니다."""
         extracted_strips = []
-        extract_prompt = get_extract_prompt(law_name)
-        extract_llm = llm.with_structured_output(ExtractedInformation)
-        
-        for doc in state["documents"]:
-            extracted_data = extract_llm.invoke({
-                "question": state["question"],
-                "document_content": doc.page_content
-            })
-            if extracted_data.query_relevance < 0.8:
+        document_timings = []
+        for index, (doc, output) in enumerate(zip(state["documents"], outputs)):
+            timing = {"index": index, "source": doc.metadata.get("source")}
+            if isinstance(output, Exception):
+                print(f"---{law_name} 문서 {index} 평가 실패: {output}---")
+                document_timings.append({**timing, "elapsed": None, "error": str(output)})
                 continue
-            for strip in extracted_data.strips:
-                if strip.relevance_score > 0.7 and strip.faithfulness_score > 0.7:
-                    extracted_strips.append(strip)
-        
+
+            extracted_data = output["result"]
+            kept = []
+            if extracted_data.query_relevance >= QUERY_RELEVANCE_THRESHOLD:
+                kept = [
+                    strip for strip in extracted_data.strips
+                    if strip.relevance_score > STRIP_RELEVANCE_THRESHOLD
+                    and strip.faithfulness_score > STRIP_FAITHFULNESS_THRESHOLD
+                ]
+            extracted_strips.extend(kept)
+            document_timings.append({
+                **timing,
+                "elapsed": round(output["elapsed"], 4),
+                "query_relevance": extracted_data.query_relevance,
+                "kept_strips": len(kept),
+            })
+
+        num_generations = state.get("num_generations", 0) + 1
         return {
             "extracted_info": extracted_strips,
-            "num_generations": state.get("num_generations", 0) + 1
+            "num_generations": num_generations,
+            "grading_timings": [{
+                "iteration": num_generations,
+                "wall_time": round(wall_time, 4),
+                "max_concurrency": max_concurrency,
+                "documents": document_timings,
+            }],
         }
 
-    def rewrite_query(state: state_type) -> state_type:
+    async def retrieve_documents(state: state_type) -> state_type:
+        print(f"---{law_name} 문서 검색---")
+        query = state.get("rewritten_query", state["question"])
+        laws = state.get("laws")
+        # 라우팅 중에 미리 가져온 검색 후보가 있으면 재순위화와 부모 조문 확장만 합니다. (첫 검색에만 해당)
+        candidates = await get_speculative_retrievals().take(state["prefetch_id"], query, laws) if state.get("prefetch_id") else None
+        if candidates is not None:
+            return {"documents": await law_search_from_candidates(query, laws, candidates)}
+        # 여러 법률을 선택해도 법률 필터 하나로 한 번만 검색합니다.
+        docs = await search_tool.ainvoke({"query": query, "laws": laws} if laws else query)
+        return {"documents": docs}
+
+    def _strips_from_scores(docs, min_score: float, keep_unscored: bool = False) -> List[InformationStrip]:
+        """
+        재순위화 점수(relevance_score)가 min_score 이상인 문서를 그대로 정보 조각으로 사용합니다.
+        keep_unscored=True이면 점수가 없는 문서도 0점으로 포함합니다.
+        """
+        strips = []
+        for doc in docs:
+            score = doc.metadata.get("relevance_score")
+            if score is None and keep_unscored:
+                score = 0.0
+            if score is None or score < min_score:
+                continue
+            source = " ".join(filter(None, [doc.metadata.get("law"), doc.metadata.get("article")]))
+            score = min(max(float(score), 0.0), 1.0)
+            strips.append(InformationStrip(
+                content=doc.page_content, source=source or doc.metadata.get("source", ""),
+                relevance_score=score, faithfulness_score=score,
+            ))
+        return strips
+
+    async def extract_and_evaluate_information(state: state_type, config: RunnableConfig) -> state_type:
+        print(f"---{law_name} 정보 추출 및 평가---")
+        budget = get_budget(config)
+        docs = state["documents"]
+
+        # 재순위화 점수가 충분히 높으면 문서별 LLM 추출을 건너뜁니다.
+        if RERANK_EARLY_EXIT_SCORE and docs and (docs[0].metadata.get("relevance_score") or 0) >= RERANK_EARLY_EXIT_SCORE:
+            print(f"---{law_name} 재순위화 점수로 조기 종료 (최고 {docs[0].metadata['relevance_score']:.3f})---")
+            num_generations = state.get("num_generations", 0) + 1
+            return {
+                "extracted_info": _strips_from_scores(docs, RERANK_EARLY_EXIT_SCORE),
+                "num_generations": num_generations,
+                "grading_timings": [{"iteration": num_generations, "wall_time": 0.0, "early_exit": True, "documents": []}],
+            }
+
+        # 남은 예산만큼만 상위 문서부터 평가합니다. (문서는 재순위화 순서)
+        inputs = _grading_inputs(state)
+        affordable = None
+        if budget is not None:
+            affordable = budget.affordable_calls() if budget.allows(llm_calls=1) else 0
+        if affordable is not None and affordable < len(inputs):
+            budget.skip(f"{law_name} 문서 {len(inputs) - affordable}개 평가 생략")
+            inputs = inputs[:affordable]
+
+        start = time.perf_counter()
+        outputs = await grade_document.abatch(
+            inputs,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        ) if inputs else []
+        result = _collect_strips(state, outputs, time.perf_counter() - start)
+        result["ungraded"] = not inputs
+        if not inputs:
+            # 평가할 예산이 없으면 재순위화 순서대로 문서를 근거로 사용합니다.
+            # 점수는 LLM 평가가 아닌 재순위화 점수이며, ungraded로 표시해 반복 여부 판단에 쓰지 않습니다.
+            result["extracted_info"] = _strips_from_scores(docs, 0.0, keep_unscored=True)
+        return result
+
+    async def rewrite_query(state: state_type) -> state_type:
         print(f"---{law_name} 쿼리 재작성---")
-        rewrite_prompt = get_rewrite_prompt(law_name)
         extracted_info_str = "\\n".join([strip.content for strip in state["extracted_info"]])
-        rewrite_llm = llm.with_structured_output(RefinedQuestion)
         
-        response = rewrite_llm.invoke({
+        response = await chains(_label(state))["rewrite"].ainvoke({
             "question": state["question"],
             "extracted_info": extracted_info_str
         })
         
         return {"rewritten_query": response.question_refined}
 
-    def generate_node_answer(state: state_type) -> state_type:
+    async def generate_node_answer(state: state_type) -> state_type:
         print(f"---{law_name} 답변 생성---")
-        source_example = f"{law_name} 제15조" if "법" in law_name else "블로그 (www.example.com)"
-        answer_prompt = get_answer_prompt(law_name, source_example)
         extracted_info_str = "\\n".join([f"내용: {s.content}\\n출처: {s.source}" for s in state["extracted_info"]])
         
-        node_answer = answer_prompt.invoke({
+        node_answer = await chains(_label(state))["answer"].ainvoke({
             "question": state["question"],
             "extracted_info": extracted_info_str
         })
         
-        return {"node_answer": node_answer.content}
+        return {"node_answer": node_answer}
 
-    def should_continue(state: state_type) -> Literal["continue", "end"]:
-        if state["num_generations"] >= 2:
+    def should_continue(state: state_type, config: RunnableConfig) -> Literal["continue", "end"]:
+        if state["num_generations"] >= RAG_MAX_ITERATIONS:
+            return "end"
+        if state.get("ungraded"):
+            # 평가할 예산도 없었으므로 재작성 반복 없이 가진 문서로 답합니다.
             return "end"
         if state.get("extracted_info") and len(state["extracted_info"]) >= 1:
             return "end"
+        budget = get_budget(config)
+        if budget is not None:
+            # 한 번 더 반복하려면 재작성 1회 + 문서 평가의 호출과 직전 반복 정도의 시간이 필요합니다. (답변 1회는 예약됨)
+            timings = state.get("grading_timings") or [{}]
+            needed_calls = 1 + len(state.get("documents", []))
+            if not budget.allows(llm_calls=needed_calls, seconds=2 * timings[-1].get("wall_time", 0.0)):
+                budget.skip(f"{law_name} 질문 재작성 반복 생략")
+                return "end"
         return "continue"
 
     return retrieve_documents, extract_and_evaluate_information, rewrite_query, generate_node_answer, should_continue
 
+# --- 조문 직접 조회 노드 ---
+# 조문 번호 외에 남은 단어가 모두 이 표현을 포함하면 조문 원문과 함께 LLM 설명을 한 번 생성합니다.
+# 그 밖의 단어가 남은 질문('제23조 위반 시 벌칙')은 다른 조문이 필요할 수 있으므로 RAG로 답합니다.
+ARTICLE_EXPLAIN_WORDS = ("설명", "의미", "해석", "요약", "쉽게", "예시")
+
+async def lookup_article_node(state: ResearchAgentState, config: RunnableConfig):
+    """'근로기준법 제23조 내용' 같은 조문 조회 질문은 RAG를 거치지 않고 조문 저장소에서 바로 답합니다."""
+    print("---조문 직접 조회---")
+    question = state["question"]
+    article_store = get_article_store()
+    matched = match_article_query(question, article_store.laws())
+    if matched is None:
+        return {"answered_from_index": False}
+
+    law, articles, request = matched
+    explain = bool(request)
+    if explain and not all(any(word in token for word in ARTICLE_EXPLAIN_WORDS) for token in request.split()):
+        print(f"---조문 외 질문 내용이 있어 RAG로 답합니다 ({request})---")
+        return {"answered_from_index": False}
+    docs = [article_store.lookup(law, article) for article in articles]
+    if any(doc is None for doc in docs):
+        return {"answered_from_index": False}
+
+    article_texts = "\n\n".join(doc.page_content.split("[법률조항]", 1)[-1].strip() for doc in docs)
+    final_answer = f"**{law} {', '.join(articles)}**\n\n{article_texts}\n\n(출처: {law} {', '.join(articles)})"
+    if explain:
+        explain_chain = (article_explain_prompt | get_llm() | StrOutputParser()).with_config(tags=[FINAL_ANSWER_TAG])
+        explanation = await explain_chain.ainvoke({"articles": article_texts, "question": question}, config=config)
+        final_answer = f"{final_answer}\n\n---\n{explanation}"
+
+    return {
+        "answered_from_index": True,
+        "final_answer": final_answer,
+        "evaluation_report": {"total_score": "N/A", "brief_evaluation": "법령 원문을 그대로 인용한 답변입니다."},
+    }
+
+def route_article_lookup(state: ResearchAgentState) -> Literal["found", "not_found"]:
+    return "found" if state.get("answered_from_index") else "not_found"
+
+# --- 시맨틱 답변 캐시 노드 ---
+# 사용자가 승인한 답변을 질문 임베딩으로 저장해 두고, 비슷한 질문이 오면 라우팅/검색/평가 없이 바로 답합니다.
+@registry.resource("semantic_cache")
+def _create_semantic_cache():
+    return SemanticCache(get_query_embeddings())
+
+get_semantic_cache = registry.getter("semantic_cache")
+
+async def _cache_lookup_laws(question: str) -> Optional[List[str]]:
+    """
+    캐시 적중에 요구할 법률 목록. 질문에 적힌 법률, 없으면 로컬 라우터가 확신한 법률을 사용합니다.
+    어느 쪽도 정할 수 없으면 None (법률은 비교하지 않고 조문 인용만 비교)
+    """
+    available_laws = get_available_laws()
+    compact = question.replace(" ", "")
+    named = [law for law in available_laws if law.replace(" ", "") in compact]
+    # '근로기준법 시행령'처럼 더 긴 이름에 포함된 법률 이름은 제외합니다.
+    named = [law for law in named if not any(law != other and law.replace(" ", "") in other.replace(" ", "") for other in named)]
+    if named:
+        return named
+    route = await _route_locally(question, available_laws) if LOCAL_ROUTER_ENABLED else None
+    if route is not None and route["confident"]:
+        return route["laws"]
+    return None
+
+async def check_cache_node(state: ResearchAgentState):
+    print("---답변 캐시 조회---")
+    question = state["question"]
+    entry = await get_semantic_cache().alookup(question, await _cache_lookup_laws(question))
+    if entry is None:
+        return {"cache_hit": False, "cache_entry_id": None}
+    print(f"---캐시 적중 (유사도 {entry['similarity']:.3f})---")
+    return {
+        "cache_hit": True,
+        "cache_entry_id": entry["id"],
+        "final_answer": entry["answer"],
+        "evaluation_report": entry["evaluation_report"],
+    }
+
+def route_cache(state: ResearchAgentState) -> Literal["hit", "miss"]:
+    return "hit" if state.get("cache_hit") else "miss"
+
 # --- Supervisor 노드 ---
-def analyze_question_tool_search(state: ResearchAgentState):
+async def _route_locally(question: str, available_laws: List[str]):
+    """로컬 라우터 결과를 반환합니다. 대표 벡터를 준비할 수 없으면 None (LLM 라우터 사용)"""
+    try:
+        router = get_law_router()
+    except Exception as e:
+        print(f"경고: 로컬 라우터를 사용할 수 없습니다: {e}")
+        return None
+    # 질문 임베딩은 답변 캐시 조회에서 이미 계산되어 캐시에 있으므로 벡터 연산만 남습니다.
+    vector = await get_query_embeddings().aembed_query(question)
+    return router.route(question, vector, available_laws)
+
+async def _route_with_llm(question: str, available_laws: List[str]):
+    result = await get_tool_selector().ainvoke(
+        route_prompt.format(question=question, laws="\n".join(f"- {law}" for law in available_laws) or "- (없음)")
+    )
+    # 수집된 법률 이름만 사용합니다. (LLM이 공백 등을 다르게 쓴 경우도 맞춰 줌)
+    by_compact_name = {law.replace(" ", ""): law for law in available_laws}
+    laws = list(dict.fromkeys(
+        by_compact_name[law.replace(" ", "")] for law in result.laws if law.replace(" ", "") in by_compact_name
+    ))
+    return laws, result.web_search
+
+def _speculation_order(route, available_laws: List[str]) -> List[str]:
+    """미리 검색할 법률 순서. 로컬 라우터 점수가 있으면 점수가 높은 법률부터 검색합니다."""
+    scores = (route or {}).get("scores") or {}
+    return sorted(available_laws, key=lambda law: scores.get(law, 0.0), reverse=True)
+
+async def analyze_question_tool_search(state: ResearchAgentState):
     print("---질문 분석 및 라우팅---")
     question = state["question"]
-    result = structured_llm_tool_selector.invoke(route_prompt.format(question=question))
-    datasources = [tool.tool for tool in result.tools]
-    return {"datasources": datasources}
+    available_laws = get_available_laws()
+    route = await _route_locally(question, available_laws) if LOCAL_ROUTER_ENABLED else None
+    prefetch_id = None
+    if route is not None and route["confident"]:
+        print(f"---로컬 라우팅: {route['laws']} (점수 차이 {route['margin']:.3f})---")
+        laws, web_search, route_source = route["laws"], route["web_search"], "local"
+    else:
+        if SPECULATIVE_RETRIEVAL:
+            # LLM 라우터를 기다리는 동안 법률별 검색을 미리 시작합니다.
+            prefetch_id = get_speculative_retrievals().start(question, _speculation_order(route, available_laws))
+        try:
+            laws, web_search = await _route_with_llm(question, available_laws)
+        except BaseException:
+            get_speculative_retrievals().keep(prefetch_id, [])
+            raise
+        route_source = "llm"
+    datasources = (["search_law"] if laws else []) + (["search_web"] if web_search else [])
+    # 선택되지 않은 법률의 추측 검색은 취소하고, 사용 내역을 상태에 남깁니다.
+    speculation = get_speculative_retrievals().keep(prefetch_id, laws) if prefetch_id else None
+    if speculation is not None:
+        print(f"---추측 검색: {speculation['started']}개 중 {speculation['kept']}개 유지, {speculation['discarded']}개 취소---")
+    return {
+        "datasources": datasources or ["llm_fallback"],
+        "laws": laws,
+        "route_scores": route["scores"] if route is not None else {},
+        "route_source": route_source,
+        "prefetch_id": prefetch_id if speculation and speculation["kept"] else None,
+        "speculation": speculation,
+    }
 
 def route_datasources_tool_search(state: ResearchAgentState) -> List[str]:
     return list(set(state['datasources']))
 
-def answer_final(state: ResearchAgentState) -> ResearchAgentState:
+async def answer_final(state: ResearchAgentState, config: RunnableConfig) -> ResearchAgentState:
     print("---최종 답변 생성---")
     question = state["question"]
-    documents = state.get("answers", [])
+    answers = state.get("answers", {})
+    documents = [answers[source] for source in state.get("datasources", []) if source in answers]
     documents_text = "\\n\\n".join(documents)
-    
-    rag_chain = rag_prompt | llm | StrOutputParser()
-    generation = rag_chain.invoke({"documents": documents_text, "question": question})
+
+    if state.get("user_decision") == "rejected" and state.get("final_answer"):
+        # 거절된 답변은 이전 검색 결과(answers)를 그대로 사용해 사용자 의견을 반영하여 다시 작성합니다.
+        print("---거절된 답변 재작성---")
+        rag_chain = (regenerate_prompt | get_llm() | StrOutputParser()).with_config(tags=[FINAL_ANSWER_TAG])
+        generation = await rag_chain.ainvoke({
+            "documents": documents_text,
+            "question": question,
+            "previous_answer": state["final_answer"],
+            "feedback": state.get("user_feedback") or "(의견 없음)",
+        }, config=config)
+        return {"final_answer": generation, "question": question, "user_decision": None}
+
+    rag_chain = (rag_prompt | get_llm() | StrOutputParser()).with_config(tags=[FINAL_ANSWER_TAG])
+    generation = await rag_chain.ainvoke({"documents": documents_text, "question": question}, config=config)
     return {"final_answer": generation, "question": question}
 
-def llm_fallback(state: ResearchAgentState) -> ResearchAgentState:
+async def llm_fallback(state: ResearchAgentState, config: RunnableConfig) -> ResearchAgentState:
     print("---Fallback 답변---")
     question = state["question"]
-    llm_chain = fallback_prompt | llm | StrOutputParser()
-    generation = llm_chain.invoke({"question": question})
+    llm_chain = (fallback_prompt | get_llm() | StrOutputParser()).with_config(tags=[FINAL_ANSWER_TAG])
+    generation = await llm_chain.ainvoke({"question": question}, config=config)
     return {"final_answer": generation, "question": question}
 
-# --- 평가 및 HITL 노드 ---
-answer_reviewer = create_react_agent(llm, tools=tools, state_modifier=evaluation_prompt)
+# --- 거절 처리 ---
+# 사용자 의견에 이 표현이 있으면 답변만 다시 쓰지 않고 출처(검색 결과)를 다시 검색합니다.
+SOURCE_FEEDBACK_WORDS = ("출처", "근거", "조항", "조문", "법령", "검색", "자료", "링크", "틀린 법", "잘못된 법")
+SOURCE_KEYWORDS = {
+    "search_law": ("조항", "조문", "법령", "법률"),
+    "search_web": ("웹", "인터넷", "링크", "기사", "url"),
+}
 
-def evaluate_answer_node(state: ResearchAgentState):
-    print("---답변 평가---")
-    question = state["question"]
-    final_answer = state["final_answer"]
+def plan_rejection(state: ResearchAgentState) -> dict:
+    """
+    거절된 답변을 어떻게 다시 만들지 정합니다.
+    - 검색 결과가 없는 답변(캐시/조문 조회)은 처음부터 다시 라우팅합니다. (reroute)
+    - 의견이 출처를 문제 삼으면 해당 검색 노드만 다시 실행합니다. (research)
+    - 그 외에는 이전 검색 결과로 최종 답변만 다시 작성합니다. (regenerate, LLM 호출 1회)
+    """
+    answers = state.get("answers", {})
+    searched = [source for source in state.get("datasources", []) if source in answers]
+    if state.get("cache_hit") or state.get("answered_from_index") or not searched:
+        return {"review_action": "reroute", "research_sources": []}
+
+    feedback = (state.get("user_feedback") or "").lower()
+    if not any(word in feedback for word in SOURCE_FEEDBACK_WORDS):
+        return {"review_action": "regenerate", "research_sources": []}
 
-    messages = [HumanMessage(content=f'\"\"\"[질문]\\n\\{question}\\n\\n[답변]\\n{final_answer}\"\"\"')]
-    response = answer_reviewer.invoke({"messages": messages})
-    response_dict = json.loads(response['messages'][-1].content)
+    named = [source for source in searched if any(word in feedback for word in SOURCE_KEYWORDS[source])]
+    return {"review_action": "research", "research_sources": named or searched}
 
-    return {"evaluation_report": response_dict, "question": question, "final_answer": final_answer}
+def route_human_review(state: ResearchAgentState):
+    if state.get("user_decision") == "approved":
+        return "approved"
+    action = state.get("review_action")
+    if action == "regenerate":
+        return "generate_answer"
+    if action == "research":
+        return state["research_sources"]
+    return "analyze_question"
 
-def human_review_node(state: ResearchAgentState):
+# --- 평가 및 HITL 노드 ---
+async def evaluate_answer_node(state: ResearchAgentState):
+    """답변 평가를 백그라운드 작업으로 시작하고 바로 반환합니다. (결과는 작업 ID로 조회)"""
+    print("---답변 평가 시작 (백그라운드)---")
+    evidence = [doc for docs in state.get("evidence", {}).values() for doc in docs]
+    job_id = get_evaluation_jobs().start(state["question"], state["final_answer"], evidence)
+    return {"evaluation_report": PENDING_REPORT, "evaluation_job": job_id}
+
+# 실행 중인 백그라운드 작업 (가비지 컬렉션으로 취소되지 않도록 참조를 유지)
+_background_tasks = set()
+
+async def _cache_after_evaluation(question: str, answer: str, job_id: str, laws: List[str]):
+    report = await get_evaluation_jobs().result(job_id)
+    await get_semantic_cache().aput(question, answer, report, laws)
+
+async def human_review_node(state: ResearchAgentState):
     # 이 노드는 LangGraph가 중단되는 지점입니다. 실제 사용자 입력은 Gradio 인터페이스에서 처리됩니다.
-    pass
\ No newline at end of file
+    # 재개된 뒤에는 사용자 결정에 따라 시맨틱 캐시를 채우거나 거절된 캐시 답변을 지웁니다.
+    if state.get("user_decision") != "approved":
+        if state.get("cache_hit") and state.get("cache_entry_id"):
+            get_semantic_cache().invalidate(state["cache_entry_id"])
+        return {
+            **plan_rejection(state),
+            "cache_hit": False, "cache_entry_id": None, "answered_from_index": False,
+        }
+
+    # 캐시에서 나온 답변과 조문 직접 조회 답변은 다시 저장하지 않습니다.
+    if state.get("cache_hit") or state.get("answered_from_index"):
+        return
+    # 답변 근거가 된 법률이 다시 수집되면 캐시 항목이 무효화됩니다.
+    laws = state.get("laws", []) if "search_law" in state.get("datasources", []) else []
+    report = state.get("evaluation_report")
+    if is_pending(report):
+        # 평가가 끝나면 결과와 함께 저장합니다. (승인 응답을 평가 완료까지 붙잡지 않음)
+        # 빈 컨텍스트에서 작업을 만들어 사용자 스레드의 그래프 설정을 물려받지 않게 합니다. (create_task의 context 인자는 3.11+)
+        task = contextvars.Context().run(asyncio.create_task, _cache_after_evaluation(
+            state["question"], state["final_answer"], state.get("evaluation_job"), laws
+        ))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        return
+    await get_semantic_cache().aput(state["question"], state["final_answer"], report, laws)
\ No newline at end of file
@@ -0,0 +1,128 @@
+# model/graph/speculation.py
+
+import asyncio
+import os
+import uuid
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from util.batching import LRUCache
+from util.registry import registry
+from vectorDB.retrieval import get_law_retriever, reciprocal_rank_fusion
+
+# --- 추측 검색 설정 ---
+# LLM 라우터가 법률을 고르는 동안 법률별 하이브리드 검색 후보를 미리 가져옵니다. (선택되지 않은 법률의 검색은 취소)
+# 재순위화와 부모 조문 확장은 선택된 법률의 후보에만 sub-agent의 문서 검색 단계에서 실행합니다.
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "0") == "1"
+# 질문 하나에 미리 검색할 최대 법률 수 (추가 작업의 상한)
+SPECULATIVE_MAX_LAWS = int(os.getenv("SPECULATIVE_MAX_LAWS", "3"))
+# 결과를 넘겨받지 않은 추측 검색을 보관할 최대 개수
+SPECULATIVE_MAX_ENTRIES = int(os.getenv("SPECULATIVE_MAX_ENTRIES", "1000"))
+
+
+class SpeculativeRetrievals:
+    """
+    라우팅 중에 법률별 하이브리드 검색 후보(재순위화 전)를 미리 가져오고,
+    라우팅이 끝나면 선택된 법률의 후보만 남겨 sub-agent에 넘깁니다.
+    started = used(sub-agent가 후보를 받은 검색) + discarded(취소했거나 후보를 쓰지 않은 검색) + 아직 넘겨받지 않은 검색입니다.
+    discarded 중 이미 끝난 검색은 discarded_completed로, 그 후보 청크 수는 discarded_candidates로 따로 셉니다. (실제로 버린 작업)
+    검색 작업은 상태(체크포인트)에 넣을 수 없으므로 ID로 보관하고, 상태에는 prefetch_id만 넣습니다.
+    """
+
+    def __init__(self, max_laws: int = SPECULATIVE_MAX_LAWS, max_entries: int = SPECULATIVE_MAX_ENTRIES):
+        self.max_laws = max_laws
+        self._entries = LRUCache(max_entries)
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+        self.discarded_completed = 0
+        self.discarded_candidates = 0
+        self.fallbacks = 0
+
+    def start(self, question: str, laws: List[str]) -> Optional[str]:
+        """laws 앞에서부터 max_laws개 법률의 검색 후보를 가져오기 시작하고 prefetch_id를 반환합니다."""
+        laws = laws[:self.max_laws]
+        if not laws:
+            return None
+        tasks = {law: asyncio.create_task(get_law_retriever([law]).acandidates(question)) for law in laws}
+        for task in tasks.values():
+            # 버린 검색이 실패해도 "처리되지 않은 예외" 경고가 나지 않게 합니다.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        prefetch_id = str(uuid.uuid4())
+        self._entries.put(prefetch_id, {"question": question, "tasks": tasks})
+        self.started += len(tasks)
+        return prefetch_id
+
+    def _discard(self, tasks: Dict[str, asyncio.Task]):
+        for task in tasks.values():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                self.discarded_completed += 1
+                self.discarded_candidates += len(task.result())
+            task.cancel()
+        self.discarded += len(tasks)
+
+    def keep(self, prefetch_id: Optional[str], laws: List[str]) -> Optional[dict]:
+        """선택된 법률의 검색만 남기고 나머지는 취소합니다. 이번 질문의 추측 검색 내역을 반환합니다."""
+        entry = self._entries.get(prefetch_id) if prefetch_id else None
+        if entry is None:
+            return None
+        tasks: Dict[str, asyncio.Task] = entry["tasks"]
+        started = len(tasks)
+        self._discard({law: tasks.pop(law) for law in [law for law in tasks if law not in laws]})
+        if not tasks:
+            self._entries.pop(prefetch_id)
+        # 남긴 검색은 sub-agent가 후보를 넘겨받을 때(take) 사용한 것으로 셉니다.
+        return {
+            "started": started,
+            "kept": len(tasks),
+            "discarded": started - len(tasks),
+            "not_prefetched": [law for law in laws if law not in tasks],
+        }
+
+    async def take(self, prefetch_id: Optional[str], query: str, laws: Optional[List[str]]) -> Optional[List[Document]]:
+        """
+        미리 가져온 검색 후보를 넘겨받습니다. 미리 검색하지 않은 법률은 그 법률들의 후보만 한 번 더 가져오고,
+        여러 법률의 후보는 RRF로 합칩니다. (재순위화는 넘겨받은 쪽에서 한 번만 실행)
+        질문이 다르거나(재작성/재검색) 미리 가져온 후보를 쓸 수 없으면 None을 반환하고 호출한 쪽이 직접 검색합니다.
+        """
+        entry = self._entries.pop(prefetch_id) if prefetch_id else None
+        if entry is None:
+            return None
+        tasks: Dict[str, asyncio.Task] = entry["tasks"]
+        prefetched = [law for law in laws or [] if law in tasks]
+        if entry["question"] != query or not prefetched:
+            self._discard(tasks)
+            self.fallbacks += 1
+            return None
+        self._discard({law: tasks.pop(law) for law in [law for law in tasks if law not in prefetched]})
+
+        missing = [law for law in laws if law not in tasks]
+        searches = [tasks[law] for law in prefetched]
+        if missing:
+            searches.append(get_law_retriever(missing).acandidates(query))
+        results = await asyncio.gather(*searches, return_exceptions=True)
+        if any(isinstance(result, BaseException) for result in results):
+            self.discarded += len(prefetched)
+            self.fallbacks += 1
+            return None
+        self.used += len(prefetched)
+        return results[0] if len(results) == 1 else reciprocal_rank_fusion(results)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "used": self.used,
+            "discarded": self.discarded,
+            "discarded_completed": self.discarded_completed,
+            "discarded_candidates": self.discarded_candidates,
+            "fallbacks": self.fallbacks,
+            "waste_rate": round(self.discarded / self.started, 4) if self.started else 0.0,
+        }
+
+
+@registry.resource("speculative_retrievals")
+def _create_speculative_retrievals():
+    return SpeculativeRetrievals()
+
+get_speculative_retrievals = registry.getter("speculative_retrievals")
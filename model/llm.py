@@ -1,10 +1,36 @@
 # model/llm.py
 
+import os
+
 from langchain_openai import ChatOpenAI
-from schemas.schema import ToolSelectors
+from model.cache.llm_cache import LLMCallCache
+from schemas.schema import RouteSelection
+from util.registry import registry
+
+# 같은 입력의 LLM 호출(temperature=0)을 SQLite에 저장해 재사용합니다. (사용자 간, 거절 후 재시도 간 공유)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+
+@registry.resource("llm_cache")
+def _create_llm_cache():
+    return LLMCallCache()
+
+get_llm_cache = registry.getter("llm_cache")
 
 # 기본 LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=True)
+@registry.resource("llm")
+def _create_llm():
+    # stream_usage: 스트리밍 응답에서도 토큰 사용량을 받아 질문 예산(QueryBudget)에 집계합니다.
+    # 캐시의 inflight_handler는 호출이 실패했을 때 같은 요청을 기다리던 호출을 바로 풀어 줍니다.
+    cache = get_llm_cache() if LLM_CACHE_ENABLED else False
+    return ChatOpenAI(
+        model="gpt-4o-mini", temperature=0, streaming=True, stream_usage=True,
+        cache=cache, callbacks=[cache.inflight_handler] if cache else None,
+    )
+
+# 라우팅을 위한 구조화된 출력 LLM (기본 LLM의 캐시를 함께 사용하며, 출력 스키마가 캐시 키에 포함됩니다)
+@registry.resource("tool_selector")
+def _create_tool_selector():
+    return get_llm().with_structured_output(RouteSelection)
 
-# 라우팅을 위한 구조화된 출력 LLM
-structured_llm_tool_selector = llm.with_structured_output(ToolSelectors)
\ No newline at end of file
+get_llm = registry.getter("llm")
+get_tool_selector = registry.getter("tool_selector")
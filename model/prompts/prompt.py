@@ -54,14 +54,16 @@ def get_answer_prompt(law_name: str, source_example: str) -> ChatPromptTemplate:
     ])
 
 # --- 질문 라우팅 프롬프트 ---
-route_system_prompt = dedent("""You are an AI assistant specializing in routing user questions to the appropriate tools.
+route_system_prompt = dedent("""You are an AI assistant specializing in routing user questions to the appropriate data sources.
+The legal database contains the following laws:
+{laws}
+
 Use the following guidelines:
-- For questions specifically about legal provisions or articles of the privacy protection law (개인정보 보호법), use the search_personal tool.
-- For questions specifically about legal provisions or articles of the labor law (근로기준법), use the search_labor tool.
-- For questions specifically about legal provisions or articles of the housing law (주택임대차보호법), use the search_housing tool.
-- For any other information, including questions related to these laws but not directly about specific legal provisions, or for the most up-to-date data, use the search_web tool.
-Always choose all of the appropriate tools based on the user's question. 
-If a question is about a law but doesn't seem to be asking about specific legal provisions, include both the relevant law search tool and the search_web tool.""")
+- For questions about legal provisions or articles of the laws above, put the exact names of all relevant laws in `laws`.
+- For any other information, including questions related to these laws but not directly about specific legal provisions, or for the most up-to-date data, set `web_search` to true.
+Always choose all of the appropriate sources based on the user's question.
+If a question is about a law but doesn't seem to be asking about specific legal provisions, include both the relevant laws and web search.
+Only use law names from the list above.""")
 
 route_prompt = ChatPromptTemplate.from_messages(
     [
@@ -80,6 +82,24 @@ rag_prompt = ChatPromptTemplate.from_messages([
     ("human", "Answer the following question using these documents:\\n\\n[Documents]\\n{documents}\\n\\n[Question]\\n{question}"),
 ])
 
+# --- 답변 재작성 프롬프트 (사용자가 답변을 거절했을 때) ---
+regenerate_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an assistant answering questions based on provided documents. Follow these guidelines:
+1. Use only information from the given documents.
+2. If the document lacks relevant info, say "제공된 정보로는 충분한 답변을 할 수 없습니다."
+3. Cite the source of information for each sentence in your answer.
+4. Keep answers concise and clear.
+5. The user rejected the previous answer. Write an improved answer that addresses the user's feedback."""),
+    ("human", "Answer the following question using these documents:\\n\\n[Documents]\\n{documents}\\n\\n[Question]\\n{question}\\n\\n[Previous Answer]\\n{previous_answer}\\n\\n[User Feedback]\\n{feedback}"),
+])
+
+# --- 조문 설명 프롬프트 (조문 직접 조회 시) ---
+article_explain_prompt = ChatPromptTemplate.from_messages([
+    ("system", """당신은 법률 전문가입니다. 주어진 법률 조문만을 근거로 사용자의 요청에 맞게 조문을 간결하게 설명하세요.
+조문에 없는 내용은 추측하지 말고, 설명에 사용한 조문 번호를 괄호 안에 표시하세요."""),
+    ("human", "[조문]\n{articles}\n\n[요청]\n{question}"),
+])
+
 # --- LLM Fallback 프롬프트 ---
 fallback_prompt = ChatPromptTemplate.from_messages([
     ("system", "You are an AI assistant. Provide a helpful answer to the user's question."),
@@ -97,8 +117,9 @@ evaluation_prompt = dedent("""
 6. 객관성 (10점)
 평가 과정:
 1. 주어진 질문과 답변을 주의 깊게 읽으십시오.
-2. 필요한 경우, 다음 도구를 사용하여 추가 정보를 수집하세요:
-   - web_search, personal_law_search, labor_law_search, housing_law_search
+2. 함께 제공된 [근거 문서]를 기준으로 답변의 정확성과 인용을 확인하세요.
+   근거 문서만으로 판단할 수 없을 때에만 다음 도구를 사용하세요 (호출 횟수가 제한되어 있습니다):
+   - web_search, law_search (laws에 법률 이름 목록을 지정하거나 비워 두면 전체 법률 검색)
 3. 각 기준에 대해 1-10점 사이의 점수를 매기세요.
 4. 총점을 계산하세요 (60점 만점).
 
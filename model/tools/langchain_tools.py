@@ -2,38 +2,26 @@
 
 from langchain_core.tools import tool
 from langchain_core.documents import Document
-from typing import List
+from typing import List, Optional
 
-# vectorDB/retrieval.py 에서 설정된 Retriever들을 가져옵니다.
-from vectorDB.retrieval import (
-    personal_db_retriever, 
-    labor_db_retriever, 
-    housing_db_retriever, 
-    web_retriever
-)
+# vectorDB/retrieval.py 에 등록된 Retriever들을 처음 호출될 때 가져옵니다.
+from vectorDB.retrieval import get_law_retriever, get_web_retriever
 
 @tool
-def personal_law_search(query: str) -> List[Document]:
-    """개인정보보호법 법률 조항을 검색합니다."""
-    docs = personal_db_retriever.invoke(query)
+async def law_search(query: str, laws: Optional[List[str]] = None) -> List[Document]:
+    """법률 데이터베이스에서 법률 조항을 검색합니다. laws에 검색할 법률 이름 목록을 지정하면 해당 법률만 검색하고, 비워 두면 모든 법률을 검색합니다."""
+    docs = await get_law_retriever(laws).ainvoke(query)
     return docs if docs else [Document(page_content="관련 정보를 찾을 수 없습니다.")]
 
-@tool
-def labor_law_search(query: str) -> List[Document]:
-    """근로기준법 법률 조항을 검색합니다."""
-    docs = labor_db_retriever.invoke(query)
-    return docs if docs else [Document(page_content="관련 정보를 찾을 수 없습니다.")]
-
-@tool
-def housing_law_search(query: str) -> List[Document]:
-    """주택임대차보호법 법률 조항을 검색합니다."""
-    docs = housing_db_retriever.invoke(query)
+async def law_search_from_candidates(query: str, laws: Optional[List[str]], candidates: List[Document]) -> List[Document]:
+    """미리 가져온 검색 후보(추측 검색)를 재순위화하고 부모 조문으로 확장합니다. law_search와 같은 형식으로 반환합니다."""
+    docs = await get_law_retriever(laws).afrom_candidates(query, candidates)
     return docs if docs else [Document(page_content="관련 정보를 찾을 수 없습니다.")]
 
 @tool
-def web_search(query: str) -> List[Document]:
+async def web_search(query: str) -> List[Document]:
     """데이터베이스에 없는 정보 또는 최신 정보를 웹에서 검색합니다."""
-    docs = web_retriever.invoke(query)
+    docs = await get_web_retriever().ainvoke(query)
     formatted_docs = []
     for doc in docs:
         formatted_docs.append(
@@ -45,4 +33,4 @@ def web_search(query: str) -> List[Document]:
     return formatted_docs if formatted_docs else [Document(page_content="관련 정보를 찾을 수 없습니다.")]
 
 # 에이전트에서 사용할 도구 목록
-tools = [personal_law_search, labor_law_search, housing_law_search, web_search]
\ No newline at end of file
+tools = [law_search, web_search]
\ No newline at end of file
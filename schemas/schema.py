@@ -1,6 +1,6 @@
 # schemas/schema.py
 
-from typing import List, TypedDict, Annotated, Optional
+from typing import Dict, List, TypedDict, Annotated, Optional
 from langchain_core.documents import Document
 from pydantic import BaseModel, Field
 
@@ -12,6 +12,9 @@ class CorrectiveRagState(TypedDict):
     generation: str
     documents: List[Document]
     num_generations: int
+    grading_timings: Annotated[List[dict], lambda x, y: x + y]
+    # 예산이 없어 LLM 평가 없이 문서를 그대로 근거로 사용했으면 True (정보 조각의 점수는 재순위화 점수)
+    ungraded: bool
 
 class InformationStrip(BaseModel):
     """추출된 정보 조각의 내용, 출처, 관련성 점수"""
@@ -30,22 +33,13 @@ class RefinedQuestion(BaseModel):
     question_refined: str = Field(..., description="개선된 질문")
     reason: str = Field(..., description="이유")
 
-# --- 각 법률 및 웹 검색 에이전트 상태 정의 ---
+# --- 법률 및 웹 검색 에이전트 상태 정의 ---
 
-class PersonalRagState(CorrectiveRagState):
-    """개인정보보호법 RAG 에이전트 상태"""
-    rewritten_query: str
-    extracted_info: Optional[List[InformationStrip]]
-    node_answer: Optional[str]
-
-class LaborRagState(CorrectiveRagState):
-    """근로기준법 RAG 에이전트 상태"""
-    rewritten_query: str
-    extracted_info: Optional[List[InformationStrip]]
-    node_answer: Optional[str]
-
-class HousingRagState(CorrectiveRagState):
-    """주택임대차보호법 RAG 에이전트 상태"""
+class LawRagState(CorrectiveRagState):
+    """법률 검색 RAG 에이전트 상태 (laws에 지정된 법률만 한 번에 검색)"""
+    laws: List[str]
+    # 라우팅 중에 미리 시작한 검색 ID (첫 검색에서 결과를 넘겨받음)
+    prefetch_id: Optional[str]
     rewritten_query: str
     extracted_info: Optional[List[InformationStrip]]
     node_answer: Optional[str]
@@ -61,23 +55,38 @@ class SearchRagState(CorrectiveRagState):
 class ResearchAgentState(TypedDict):
     """메인 에이전트의 상태"""
     question: str
-    answers: Annotated[List[str], lambda x, y: x + y]
+    # 검색 노드(search_law, search_web)별 sub-agent 답변과 근거 문서. 다시 검색하면 해당 노드의 값만 교체됩니다.
+    answers: Annotated[Dict[str, str], lambda x, y: {**x, **y}]
+    evidence: Annotated[Dict[str, List[str]], lambda x, y: {**x, **y}]
     final_answer: str
     datasources: List[str]
+    laws: List[str]
+    # 로컬 라우터의 법률별 유사도와 라우팅을 결정한 주체 (local: 로컬 라우터, llm: LLM 라우터)
+    route_scores: Dict[str, float]
+    route_source: Optional[str]
+    # 추측 검색 ID와 사용 내역 (started: 미리 검색한 법률 수, used: 사용, discarded: 취소)
+    prefetch_id: Optional[str]
+    speculation: Optional[dict]
     evaluation_report: Optional[dict]
+    evaluation_job: Optional[str]
     user_decision: Optional[str]
+    user_feedback: Optional[str]
+    # 거절 후 처리 방식 (regenerate: 답변만 다시 작성, research: research_sources만 다시 검색, reroute: 처음부터 다시)
+    review_action: Optional[str]
+    research_sources: List[str]
+    answered_from_index: Optional[bool]
+    cache_hit: Optional[bool]
+    cache_entry_id: Optional[str]
 
 # --- 라우팅을 위한 데이터 모델 ---
 
-class ToolSelector(BaseModel):
-    """사용자 질문에 가장 적합한 도구를 선택합니다."""
-    tool: str = Field(
-        description="사용자 질문에 따라 도구 중 하나를 선택합니다.",
-        enum=["search_personal", "search_labor", "search_housing", "search_web"]
+class RouteSelection(BaseModel):
+    """사용자 질문에 답하기 위해 검색할 법률과 웹 검색 필요 여부를 선택합니다."""
+    laws: List[str] = Field(
+        default_factory=list,
+        description="질문과 관련된 법률 이름 목록. 반드시 제공된 법률 목록에 있는 이름만 그대로 사용합니다.",
+    )
+    web_search: bool = Field(
+        default=False,
+        description="법률 데이터베이스에 없는 정보나 최신 정보가 필요하면 True",
     )
-
-class ToolSelectors(BaseModel):
-    """사용자 질문에 적합한 도구들을 선택합니다."""
-    tools: List[ToolSelector] = Field(
-        description="사용자 질문에 따라 하나 이상의 도구를 선택합니다.",
-    )
\ No newline at end of file
@@ -0,0 +1,40 @@
+# tests/test_bench_agent.py
+# benchmarks/bench_agent.py의 가짜 모델 하네스로 전체 그래프를 낮은 동시성에서 실행하고,
+# 질문당 LLM 호출 수와 p95 지연이 기준 안인지 확인합니다. (OpenAI/Ollama/Tavily 없이 data/의 PDF만 사용)
+#
+# 실행: python -m pytest -q tests/test_bench_agent.py
+
+import asyncio
+import os
+
+from benchmarks import bench_agent
+
+# --- 회귀 기준 ---
+# 가짜 LLM 지연을 짧게 두고 낮은 동시성으로 실행하므로 질문당 몇 초를 넘지 않아야 합니다.
+TEST_BENCH_P95_MS = float(os.getenv("TEST_BENCH_P95_MS", "5000"))
+# 재작성 반복이 폭주하지 않는지 보는 질문당 최대 LLM 호출 수
+TEST_BENCH_MAX_LLM_CALLS = int(os.getenv("TEST_BENCH_MAX_LLM_CALLS", "20"))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def test_bench_agent_gates():
+    args = bench_agent.build_parser().parse_args([
+        "--concurrency", "1", "2",
+        "--questions", "6",
+        "--llm-ms", "20",
+        "--token-ms", "0.1",
+        "--retrieval-ms", "5",
+        "--web-ms", "10",
+        "--data-dir", DATA_DIR,
+        "--fail-p95-ms", str(TEST_BENCH_P95_MS),
+        "--fail-llm-calls", str(TEST_BENCH_MAX_LLM_CALLS),
+    ])
+    results = asyncio.run(bench_agent.run(args))
+
+    assert [result["concurrency"] for result in results] == [1, 2]
+    for result in results:
+        assert result["questions"] == 6
+        assert 0 < result["max_llm_calls"] <= TEST_BENCH_MAX_LLM_CALLS
+        assert result["p95_ms"] <= TEST_BENCH_P95_MS
+    assert bench_agent.check(results, args) == []
@@ -0,0 +1,105 @@
+# util/batching.py
+
+import asyncio
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+
+class LRUCache:
+    """스레드 안전한 개수 제한 LRU 캐시"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._data.pop(key, None)
+
+
+class MicroBatcher:
+    """
+    동시에 들어온 비동기 요청을 모아 한 번의 배치 호출로 처리합니다.
+    첫 요청 이후 max_wait_ms 동안(또는 max_batch_size개가 찰 때까지) 기다린 뒤,
+    batch_fn(입력 목록) -> 출력 목록을 스레드 풀에서 실행하여 이벤트 루프를 막지 않습니다.
+    이벤트 루프마다 별도의 큐를 사용합니다.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queues = weakref.WeakKeyDictionary()
+        self.batches = 0
+        self.items = 0
+
+    def _queue(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        entry = self._queues.get(loop)
+        if entry is None:
+            # 작업(Task)은 약한 참조로만 유지되므로 큐와 함께 보관합니다.
+            queue = asyncio.Queue()
+            entry = self._queues[loop] = (queue, loop.create_task(self._worker(queue)))
+        return entry[0]
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue().put((item, future))
+        return await future
+
+    async def _worker(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # 취소된 요청은 제외합니다.
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                outputs = await loop.run_in_executor(None, self.batch_fn, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
@@ -0,0 +1,130 @@
+# util/budget.py
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+
+from util.tracing import is_cached_response
+
+# --- 질문당 예산 설정 ---
+# 질문 하나(그래프 실행 한 번)에 허용하는 LLM 호출 수, 토큰 수, 시간(초). 0이면 제한 없음
+QUERY_MAX_LLM_CALLS = int(os.getenv("QUERY_MAX_LLM_CALLS", "40"))
+QUERY_MAX_TOKENS = int(os.getenv("QUERY_MAX_TOKENS", "60000"))
+QUERY_DEADLINE = float(os.getenv("QUERY_DEADLINE", "60"))
+# 최종 답변 생성을 위해 남겨 두는 LLM 호출 수와 시간(초)
+QUERY_RESERVED_LLM_CALLS = int(os.getenv("QUERY_RESERVED_LLM_CALLS", "1"))
+QUERY_RESERVED_SECONDS = float(os.getenv("QUERY_RESERVED_SECONDS", "10"))
+
+
+class QueryBudget(BaseCallbackHandler):
+    """
+    질문 하나에 쓰는 LLM 호출 수, 토큰 수, 시간을 세는 콜백 핸들러입니다.
+    그래프 실행 config의 callbacks와 configurable["budget"]에 함께 넣으면
+    supervisor와 sub-agent의 모든 LLM 호출이 집계되고, 노드는 이 예산을 보고 추가 작업 여부를 정합니다.
+    최종 답변 생성에 쓸 몫(reserved_calls, reserved_seconds)은 항상 남겨 두고,
+    실행 중인 sub-agent마다 답변 생성 1회의 몫을 reserve()로 더 남겨 둡니다.
+    """
+
+    def __init__(self, max_llm_calls: int = QUERY_MAX_LLM_CALLS, max_tokens: int = QUERY_MAX_TOKENS,
+                 deadline: float = QUERY_DEADLINE, reserved_calls: int = QUERY_RESERVED_LLM_CALLS,
+                 reserved_seconds: float = QUERY_RESERVED_SECONDS):
+        self.max_llm_calls = max_llm_calls
+        self.max_tokens = max_tokens
+        self.deadline = deadline
+        self.reserved_calls = reserved_calls
+        self.reserved_seconds = reserved_seconds
+        self.started = time.monotonic()
+        self.llm_calls = 0
+        self.cached_calls = 0
+        self.tokens = 0
+        self.skipped: List[str] = []
+        self._lock = threading.Lock()
+
+    # --- 콜백: LLM 호출 수와 토큰 수 집계 (시작할 때 세고, 캐시 적중이면 끝날 때 되돌림) ---
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        with self._lock:
+            self.llm_calls += 1
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        with self._lock:
+            self.llm_calls += 1
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        if is_cached_response(response):
+            # 캐시 적중은 호출 수와 토큰 수에서 빼고 따로 셉니다.
+            with self._lock:
+                self.llm_calls -= 1
+                self.cached_calls += 1
+            return
+        tokens = (response.llm_output or {}).get("token_usage", {}).get("total_tokens")
+        if tokens is None:
+            # 스트리밍 응답은 메시지의 usage_metadata에 사용량이 들어 있습니다.
+            tokens = 0
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    tokens += usage.get("total_tokens", 0)
+        with self._lock:
+            self.tokens += tokens
+
+    # --- 답변 몫 예약 ---
+    def reserve(self, calls: int = 1):
+        """sub-agent 답변 생성처럼 반드시 실행해야 하는 LLM 호출 몫을 남겨 둡니다."""
+        with self._lock:
+            self.reserved_calls += calls
+
+    def release(self, calls: int = 1):
+        """reserve()로 남겨 둔 몫을 돌려줍니다."""
+        with self._lock:
+            self.reserved_calls = max(0, self.reserved_calls - calls)
+
+    # --- 예산 확인 ---
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining_time(self) -> Optional[float]:
+        """최종 답변 몫을 뺀 남은 시간(초). 시간 제한이 없으면 None"""
+        if not self.deadline:
+            return None
+        return max(0.0, self.deadline - self.reserved_seconds - self.elapsed())
+
+    def affordable_calls(self) -> Optional[int]:
+        """최종 답변 몫을 빼고 더 쓸 수 있는 LLM 호출 수. 제한이 없으면 None"""
+        if not self.max_llm_calls:
+            return None
+        return max(0, self.max_llm_calls - self.reserved_calls - self.llm_calls)
+
+    def allows(self, llm_calls: int = 1, seconds: float = 0.0) -> bool:
+        """llm_calls번의 호출과 seconds초의 작업을 더 해도 예산 안인지 확인합니다."""
+        calls = self.affordable_calls()
+        remaining = self.remaining_time()
+        return (
+            (calls is None or calls >= llm_calls)
+            and (not self.max_tokens or self.tokens < self.max_tokens)
+            and (remaining is None or remaining > seconds)
+        )
+
+    def skip(self, reason: str):
+        """예산 때문에 건너뛴 작업을 기록합니다."""
+        with self._lock:
+            self.skipped.append(reason)
+        print(f"---예산 제한: {reason}---")
+
+    def summary(self) -> dict:
+        return {
+            "llm_calls": self.llm_calls,
+            "cached_calls": self.cached_calls,
+            "tokens": self.tokens,
+            "elapsed": round(self.elapsed(), 2),
+            "skipped": list(self.skipped),
+        }
+
+
+def get_budget(config: Optional[RunnableConfig]) -> Optional[QueryBudget]:
+    """실행 config에 넣어 둔 예산을 반환합니다. (예산 없이 실행하면 None)"""
+    return ((config or {}).get("configurable") or {}).get("budget")
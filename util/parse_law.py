@@ -1,76 +1,254 @@
 import re
+
+# 법률 구조 토큰 패턴 (한 번만 컴파일)
+# 장/절/조/부칙은 줄의 시작('\n' 바로 뒤)에서만 인식합니다.
+# 조는 '제X조(제목)' 형식이어야 하며, '제X조(제목)에 따라'처럼 조사가 바로 붙거나
+# '제X조(제목) 및 제Y조'처럼 다른 조문이 이어지는 인용문(줄바꿈으로 줄 맨 앞에 온 경우)은 제외합니다.
+# 패턴이 '\n'으로 시작하므로 줄바꿈 위치에서만 매칭을 시도하고, 바깥 그룹 이름(match.lastgroup)이 곧 토큰 종류가 됩니다.
+_STRUCTURE_TOKENS = (
+    r'(?P<chapter>제(?P<chapter_no>\d+)장(?:의(?P<chapter_sub>\d+))?[ \t]+(?P<chapter_title>[^\n]+))'
+    r'|(?P<section>제(?P<section_no>\d+)절(?:의(?P<section_sub>\d+))?[ \t]+(?P<section_title>[^\n]+))'
+    r'|(?P<article>제(?P<article_no>\d+)조(?:의(?P<article_sub>\d+))?[ \t]*\((?P<article_title>[^)\n]+)\)'
+    r'(?![에의을를과와]|[ \t]*(?:및|또는|내지|부터|까지|[,·ㆍ])))'
+    r'|(?P<appendix>부칙)'
+)
+_ARTICLE_PATTERN = re.compile(r'\n[ \t]*(?:' + _STRUCTURE_TOKENS + r')')
+# 호는 줄의 시작에서만 인식합니다. 항(①~⑳)은 조 제목 바로 뒤에도 올 수 있으므로 str.find로 차례로 찾습니다.
+# (원문자 분기를 한 패턴에 섞으면 모든 글자 위치를 검사하게 되어 느려집니다.)
+_ITEM_PATTERN = re.compile(r'\n[ \t]*(\d+)\.[ \t]')
+
+_CIRCLED_ONE = 0x2460
+_CIRCLED = [chr(_CIRCLED_ONE + i) for i in range(20)]
+
+
+def _number(match, name):
+    sub = match.group(f"{name}_sub")
+    return int(match.group(f"{name}_no")), int(sub) if sub else 0
+
+
+def _label(match, name, unit):
+    no, sub = match.group(f"{name}_no"), match.group(f"{name}_sub")
+    return f"제{no}{unit}의{sub}" if sub else f"제{no}{unit}"
+
+
+def _paragraph_starts(text, start, end):
+    """text[start:end]에서 ①부터 차례로 나오는 항 시작 위치 목록 (본문의 다른 원문자는 무시)"""
+    starts = []
+    find = text.find
+    for circled in _CIRCLED:
+        start = find(circled, start, end)
+        if start < 0:
+            break
+        starts.append(start)
+        start += 1
+    return starts
+
+
+def find_paragraphs(text, start=0, end=None):
+    """
+    text[start:end]에서 항의 (번호, 시작 위치, 끝 위치) 목록을 반환합니다.
+    항 번호는 ①부터 차례로 증가해야 하며(본문의 다른 원문자는 무시), 항은 다음 항의 시작에서 끝납니다.
+    """
+    end = len(text) if end is None else end
+    starts = _paragraph_starts(text, start, end)
+    return list(zip(_CIRCLED, starts, starts[1:] + [end]))
+
+
+def find_items(text, start=0, end=None):
+    """
+    text[start:end]에서 호의 (번호, 시작 위치, 끝 위치) 목록을 반환합니다.
+    호 번호는 1부터 차례로 증가해야 하며(줄바꿈된 날짜 등은 무시), 호는 다음 호의 시작에서 끝납니다.
+    """
+    end = len(text) if end is None else end
+    items = []
+    for match in _ITEM_PATTERN.finditer(text, start, end):
+        number = match.group(1)
+        if int(number) == len(items) + 1:
+            items.append((number, match.start(1)))
+    ends = [item_start for _, item_start in items[1:]] + [end]
+    return [(number, item_start, item_end) for (number, item_start), item_end in zip(items, ends)]
+
+
+def _build_paragraphs(article, text, start, end):
+    """조문 본문(text[start:end])의 항/호 노드를 만듭니다. 첫 항 앞의 호는 조에 바로 딸린 호입니다."""
+    # bounds[i + 1]은 i번째 항의 끝(다음 항의 시작)이고, 첫 항 앞의 호는 bounds[0]에서 끝납니다.
+    bounds = _paragraph_starts(text, start, end)
+    bounds.append(end)
+    paragraphs = article['paragraphs']
+    for i in range(len(bounds) - 1):
+        paragraphs.append({'number': _CIRCLED[i], 'text': text[bounds[i]:bounds[i + 1]].strip(), 'items': []})
+
+    # 호는 본문을 한 번만 훑어 찾고, 위치로 상위 항(또는 조)을 정합니다. 호 번호는 항마다 1부터 다시 셉니다.
+    # 호는 다음 호 또는 다음 항의 시작에서 끝납니다.
+    owner, items, previous = -1, article['items'], None
+    for match in _ITEM_PATTERN.finditer(text, start, end):
+        item_start = match.start(1)
+        if item_start > bounds[owner + 1]:
+            while item_start > bounds[owner + 1]:
+                owner += 1
+            items = paragraphs[owner]['items']
+        number = match.group(1)
+        if int(number) != len(items) + 1:
+            continue
+        if previous is not None:
+            node, node_start, node_end = previous
+            node['text'] = text[node_start:min(item_start, node_end)].strip()
+        node = {'number': number, 'text': ''}
+        items.append(node)
+        previous = (node, item_start, bounds[owner + 1])
+    if previous is not None:
+        node, node_start, node_end = previous
+        node['text'] = text[node_start:node_end].strip()
+
+
+def _split_items(text, start, end, items):
+    """항(또는 조)의 도입부를 각 호 앞에 붙여 호 단위 청크로 나눕니다."""
+    lead = text[start:items[0][1]].strip()
+    return [f"{lead}\n{text[s:e].strip()}" if lead else text[s:e].strip() for _, s, e in items]
+
+
+def split_article(article, max_chars):
+    """
+    parse_law_tree의 조문을 항 단위 청크 텍스트 목록으로 나눕니다.
+    항이 max_chars보다 길고 호가 있으면 호 단위로 나누고, 항이 없는 조문은 호 단위 또는 조문 전체를 사용합니다.
+    항/호는 조문 텍스트에서 필요한 만큼만 찾습니다. (호는 긴 항/조문에서만)
+    """
+    text = article['text']
+    # 조문 제목 '제X조(제목)' 뒤부터 찾습니다. (제목에는 ')'가 없음)
+    body_start = text.find(')') + 1
+    paragraphs = find_paragraphs(text, body_start)
+    if paragraphs:
+        chunks = []
+        for _, start, end in paragraphs:
+            paragraph = text[start:end].strip()
+            items = find_items(text, start, end) if len(paragraph) > max_chars else []
+            chunks.extend(_split_items(text, start, end, items) if items else [paragraph])
+        return chunks
+    items = find_items(text, body_start) if len(text) > max_chars else []
+    return _split_items(text, 0, len(text), items) if items else [text]
+
+
+def parse_law_tree(law_text, with_paragraphs=False):
+    """
+    법률 텍스트를 한 번 훑어 장/절/조 구조의 트리로 반환합니다.
+    기본값(with_paragraphs=False)은 조문 단위까지만 파싱하고, 항/호가 필요하면 조문별로 split_article을 사용합니다.
+    with_paragraphs=True이면 모든 조문의 항/호 노드까지 만듭니다.
+
+    반환 형식:
+    {
+        'preamble': 서문,
+        'chapters': [{'heading', 'number', 'title', 'sections': [...], 'articles': [...]}],
+        'articles': 모든 조문 (순서대로),
+        'appendix': 부칙,
+    }
+    각 조문은 {'number', 'title', 'chapter', 'section', 'text', 'paragraphs', 'items'} 형식이며,
+    항은 {'number', 'text', 'items'}, 호는 {'number', 'text'} 형식입니다. (with_paragraphs=False이면 빈 목록)
+    """
+    chapters = []
+    articles = []
+    # 장/절/조 경계마다 (시작 위치, 조문 본문 시작 위치)를 기록해 두었다가 마지막에 한 번에 잘라냅니다.
+    # 장/절 경계는 본문 시작 위치가 None입니다.
+    spans = []
+    chapter = section = None
+    last_chapter = last_section = last_article = (0, 0)
+    end = len(law_text)
+    first_start = None
+
+    # 첫 줄도 줄의 시작으로 인식하도록 앞에 줄바꿈을 붙여 한 번만 훑습니다. (위치는 1씩 보정)
+    text = "\n" + law_text
+    for match in _ARTICLE_PATTERN.finditer(text):
+        kind = match.lastgroup
+        start = match.start(kind) - 1
+        if kind == 'article':
+            number = _number(match, 'article')
+            if number <= last_article:
+                continue
+            last_article = number
+            article = {
+                'number': _label(match, 'article', '조'),
+                'title': match.group('article_title'),
+                'chapter': chapter['heading'] if chapter else '',
+                'section': section['heading'] if section else '',
+                'paragraphs': [], 'items': [],
+            }
+            articles.append(article)
+            if chapter is not None:
+                chapter['articles'].append(article)
+            if section is not None:
+                section['articles'].append(article)
+            spans.append((start, match.end(kind) - 1))
+
+        elif kind == 'chapter':
+            number = _number(match, 'chapter')
+            if number <= last_chapter:
+                continue
+            last_chapter, last_section = number, (0, 0)
+            label, title = _label(match, 'chapter', '장'), match.group('chapter_title').strip()
+            chapter = {'heading': f"{label} {title}", 'number': label,
+                       'title': title, 'sections': [], 'articles': []}
+            chapters.append(chapter)
+            section = None
+            spans.append((start, None))
+
+        elif kind == 'section':
+            number = _number(match, 'section')
+            if number <= last_section:
+                continue
+            last_section = number
+            label, title = _label(match, 'section', '절'), match.group('section_title').strip()
+            section = {'heading': f"{label} {title}", 'number': label,
+                       'title': title, 'articles': []}
+            if chapter is not None:
+                chapter['sections'].append(section)
+            spans.append((start, None))
+
+        elif kind == 'appendix':
+            if not articles:
+                continue
+            end = start
+            break
+
+        if first_start is None:
+            first_start = start
+
+    # 각 조문은 다음 장/절/조 경계(또는 부칙 시작)에서 끝납니다.
+    # 항/호는 조문 본문 안에서만 찾으므로 with_paragraphs=False이면 이 단계를 건너뜁니다.
+    spans.append((end, None))
+    article_iter = iter(articles)
+    for (start, body_start), (next_start, _) in zip(spans, spans[1:]):
+        if body_start is None:
+            continue
+        article = next(article_iter)
+        article['text'] = law_text[start:next_start].strip()
+        if with_paragraphs:
+            _build_paragraphs(article, law_text, body_start, next_start)
+
+    return {
+        'preamble': law_text[:first_start or 0].strip(),
+        'chapters': chapters,
+        'articles': articles,
+        'appendix': law_text[end:].strip(),
+    }
+
+
 def parse_law(law_text):
-    # 서문 분리
-    # '^'로 시작하여 '제1장' 또는 '제1조' 직전까지의 모든 텍스트를 탐색 
-    preamble_pattern = r'^(.*?)(?=제1장|제1조)'
-    preamble = re.search(preamble_pattern, law_text, re.DOTALL)
-    if preamble:
-        preamble = preamble.group(1).strip()
-    
-    # 장 분리 
-    # '제X장' 형식의 제목과 그 뒤에 오는 모든 조항을 하나의 그룹화 
-    chapter_pattern = r'(제\d+장\s+.+?)\n((?:제\d+조(?:의\d+)?(?:\(\w+\))?.*?)(?=제\d+장|부칙|$))'
-    chapters = re.findall(chapter_pattern, law_text, re.DOTALL)
-    
-    # 부칙 분리
-    # '부칙'으로 시작하는 모든 텍스트를 탐색 
-    appendix_pattern = r'(부칙.*)'
-    appendix = re.search(appendix_pattern, law_text, re.DOTALL)
-    if appendix:
-        appendix = appendix.group(1)
-    
-    # 파싱 결과를 저장할 딕셔너리 초기화
-    parsed_law = {'서문': preamble, '장': {}, '부칙': appendix}
-    
-    # 각 장 내에서 조 분리
-    for chapter_title, chapter_content in chapters:
-        # 조 분리 패턴
-        # 1. '제X조'로 시작 ('제X조의Y' 형식도 가능)
-        # 2. 조 번호 뒤에 반드시 '(항목명)' 형식의 제목이 와야 함 
-        # 3. 다음 조가 시작되기 전까지 또는 문서의 끝까지의 모든 내용을 포함
-        article_pattern = r'(제\d+조(?:의\d+)?\s*\([^)]+\).*?)(?=제\d+조(?:의\d+)?\s*\([^)]+\)|$)'
-        
-        # 정규표현식을 이용해 모든 조항을 탐색 
-        articles = re.findall(article_pattern, chapter_content, re.DOTALL)
-        
-        # 각 조항의 앞뒤 공백을 제거하고 결과 딕셔너리에 저장
-        parsed_law['장'][chapter_title.strip()] = [article.strip() for article in articles]
-    
+    """
+    법률 텍스트를 서문, 장, 조문, 부칙으로 분리하여 딕셔너리로 반환합니다.
+    장이 없는 법률은 '조문' 키에 조문 목록을 담습니다.
+    """
+    tree = parse_law_tree(law_text)
+    parsed_law = {'서문': tree['preamble'], '장': {}, '부칙': tree['appendix']}
+    if tree['chapters']:
+        for chapter in tree['chapters']:
+            parsed_law['장'][chapter['heading']] = [article['text'] for article in chapter['articles']]
+    else:
+        parsed_law['조문'] = [article['text'] for article in tree['articles']]
     return parsed_law
 
-# 파싱 함수를 수정 (장이 없이 조문으로만 구성된 경우)
+
+# 장이 없이 조문으로만 구성된 경우 '장' 키를 만들지 않는 형식
 def parse_law_v2(law_text):
-    # 서문 분리
-    preamble_pattern = r'^(.*?)(?=제1장|제1조)'
-    preamble = re.search(preamble_pattern, law_text, re.DOTALL)
-    if preamble:
-        preamble = preamble.group(1).strip()
-    
-    # 장 분리 
-    chapter_pattern = r'(제\d+장\s+.+?)\n((?:제\d+조(?:의\d+)?(?:\(\w+\))?.*?)(?=제\d+장|부칙|$))'
-    chapters = re.findall(chapter_pattern, law_text, re.DOTALL)
-    
-    # 부칙 분리
-    appendix_pattern = r'(부칙.*)'
-    appendix = re.search(appendix_pattern, law_text, re.DOTALL)
-    if appendix:
-        appendix = appendix.group(1)
-    
-    parsed_law = {'서문': preamble, '부칙': appendix}
-    
-    # 조 분리 패턴
-    article_pattern = r'(제\d+조(?:의\d+)?\s*\([^)]+\).*?)(?=제\d+조(?:의\d+)?\s*\([^)]+\)|$)'
-    
-    if chapters:  # 장이 있는 경우
-        parsed_law['장'] = {}
-        for chapter_title, chapter_content in chapters:
-            articles = re.findall(article_pattern, chapter_content, re.DOTALL)
-            parsed_law['장'][chapter_title.strip()] = [article.strip() for article in articles]
-    else:  # 장이 없는 경우
-        # 서문과 부칙을 제외한 본문에서 조문 추출
-        main_text = re.sub(preamble_pattern, '', law_text, flags=re.DOTALL)
-        main_text = re.sub(appendix_pattern, '', main_text, flags=re.DOTALL)
-        articles = re.findall(article_pattern, main_text, re.DOTALL)
-        parsed_law['조문'] = [article.strip() for article in articles]
-    
+    parsed_law = parse_law(law_text)
+    if not parsed_law['장']:
+        del parsed_law['장']
     return parsed_law
@@ -0,0 +1,99 @@
+# util/registry.py
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class Registry:
+    """
+    무거운 모델/클라이언트를 처음 사용할 때 한 번만 생성하고 프로세스 안에서 공유하는 저장소입니다.
+    모듈을 import할 때는 생성 함수만 등록하므로 import가 가볍고, warmup()으로 미리 생성해 둘 수 있습니다.
+    테스트나 벤치마크에서는 override()로 가짜 객체를 주입합니다.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> Callable[[], Any]:
+        """생성 함수를 등록합니다. 데코레이터로도 사용할 수 있습니다."""
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+        return factory
+
+    def resource(self, name: str):
+        """@registry.resource("이름") 형태로 생성 함수를 등록하는 데코레이터"""
+        return lambda factory: self.register(name, factory)
+
+    def get(self, name: str) -> Any:
+        """등록된 객체를 반환합니다. 아직 없으면 생성합니다. (동시에 요청되어도 한 번만 생성)"""
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        if name not in self._factories:
+            raise KeyError(f"등록되지 않은 리소스입니다: {name}")
+        with self._locks[name]:
+            if name not in self._instances:
+                started = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                print(f"---리소스 생성: {name} ({time.perf_counter() - started:.2f}초)---")
+        return self._instances[name]
+
+    def get_or_create(self, name: str, factory: Callable[[], Any]) -> Any:
+        """name이 등록되어 있지 않으면 factory를 등록한 뒤 get(name)을 반환합니다. (키가 실행 중에 정해지는 리소스용)"""
+        if name not in self._factories:
+            with self._lock:
+                if name not in self._factories:
+                    self._factories[name] = factory
+                    self._locks.setdefault(name, threading.Lock())
+        return self.get(name)
+
+    def getter(self, name: str) -> Callable[[], Any]:
+        """get(name)을 호출하는 인자 없는 함수를 반환합니다."""
+        return lambda: self.get(name)
+
+    def override(self, name: str, instance: Any):
+        """생성 함수 대신 주어진 객체를 사용합니다."""
+        with self._lock:
+            self._locks.setdefault(name, threading.Lock())
+            self._factories.setdefault(name, lambda: instance)
+            self._instances[name] = instance
+
+    def reset(self, names: Optional[Iterable[str]] = None):
+        """생성된 객체를 버립니다. 다음 get()에서 다시 생성됩니다."""
+        with self._lock:
+            for name in list(self._instances if names is None else names):
+                self._instances.pop(name, None)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def warmup(self, names: Optional[Iterable[str]] = None, background: bool = True):
+        """
+        등록된 리소스(또는 names)를 미리 생성합니다.
+        background=True이면 데몬 스레드에서 생성하고 스레드를 반환합니다. 실패한 리소스는 첫 사용 시 다시 시도합니다.
+        """
+        names = list(self._factories if names is None else names)
+
+        def _run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"경고: 리소스 {name} 미리 생성 실패: {e}")
+
+        if not background:
+            _run()
+            return None
+        thread = threading.Thread(target=_run, name="registry-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+# 프로세스 전역 레지스트리
+registry = Registry()
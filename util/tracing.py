@@ -0,0 +1,340 @@
+# util/tracing.py
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.callbacks.manager import adispatch_custom_event, dispatch_custom_event
+from langchain_core.outputs import LLMResult
+
+from util.registry import registry
+
+# --- 트레이싱 설정 ---
+# span을 JSONL로 기록할 디렉토리 (비우면 파일로 기록하지 않음)
+TRACE_DIR = os.getenv("TRACE_DIR", "./traces")
+# Prometheus 형식 지표(/metrics)를 제공할 주소와 포트 (0이면 서버를 띄우지 않음)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+# 노드 실행 시간 히스토그램 구간(초)
+SPAN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 재순위화 Compressor가 소요 시간을 현재 노드 span에 기록하기 위해 보내는 사용자 정의 이벤트
+RERANK_EVENT = "rerank"
+
+# LLM 호출 캐시가 캐시에서 돌려준 응답의 generation_info에 표시하는 키
+CACHE_HIT_KEY = "cache_hit"
+
+# span에 합산하는 수치 (하위 span의 값은 상위 span에도 더해집니다)
+# llm_calls는 실제 LLM 호출 수이고, 캐시에서 응답한 호출은 cached_calls로 따로 셉니다.
+SPAN_TOTALS = ("llm_calls", "cached_calls", "input_tokens", "output_tokens", "rerank_seconds")
+
+
+def span_name(metadata: dict) -> Optional[str]:
+    """LangGraph 노드 이름. sub-agent 노드는 "search_law›retrieve"처럼 상위 노드 이름을 붙입니다."""
+    node = metadata.get("langgraph_node")
+    if node is None:
+        return None
+    parent = metadata.get("langgraph_checkpoint_ns", "").split(":", 1)[0]
+    return f"{parent}›{node}" if parent and parent != node else node
+
+
+def is_cached_response(response: LLMResult) -> bool:
+    """LLM 호출 캐시에서 나온 응답인지 확인합니다. (캐시 적중도 LLM 시작/종료 콜백이 불립니다)"""
+    generations = [generation for generations in response.generations for generation in generations]
+    return bool(generations) and all((generation.generation_info or {}).get(CACHE_HIT_KEY) for generation in generations)
+
+
+def _token_usage(response: LLMResult):
+    """LLM 응답의 (입력, 출력) 토큰 수. llm_output이 없으면(스트리밍) 메시지의 usage_metadata를 사용합니다."""
+    usage = (response.llm_output or {}).get("token_usage")
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            input_tokens += metadata.get("input_tokens", 0)
+            output_tokens += metadata.get("output_tokens", 0)
+    return input_tokens, output_tokens
+
+
+class GraphTracer(BaseCallbackHandler):
+    """
+    그래프 실행 한 번의 노드별 span을 만드는 콜백 핸들러입니다. (실행마다 새로 만들어 config의 callbacks에 넣음)
+    span에는 소요 시간, LLM 호출/토큰 수, 검색 문서 수, 평가 후 남은 문서 수, 반복 횟수, 재순위화 시간이 기록되고
+    그래프 실행이 끝나면 TraceSink로 한 번에 내보냅니다.
+    """
+    run_inline = True
+
+    def __init__(self, name: str = "legal_rag_agent", trace_id: Optional[str] = None, sink: Optional["TraceSink"] = None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.sink = sink or get_trace_sink()
+        self.finished: List[dict] = []
+        self._spans: Dict[str, dict] = {}
+        self._node_runs: Dict[UUID, str] = {}
+        self._llm_runs: Dict[UUID, str] = {}
+        self._root: Optional[UUID] = None
+        self._lock = threading.Lock()
+
+    # --- span 열기/닫기 ---
+    @staticmethod
+    def _parent_key(key: str) -> Optional[str]:
+        # checkpoint_ns는 "search_law:<id>|retrieve:<id>" 형태이고, 최상위 노드의 상위는 그래프 전체("")입니다.
+        if not key:
+            return None
+        return key.rsplit("|", 1)[0] if "|" in key else ""
+
+    def _open(self, key: str, name: str):
+        parent = self._spans.get(self._parent_key(key)) if key else None
+        self._spans[key] = {
+            "trace_id": self.trace_id,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": parent["span_id"] if parent else None,
+            "name": name,
+            "start": time.time(),
+            "_started": time.perf_counter(),
+            **{field: 0 for field in SPAN_TOTALS},
+        }
+
+    def _span_for(self, metadata: Optional[dict]) -> str:
+        key = (metadata or {}).get("langgraph_checkpoint_ns", "")
+        return key if key in self._spans else ""
+
+    def _close(self, key: str, outputs: Any = None, error: Optional[BaseException] = None):
+        span = self._spans.pop(key, None)
+        if span is None:
+            return
+        span["wall_time"] = round(time.perf_counter() - span.pop("_started"), 4)
+        span["rerank_seconds"] = round(span["rerank_seconds"], 4)
+        if error is not None:
+            span["error"] = repr(error)
+        iteration = None
+        if isinstance(outputs, dict):
+            if isinstance(outputs.get("documents"), list):
+                span["documents_retrieved"] = len(outputs["documents"])
+            if isinstance(outputs.get("extracted_info"), list):
+                span["strips_kept"] = len(outputs["extracted_info"])
+            timings = outputs.get("grading_timings") or []
+            if timings:
+                graded = timings[-1].get("documents", [])
+                span["documents_graded"] = len(graded)
+                span["documents_kept"] = sum(1 for doc in graded if doc.get("kept_strips"))
+            if "num_generations" in outputs:
+                span["iterations"] = outputs["num_generations"]
+                iteration = outputs["num_generations"]
+
+        parent = self._spans.get(self._parent_key(key)) if key else None
+        if parent is not None:
+            for field in SPAN_TOTALS:
+                parent[field] += span[field]
+            if iteration is not None:
+                # sub-agent(상위 노드) span에는 검색-평가-재작성 반복 횟수를 남깁니다.
+                parent["iterations"] = max(parent.get("iterations", 0), iteration)
+        self.finished.append(span)
+
+        if not key:
+            # 그래프 실행이 끝나면 모든 span을 내보냅니다.
+            self.sink.export(self.finished)
+            self.finished = []
+
+    # --- 콜백 ---
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        with self._lock:
+            if parent_run_id is None and self._root is None:
+                self._root = run_id
+                self._node_runs[run_id] = ""
+                self._open("", self.name)
+            elif kwargs.get("name") == metadata.get("langgraph_node") and "langgraph_checkpoint_ns" in metadata:
+                key = metadata["langgraph_checkpoint_ns"]
+                self._node_runs[run_id] = key
+                self._open(key, span_name(metadata))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            key = self._node_runs.pop(run_id, None)
+            if key is not None:
+                self._close(key, outputs)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            key = self._node_runs.pop(run_id, None)
+            if key is not None:
+                self._close(key, error=error)
+
+    def _start_llm(self, run_id: UUID, metadata: Optional[dict]):
+        with self._lock:
+            key = self._span_for(metadata)
+            self._llm_runs[run_id] = key
+            if key in self._spans:
+                self._spans[key]["llm_calls"] += 1
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        self._start_llm(run_id, metadata)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None,
+                            **kwargs: Any) -> None:
+        self._start_llm(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        cached = is_cached_response(response)
+        input_tokens, output_tokens = (0, 0) if cached else _token_usage(response)
+        with self._lock:
+            span = self._spans.get(self._llm_runs.pop(run_id, None))
+            if span is None:
+                return
+            if cached:
+                # 시작할 때 센 호출을 캐시 적중으로 옮깁니다.
+                span["llm_calls"] -= 1
+                span["cached_calls"] += 1
+            span["input_tokens"] += input_tokens
+            span["output_tokens"] += output_tokens
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._llm_runs.pop(run_id, None)
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, metadata: Optional[dict] = None,
+                        **kwargs: Any) -> None:
+        if name != RERANK_EVENT:
+            return
+        with self._lock:
+            span = self._spans.get(self._span_for(metadata))
+            if span is not None:
+                span["rerank_seconds"] += data.get("seconds", 0.0)
+
+
+# --- 재순위화 시간 보고 ---
+# Compressor에 전달된 callbacks(Retriever 실행의 하위 콜백 매니저)로 이벤트를 보내 현재 노드 span에 기록합니다.
+def report_rerank(callbacks, seconds: float, documents: int):
+    if getattr(callbacks, "parent_run_id", None) is not None:
+        dispatch_custom_event(RERANK_EVENT, {"seconds": seconds, "documents": documents}, config={"callbacks": callbacks})
+
+
+async def areport_rerank(callbacks, seconds: float, documents: int):
+    if getattr(callbacks, "parent_run_id", None) is not None:
+        await adispatch_custom_event(
+            RERANK_EVENT, {"seconds": seconds, "documents": documents}, config={"callbacks": callbacks}
+        )
+
+
+# --- 내보내기: JSONL 파일과 Prometheus 지표 ---
+class TraceSink:
+    """
+    span을 날짜별 JSONL 파일(trace-YYYYMMDD.jsonl)에 기록하고, span 이름별 지표를 누적해
+    Prometheus 텍스트 형식으로 제공합니다.
+    """
+
+    # (지표 이름, span 필드, 설명)
+    COUNTERS = (
+        ("legal_rag_span_llm_calls_total", "llm_calls", "LLM 호출 수 (하위 노드 포함, 캐시 적중 제외)"),
+        ("legal_rag_span_cached_llm_calls_total", "cached_calls", "LLM 캐시에서 응답한 호출 수 (하위 노드 포함)"),
+        ("legal_rag_span_input_tokens_total", "input_tokens", "LLM 입력 토큰 수 (하위 노드 포함)"),
+        ("legal_rag_span_output_tokens_total", "output_tokens", "LLM 출력 토큰 수 (하위 노드 포함)"),
+        ("legal_rag_span_rerank_seconds_total", "rerank_seconds", "재순위화 소요 시간(초)"),
+        ("legal_rag_span_documents_retrieved_total", "documents_retrieved", "검색된 문서 수"),
+        ("legal_rag_span_documents_graded_total", "documents_graded", "LLM으로 평가한 문서 수"),
+        ("legal_rag_span_documents_kept_total", "documents_kept", "임계값을 통과한 문서 수"),
+        ("legal_rag_span_iterations_total", "iterations", "검색-평가-재작성 반복 횟수"),
+    )
+
+    def __init__(self, directory: str = TRACE_DIR, buckets=SPAN_BUCKETS):
+        self.directory = directory
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, List[int]] = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self._sums: Dict[str, float] = defaultdict(float)
+        self._counters: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[dict]):
+        with self._lock:
+            for span in spans:
+                name = span["name"]
+                index = next((i for i, bound in enumerate(self.buckets) if span["wall_time"] <= bound), len(self.buckets))
+                self._histograms[name][index] += 1
+                self._sums[name] += span["wall_time"]
+                for _, field, _ in self.COUNTERS:
+                    if field in span:
+                        self._counters[field][name] += span[field]
+                if "error" in span:
+                    self._errors[name] += 1
+            if self.directory and spans:
+                path = os.path.join(self.directory, f"trace-{time.strftime('%Y%m%d')}.jsonl")
+                with open(path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(span, ensure_ascii=False) + "\n" for span in spans)
+
+    @staticmethod
+    def _label(name: str) -> str:
+        return name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def render(self) -> str:
+        """누적 지표를 Prometheus 텍스트 형식으로 반환합니다."""
+        lines = [
+            "# HELP legal_rag_span_seconds 노드(span) 실행 시간(초)",
+            "# TYPE legal_rag_span_seconds histogram",
+        ]
+        with self._lock:
+            for name, counts in sorted(self._histograms.items()):
+                label = self._label(name)
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f'legal_rag_span_seconds_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'legal_rag_span_seconds_bucket{{span="{label}",le="+Inf"}} {sum(counts)}')
+                lines.append(f'legal_rag_span_seconds_sum{{span="{label}"}} {self._sums[name]:.6f}')
+                lines.append(f'legal_rag_span_seconds_count{{span="{label}"}} {sum(counts)}')
+            for metric, field, description in self.COUNTERS:
+                lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+                for name, value in sorted(self._counters[field].items()):
+                    lines.append(f'{metric}{{span="{self._label(name)}"}} {value:g}')
+            lines += ["# HELP legal_rag_span_errors_total 오류로 끝난 span 수", "# TYPE legal_rag_span_errors_total counter"]
+            for name, value in sorted(self._errors.items()):
+                lines.append(f'legal_rag_span_errors_total{{span="{self._label(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+@registry.resource("trace_sink")
+def _create_trace_sink():
+    return TraceSink()
+
+get_trace_sink = registry.getter("trace_sink")
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT,
+                         sink: Optional[TraceSink] = None) -> Optional[ThreadingHTTPServer]:
+    """/metrics 경로로 지표를 제공하는 HTTP 서버를 데몬 스레드에서 실행합니다. (Gradio 앱과 같은 프로세스)"""
+    if not port:
+        return None
+    sink = sink or get_trace_sink()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = sink.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"---지표 서버 시작: http://{host}:{port}/metrics---")
+    return server
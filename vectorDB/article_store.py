@@ -0,0 +1,129 @@
+# vectorDB/article_store.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# 조문 원문(부모 문서) 저장 위치
+ARTICLE_STORE_PATH = os.getenv("ARTICLE_STORE_PATH", "./chroma_db/articles.sqlite3")
+
+# 조문 직접 조회로 처리할 질문에서 법률 이름과 조문 번호 외에 허용하는 표현
+_CITATION_PATTERN = re.compile(r'제\s*(\d+)\s*조(?:\s*의\s*(\d+))?')
+_CITATION_SPAN = re.compile(r'제\s*\d+\s*조(?:\s*의\s*\d+)?(?:\s*제\s*\d+\s*[항호])*')
+_LOOKUP_FILLERS = re.compile(
+    r'알려\s*주세요|알려\s*줘|알려\s*줄래|보여\s*주세요|보여\s*줘|보여\s*줄래|찾아\s*주세요|찾아\s*줘|어떻게\s*되나요|'
+    r'[\?\.\!,~·ㆍ"\'()]'
+)
+_LOOKUP_FILLER_WORDS = {
+    "내용", "조문", "조항", "원문", "전문", "전체", "규정", "좀", "뭐야", "뭔가요", "무엇", "무엇인가요", "및",
+}
+# 단어 끝의 조사. 조사만 남은 단어와 조사를 떼면 허용 표현인 단어('내용을')는 지웁니다.
+_PARTICLE_SUFFIX = re.compile(
+    r'(?:에서는|에서|에게|에는|으로는|로는|으로|로|한테|께서|까지|부터|보다|처럼|이라는|라는|이란|란|이랑|랑|'
+    r'은|는|이|가|의|을|를|과|와|도|에|만)$'
+)
+
+
+def lookup_residual(question: str, laws: List[str]) -> str:
+    """질문에서 법률 이름(laws), 조문 번호, 조회 요청 표현, 조사를 지우고 남은 단어들을 반환합니다."""
+    text = question
+    for law in laws:
+        law_pattern = r'\s*'.join(re.escape(char) for char in law.replace(" ", ""))
+        text = re.sub(law_pattern, " ", text)
+    text = _CITATION_SPAN.sub(" ", text)
+    text = _LOOKUP_FILLERS.sub(" ", text)
+    words = []
+    for word in text.split():
+        stripped = _PARTICLE_SUFFIX.sub("", word)
+        if stripped and stripped not in _LOOKUP_FILLER_WORDS and word not in _LOOKUP_FILLER_WORDS:
+            words.append(word)
+    return " ".join(words)
+
+
+class ArticleStore:
+    """
+    조문 전체(부모 문서)를 article_id로 저장하는 SQLite 저장소입니다.
+    벡터 인덱스에는 항/호 단위 청크만 저장하고, 검색 후 부모 조문으로 확장할 때 사용합니다.
+    """
+
+    def __init__(self, path: str = ARTICLE_STORE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS articles (
+                    article_id TEXT PRIMARY KEY,
+                    article_key TEXT NOT NULL,
+                    law TEXT NOT NULL,
+                    article TEXT NOT NULL,
+                    collection TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_law ON articles (law, article)")
+
+    def upsert(self, collection_name: str, docs: Iterable[Document]):
+        rows = [
+            (
+                doc.metadata["article_id"], doc.metadata["article_key"], doc.metadata["law"],
+                doc.metadata["article"], collection_name, doc.page_content,
+                json.dumps(doc.metadata, ensure_ascii=False),
+            )
+            for doc in docs
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete(self, article_ids: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM articles WHERE article_id = ?", [(i,) for i in article_ids])
+
+    def get(self, article_ids: List[str]) -> List[Document]:
+        """article_id 순서대로 조문 Document를 반환합니다. (없는 ID는 건너뜀)"""
+        if not article_ids:
+            return []
+        placeholders = ",".join("?" * len(article_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT article_id, content, metadata FROM articles WHERE article_id IN ({placeholders})",
+                list(article_ids),
+            ).fetchall()
+        found = {row[0]: Document(page_content=row[1], metadata=json.loads(row[2])) for row in rows}
+        return [found[i] for i in article_ids if i in found]
+
+    def laws(self) -> List[str]:
+        """저장된 법률 이름 목록을 반환합니다."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT law FROM articles").fetchall()]
+
+    def lookup(self, law: str, article: str) -> Optional[Document]:
+        """(법률 이름, 조문 번호)로 조문을 조회합니다."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, metadata FROM articles WHERE law = ? AND article = ? LIMIT 1", (law, article)
+            ).fetchone()
+        return Document(page_content=row[0], metadata=json.loads(row[1])) if row else None
+
+
+def match_article_query(question: str, laws: List[str]) -> Optional[Tuple[str, List[str], str]]:
+    """
+    법률 이름과 조문 번호가 있는 질문이면 (법률 이름, 조문 번호 목록, 남은 요청 문구)를 반환합니다. 그 외의 질문은 None을 반환합니다.
+    '근로기준법 제23조 내용'처럼 조문만 묻는 질문은 남은 요청 문구가 빈 문자열이고,
+    '근로기준법 제23조 위반 시 벌칙'처럼 다른 내용을 묻는 질문은 남은 단어들이 그대로 반환됩니다.
+    """
+    compact = question.replace(" ", "")
+    # 긴 이름을 먼저 비교하여 '개인정보 보호법 시행령'과 '개인정보 보호법'을 구분합니다.
+    law = next((name for name in sorted(laws, key=len, reverse=True) if name.replace(" ", "") in compact), None)
+    citations = _CITATION_PATTERN.findall(question)
+    if law is None or not citations:
+        return None
+
+    articles = [f"제{no}조의{sub}" if sub else f"제{no}조" for no, sub in citations]
+    return law, list(dict.fromkeys(articles)), lookup_residual(question, [law])
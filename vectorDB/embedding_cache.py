@@ -0,0 +1,119 @@
+# vectorDB/embedding_cache.py
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# 임베딩 캐시 기본 저장 위치
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+
+
+def content_hash(text: str) -> str:
+    """텍스트 내용의 SHA-256 해시를 반환합니다."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    모델 이름과 텍스트 해시를 키로 하는 디스크 기반 임베딩 캐시입니다.
+
+    벡터는 float32 행렬 파일(vectors.f32)에 행 단위로 이어 붙여 저장하고 메모리 매핑으로 읽습니다.
+    해시 → 행 번호 매핑은 index.json에 저장합니다.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR):
+        model_slug = re.sub(r"[^0-9A-Za-z._-]+", "_", model_name)
+        self.directory = os.path.join(cache_dir, model_slug)
+        self.matrix_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.json")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.dim = None
+        self.rows: Dict[str, int] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self.rows = index["rows"]
+            # 행렬 파일이 인덱스보다 짧으면(파일 손상) 캐시를 비우고 다시 채웁니다.
+            if not os.path.exists(self.matrix_path) or os.path.getsize(self.matrix_path) < self._matrix_bytes():
+                self.rows = {}
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _matrix_bytes(self) -> int:
+        """인덱스에 기록된 행들이 차지하는 행렬 파일 크기 (float32)"""
+        return len(self.rows) * (self.dim or 0) * 4
+
+    def _load_matrix(self):
+        if self._matrix is None and self.rows:
+            self._matrix = np.memmap(
+                self.matrix_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim)
+            )
+        return self._matrix
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """캐시에 있는 해시들의 벡터를 반환합니다."""
+        matrix = self._load_matrix()
+        return {h: np.array(matrix[self.rows[h]]) for h in hashes if h in self.rows}
+
+    def put_many(self, hashes: List[str], vectors: List[List[float]]):
+        """새 벡터들을 행렬 파일 끝에 추가하고 인덱스를 저장합니다."""
+        new_items = [(h, v) for h, v in zip(hashes, vectors) if h not in self.rows]
+        if not new_items:
+            return
+        block = np.asarray([v for _, v in new_items], dtype=np.float32)
+        if self.dim is None:
+            self.dim = block.shape[1]
+        elif block.shape[1] != self.dim:
+            raise ValueError(f"임베딩 차원이 캐시({self.dim})와 다릅니다: {block.shape[1]}")
+
+        # 행렬 파일에 쓴 뒤 인덱스를 저장하기 전에 중단되면 인덱스에 없는 행이 남습니다.
+        # 추가하기 전에 인덱스 크기로 잘라 새 행 번호가 파일 위치와 항상 일치하게 합니다.
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(self._matrix_bytes())
+            f.write(block.tobytes())
+        for h, _ in new_items:
+            self.rows[h] = len(self.rows)
+
+        # 인덱스는 임시 파일에 쓴 뒤 교체하여 읽는 쪽이 반쯤 쓴 인덱스를 보지 않게 합니다.
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "rows": self.rows}, f)
+        os.replace(tmp_path, self.index_path)
+        self._matrix = None
+
+
+class CachedEmbeddings(Embeddings):
+    """캐시에 없는 문서만 실제 모델로 임베딩하는 Embeddings 래퍼"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [content_hash(text) for text in texts]
+        cached = self.cache.get_many(hashes)
+
+        # 캐시에 없는 텍스트는 중복을 제거한 뒤 한 번에 임베딩합니다.
+        missing = {h: text for h, text in zip(hashes, texts) if h not in cached}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.put_many(list(missing.keys()), vectors)
+            cached.update({h: np.asarray(v, dtype=np.float32) for h, v in zip(missing.keys(), vectors)})
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [cached[h].tolist() for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,143 @@
+# vectorDB/embeddings.py
+
+import os
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from util.batching import LRUCache, MicroBatcher
+from util.registry import registry
+
+# --- 임베딩 백엔드 설정 ---
+# 수집(imbeding.py)과 검색(retrieval.py)이 같은 백엔드를 사용해야 벡터 공간이 일치합니다.
+# onnx: 프로세스 내 CPU 추론 (기본값, int8 동적 양자화), hf: sentence-transformers, ollama: Ollama 서버
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "BAAI/bge-m3")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx_models")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") == "1"
+EMBEDDING_MAX_LENGTH = int(os.getenv("EMBEDDING_MAX_LENGTH", "512"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "16"))
+# 동시에 들어온 질문 임베딩을 묶는 배치 크기와 최대 대기 시간
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "16"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+
+def embedding_id(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    """임베딩 캐시와 컬렉션 메타데이터에 기록하는 백엔드 식별자 (예: BAAI/bge-m3@onnx-int8)"""
+    if backend == "onnx" and ONNX_QUANTIZE:
+        backend = "onnx-int8"
+    return f"{model_name}@{backend}"
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    ONNX Runtime으로 bge-m3 밀집 임베딩을 프로세스 안에서 계산합니다. (CLS 풀링 + L2 정규화)
+    처음 실행 시 모델을 ONNX로 내보내고 int8 동적 양자화한 파일을 ONNX_MODEL_DIR에 저장해 재사용합니다.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, model_dir: str = ONNX_MODEL_DIR,
+                 quantize: bool = ONNX_QUANTIZE, max_length: int = EMBEDDING_MAX_LENGTH,
+                 batch_size: int = EMBEDDING_BATCH_SIZE):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        directory = os.path.join(model_dir, re.sub(r"[^0-9A-Za-z._-]+", "_", model_name))
+        if not os.path.exists(os.path.join(directory, "model.onnx")):
+            print(f"---{model_name} ONNX 변환---")
+            ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(directory)
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(directory)
+
+        file_name = "model.onnx"
+        if quantize:
+            file_name = "model_int8.onnx"
+            if not os.path.exists(os.path.join(directory, file_name)):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                print(f"---{model_name} int8 양자화---")
+                quantize_dynamic(
+                    os.path.join(directory, "model.onnx"),
+                    os.path.join(directory, file_name),
+                    weight_type=QuantType.QInt8,
+                    use_external_data_format=True,
+                )
+
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(directory, file_name=file_name)
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        hidden = np.asarray(self.model(**inputs).last_hidden_state)
+        vectors = hidden[:, 0]
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+def create_embedding_backend(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> Embeddings:
+    """설정된 백엔드의 임베딩 엔진을 생성합니다. 어느 백엔드든 질문에 별도 지시문(instruction)을 붙이지 않습니다."""
+    if backend == "onnx":
+        return OnnxEmbeddings(model_name)
+    if backend == "hf":
+        from langchain_community.embeddings import HuggingFaceBgeEmbeddings
+
+        return HuggingFaceBgeEmbeddings(
+            model_name=model_name, query_instruction="", encode_kwargs={"normalize_embeddings": True}
+        )
+    if backend == "ollama":
+        from langchain_community.embeddings import OllamaEmbeddings
+
+        return OllamaEmbeddings(model=model_name.rsplit("/", 1)[-1].lower())
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend}")
+
+
+class QueryEmbeddings(Embeddings):
+    """
+    질문 임베딩용 래퍼입니다. 같은 질문은 LRU 캐시에서 바로 반환하고,
+    비동기로 동시에 들어온 질문들은 MicroBatcher로 묶어 한 번의 배치 추론으로 계산합니다.
+    """
+
+    def __init__(self, engine: Embeddings, cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+                 max_batch_size: int = QUERY_BATCH_SIZE, max_wait_ms: float = QUERY_BATCH_WAIT_MS):
+        self.engine = engine
+        self.cache = LRUCache(cache_size)
+        self.batcher = MicroBatcher(self._embed_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # 백엔드가 질문/문서를 같은 방식으로 임베딩하므로 배치 계산에는 embed_documents를 사용합니다.
+        vectors = self.engine.embed_documents(texts)
+        for text, vector in zip(texts, vectors):
+            self.cache.put(text, vector)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.engine.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        return vector if vector is not None else self._embed_batch([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        return vector if vector is not None else await self.batcher.submit(text)
+
+
+# 수집과 검색이 같은 프로세스에 있으면 엔진 하나를 공유합니다.
+@registry.resource("embedding_engine")
+def _create_embedding_engine():
+    return create_embedding_backend()
+
+get_embedding_engine = registry.getter("embedding_engine")
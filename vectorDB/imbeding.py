@@ -1,16 +1,23 @@
 # 필요한 라이브러리 임포트
+import argparse
 import os
-import re
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from glob import glob
-from textwrap import dedent
-import uuid
 import warnings
 
+import chromadb
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_core.documents import Document
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceBgeEmbeddings
+
+from vectorDB.article_store import ArticleStore
+from vectorDB.law_versions import bump_law_versions
+from vectorDB.embedding_cache import CachedEmbeddings, EmbeddingCache
+from vectorDB.embeddings import embedding_id, get_embedding_engine
+from vectorDB.law_loader import STATUTE_COLLECTION, build_law_documents
+from vectorDB.law_router import LAW_CENTROIDS_PATH, LawRouter
+from vectorDB.sparse_index import SparseIndex
+from util.registry import registry
 
 # .env 파일 로드
 load_dotenv()
@@ -18,132 +25,282 @@ load_dotenv()
 # 경고 메시지 무시
 warnings.filterwarnings("ignore")
 
-# 임베딩 모델 정의 (Hugging Face 모델 사용)
+# 임베딩 모델 정의 (vectorDB/embeddings.py의 백엔드를 검색과 함께 사용)
 # 'BAAI/bge-m3'는 다국어(한국어 포함) 성능이 우수한 모델입니다.
-# HuggingFaceBgeEmbeddings 클래스를 사용하려면 'sentence-transformers' 패키지가 필요합니다.
-embeddings_model = HuggingFaceBgeEmbeddings(model_name="BAAI/bge-m3")
+# 조문 내용 해시 기반 디스크 캐시로 감싸서, 변경되지 않은 조문은 다시 임베딩하지 않습니다.
+# 모델은 실제로 임베딩할 조문이 생겼을 때 처음 로드합니다. (변경이 없으면 로드하지 않음)
+EMBEDDING_ID = embedding_id()
+
+@registry.resource("ingest_embeddings")
+def _create_ingest_embeddings():
+    # 백엔드가 바뀌면 벡터도 달라지므로 캐시는 백엔드 식별자별로 분리합니다.
+    return CachedEmbeddings(get_embedding_engine(), EmbeddingCache(EMBEDDING_ID))
+
+get_ingest_embeddings = registry.getter("ingest_embeddings")
 
-# 법률 텍스트 파싱 함수
-def parse_law(law_text):
+# --- 수집 파이프라인 설정 ---
+CHROMA_PERSIST_DIRECTORY = "./chroma_db"
+# 한 번에 임베딩하여 writer로 넘길 조문 수
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# PDF 추출/파싱을 수행할 프로세스 수
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+def plan_law_sync(collection, law_name, chunks, mode="sync"):
     """
-    법률 텍스트를 서문, 장, 조문, 부칙으로 분리하여 딕셔너리로 반환합니다.
+    컬렉션에 저장된 해당 법률의 청크와 새 청크 목록을 조문 단위로 비교하여 반영할 변경 사항을 계산합니다.
+    추가/개정된 조문의 청크는 새 ID로 추가하고, 개정 전 조문과 폐지된 조문의 청크는 삭제 대상이 됩니다.
+    (변경 내역 diff, 추가할 청크 목록, 삭제할 청크 ID 목록, 삭제할 조문 ID 목록)을 반환합니다.
     """
-    preamble_pattern = r'^(.*?)(?=제1장|제1조)'
-    preamble = re.search(preamble_pattern, law_text, re.DOTALL)
-    if preamble:
-        preamble = preamble.group(1).strip()
-    else:
-        preamble = ""
+    existing = collection.get(where={"law": law_name}, include=["metadatas"])
+    new_articles = {}
+    for chunk in chunks:
+        new_articles.setdefault(chunk.metadata["article_key"], []).append(chunk)
 
-    chapter_pattern = r'(제\d+장\s+.+?)\n((?:제\d+조(?:의\d+)?(?:\(\w+\))?.*?)(?=제\d+장|부칙|$))'
-    chapters = re.findall(chapter_pattern, law_text, re.DOTALL)
+    if mode == "rebuild":
+        # 해당 법률의 기존 청크를 모두 지우고 새로 저장합니다.
+        stored_article_ids = {(m or {}).get("article_id") for m in existing["metadatas"]} - {None}
+        diff = {"added": list(new_articles), "updated": [], "deleted": [],
+                "unchanged": 0, "stale_removed": len(existing["ids"])}
+        return diff, chunks, list(existing["ids"]), list(stored_article_ids)
 
-    appendix_pattern = r'(부칙.*)'
-    appendix = re.search(appendix_pattern, law_text, re.DOTALL)
-    if appendix:
-        appendix = appendix.group(1).strip()
-    else:
-        appendix = ""
-
-    parsed_law = {'서문': preamble, '장': {}, '부칙': appendix}
+    # 저장된 청크를 조문(article_key)별로 묶습니다.
+    existing_articles = {}
+    stale_ids = []
+    for chunk_id, metadata in zip(existing["ids"], existing["metadatas"]):
+        metadata = metadata or {}
+        if metadata.get("article_key") is None or metadata.get("chunk_index") is None:
+            # 이전 방식(무작위 ID 또는 조문 단위)으로 저장된 문서는 정리 대상입니다.
+            stale_ids.append(chunk_id)
+            continue
+        stored = existing_articles.setdefault(metadata["article_key"], {"article_id": metadata["article_id"], "ids": []})
+        stored["ids"].append(chunk_id)
 
-    article_pattern = r'(제\d+조(?:의\d+)?\s*\([^)]+\).*?)(?=제\d+조(?:의\d+)?\s*\([^)]+\)|$)'
+    def article_id_of(key):
+        return new_articles[key][0].metadata["article_id"]
 
-    if chapters:
-        for chapter_title, chapter_content in chapters:
-            articles = re.findall(article_pattern, chapter_content, re.DOTALL)
-            parsed_law['장'][chapter_title.strip()] = [article.strip() for article in articles]
-    else:
-        main_text = re.sub(preamble_pattern, '', law_text, flags=re.DOTALL)
-        main_text = re.sub(appendix_pattern, '', main_text, flags=re.DOTALL)
-        articles = re.findall(article_pattern, main_text, re.DOTALL)
-        parsed_law['조문'] = [article.strip() for article in articles]
+    added = [key for key in new_articles if key not in existing_articles]
+    updated = [key for key in new_articles if key in existing_articles and existing_articles[key]["article_id"] != article_id_of(key)]
+    deleted = [key for key in existing_articles if key not in new_articles]
 
-    return parsed_law
+    diff = {
+        "added": added,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": len(new_articles) - len(added) - len(updated),
+        "stale_removed": len(stale_ids),
+    }
+    upsert_chunks = [chunk for key in added + updated for chunk in new_articles[key]]
+    delete_ids = [chunk_id for key in updated + deleted for chunk_id in existing_articles[key]["ids"]] + stale_ids
+    delete_article_ids = [existing_articles[key]["article_id"] for key in updated + deleted]
+    return diff, upsert_chunks, delete_ids, delete_article_ids
 
-def process_pdf_and_embed(pdf_file_path):
+class ChromaWriter(threading.Thread):
     """
-    PDF 파일을 로드, 파싱, 정리하여 ChromaDB에 임베딩합니다.
+    큐로 전달된 쓰기 작업(upsert/delete)을 순서대로 Chroma에 반영하는 단일 writer 스레드입니다.
+    임베딩 계산과 디스크 쓰기가 겹쳐서 진행되고, 컬렉션에 동시에 쓰는 일이 없습니다.
     """
-    # 파일 이름에서 법률 이름 추출 및 컬렉션 이름 설정
-    law_name_raw = os.path.basename(pdf_file_path).split('(')[0].strip()
-    law_name_base = law_name_raw.replace('법률', '').replace(' ', '').replace('개인정보', '개인정보 보호법')
-    law_name = law_name_base if law_name_base else law_name_raw
-    collection_name_map = {
-        '근로기준법': 'labor_law',
-        '개인정보보호법': 'personal_law',
-        '주택임대차보호법': 'housing_law'
-    }
-    collection_name = collection_name_map.get(law_name.replace(' ', ''), 'default_law')
 
-    print(f"=== {law_name} ({collection_name}) 임베딩 시작 ===")
+    def __init__(self, client, article_store, max_pending=4):
+        super().__init__(daemon=True)
+        self.client = client
+        self.article_store = article_store
+        self.sparse_indexes = {}
+        self.tasks = queue.Queue(maxsize=max_pending)
+        self.error = None
 
-    # PDF 로드
-    loader = PyPDFLoader(pdf_file_path)
-    pages = loader.load()
+    def sparse_index(self, collection_name):
+        if collection_name not in self.sparse_indexes:
+            self.sparse_indexes[collection_name] = SparseIndex.load(SparseIndex.path_for(collection_name))
+        return self.sparse_indexes[collection_name]
 
-    # 페이지 텍스트 병합 및 불필요한 헤더 삭제
-    text_for_delete_pattern = r"법제처\s+\d+\s+국가법령정보센터\n" + law_name
-    law_text = "\n".join([re.sub(text_for_delete_pattern, "", p.page_content).strip() for p in pages])
-    
-    # 법률 파싱
-    parsed_law = parse_law(law_text)
-    
-    final_docs = []
-
-    # 파싱된 내용으로 Document 객체 생성
-    if '장' in parsed_law and parsed_law['장']:
-        for chapter, articles in parsed_law['장'].items():
-            metadata = {
-                "source": pdf_file_path,
-                "chapter": chapter,
-                "name": law_name
-            }
-            for article in articles:
-                content = dedent(f"""
-                [법률정보]
-                다음 조항은 {metadata['name']} {metadata['chapter']}에서 발췌한 내용입니다.
-
-                [법률조항]
-                {article}
-                """)
-                final_docs.append(Document(page_content=content, metadata=metadata))
-    elif '조문' in parsed_law and parsed_law['조문']:
-        metadata = {
-            "source": pdf_file_path,
-            "name": law_name
-        }
-        for article in parsed_law['조문']:
-            content = dedent(f"""
-            [법률정보]
-            다음 조항은 {metadata['name']}에서 발췌한 내용입니다.
-
-            [법률조항]
-            {article}
-            """)
-            final_docs.append(Document(page_content=content, metadata=metadata))
-    else:
-        print("경고: 파싱된 내용이 없습니다.")
-        return
+    def submit(self, op, collection_name, payload):
+        self.tasks.put((op, collection_name, payload))
 
-    # Chroma 인덱스 생성 (기존 데이터 삭제 후 새로 생성)
-    _ = Chroma.from_documents(
-        documents=final_docs, 
-        embedding=embeddings_model,   
-        collection_name=collection_name,
-        persist_directory="./chroma_db",
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            op, collection_name, payload = task
+            if self.error is not None:
+                continue
+            try:
+                if op == "upsert_articles":
+                    self.article_store.upsert(collection_name, payload)
+                    continue
+                if op == "delete_articles":
+                    self.article_store.delete(payload)
+                    continue
+                if op == "index_sparse":
+                    index = self.sparse_index(collection_name)
+                    for chunk in payload:
+                        index.add(chunk.metadata["chunk_id"], chunk.page_content, chunk.metadata)
+                    continue
+                # 임베딩은 미리 계산해서 넘기므로 컬렉션의 임베딩 함수는 사용하지 않습니다.
+                collection = self.client.get_or_create_collection(collection_name, embedding_function=None)
+                if op == "upsert":
+                    collection.upsert(**payload)
+                elif op == "delete" and payload:
+                    collection.delete(ids=payload)
+                    self.sparse_index(collection_name).remove(payload)
+            except Exception as e:
+                self.error = e
+
+    def close(self):
+        self.tasks.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+        # 변경된 희소 인덱스를 디스크에 저장합니다.
+        for collection_name, index in self.sparse_indexes.items():
+            index.save(SparseIndex.path_for(collection_name))
+
+def embed_and_write(writer, collection_name, docs):
+    """
+    청크 Document들을 EMBED_BATCH_SIZE 단위로 임베딩하여 writer에 upsert 작업으로 전달합니다.
+    """
+    for i in range(0, len(docs), EMBED_BATCH_SIZE):
+        batch = docs[i:i + EMBED_BATCH_SIZE]
+        vectors = get_ingest_embeddings().embed_documents([doc.page_content for doc in batch])
+        writer.submit("upsert", collection_name, {
+            "ids": [doc.metadata["chunk_id"] for doc in batch],
+            "embeddings": vectors,
+            "documents": [doc.page_content for doc in batch],
+            "metadatas": [doc.metadata for doc in batch],
+        })
+
+def print_sync_report(law_name, collection_name, diff, num_docs):
+    print(f"=== {law_name} ({collection_name}) 동기화 결과 ===")
+    print(
+        f"추가 {len(diff['added'])}개, 개정 {len(diff['updated'])}개, 삭제 {len(diff['deleted'])}개, "
+        f"변경 없음 {diff['unchanged']}개, 정리된 이전 문서 {diff['stale_removed']}개"
     )
-    
-    print(f"총 {len(final_docs)}개의 문서를 {collection_name} 컬렉션에 임베딩했습니다.")
+    for label in ("added", "updated", "deleted"):
+        if diff[label]:
+            print(f"  {label}: {', '.join(key.rsplit('/', 1)[-1] for key in diff[label])}")
+    print(f"총 {num_docs}개의 청크가 {collection_name} 컬렉션에 동기화되었습니다.")
     print("--------------------------------------------------")
 
+# 법률별 컬렉션을 사용하던 이전 구조의 컬렉션 이름 (모든 법률은 이제 STATUTE_COLLECTION 하나에 저장됨)
+LEGACY_COLLECTIONS = ("personal_law", "labor_law", "housing_law", "default_law")
+
+def drop_legacy_collections(client):
+    """더 이상 검색에 사용하지 않는 이전 법률별 컬렉션과 희소 인덱스를 삭제합니다."""
+    for name in LEGACY_COLLECTIONS:
+        try:
+            client.get_collection(name)
+        except Exception:
+            continue
+        client.delete_collection(name)
+        sparse_path = SparseIndex.path_for(name)
+        if os.path.exists(sparse_path):
+            os.remove(sparse_path)
+        print(f"---이전 법률별 컬렉션 삭제: {name}---")
+
+def update_law_centroids(client):
+    """로컬 라우터(vectorDB/law_router.py)가 사용할 법률별 대표 벡터를 저장된 청크 임베딩으로 다시 계산합니다."""
+    try:
+        collection = client.get_collection(STATUTE_COLLECTION)
+    except Exception:
+        return
+    data = collection.get(include=["embeddings", "metadatas"])
+    router = LawRouter.from_embeddings(data["embeddings"], data["metadatas"], EMBEDDING_ID)
+    router.save(LAW_CENTROIDS_PATH)
+    print(f"---법률 대표 벡터 갱신: {len(set(router.laws))}개 법률, {len(router.laws)}개 벡터---")
+
+def ingest_pdfs(pdf_files, mode="sync", workers=INGEST_WORKERS):
+    """
+    여러 PDF를 3단계 파이프라인으로 수집합니다.
+    1) 프로세스 풀에서 PDF 추출(페이지 스트리밍 + 헤더 삭제)과 파싱, 항/호 단위 청크 분할
+    2) 메인 프로세스에서 변경된 조문의 청크만 고정 크기 배치로 임베딩
+    3) 단일 writer 스레드가 Chroma(청크), 희소 BM25 인덱스, ArticleStore(조문 원문)에 upsert/delete
+    내용이 바뀐 법률은 수집 버전을 갱신하여 이전 답변 캐시가 무효화되게 합니다.
+    법률 이름별 변경 내역(diff)을 반환합니다.
+    """
+    client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIRECTORY)
+    writer = ChromaWriter(client, ArticleStore())
+    writer.start()
+    reports = {}
+    changed_laws = set()
+    backend_changed = {}
+    restamp_collections = []
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pdf_files)))) as pool:
+            futures = {pool.submit(build_law_documents, path): path for path in pdf_files}
+            for future in as_completed(futures):
+                pdf_file_path = futures[future]
+                try:
+                    law_name, collection_name, chunks, articles = future.result()
+                except Exception as e:
+                    print(f"경고: {pdf_file_path} 처리 중 오류가 발생했습니다: {e}")
+                    continue
+                if not chunks:
+                    print(f"경고: {pdf_file_path} 파싱된 내용이 없습니다.")
+                    continue
+
+                collection = client.get_or_create_collection(collection_name, embedding_function=None)
+                # 다른 임베딩 백엔드로 만든 컬렉션은 벡터 공간이 다르므로 해당 법률을 다시 임베딩합니다.
+                # (한 컬렉션에 여러 법률이 있을 수 있으므로 컬렉션별 판단 결과를 이번 실행 동안 유지합니다.)
+                if collection_name not in backend_changed:
+                    stored_embedding = (collection.metadata or {}).get("embedding")
+                    backend_changed[collection_name] = stored_embedding != EMBEDDING_ID and collection.count() > 0
+                    if backend_changed[collection_name]:
+                        print(f"---{collection_name}: 임베딩 백엔드 변경 ({stored_embedding} → {EMBEDDING_ID}), 재구축---")
+                    if stored_embedding != EMBEDDING_ID:
+                        restamp_collections.append(collection)
+                law_mode = "rebuild" if backend_changed[collection_name] else mode
+                diff, upsert_chunks, delete_ids, delete_article_ids = plan_law_sync(collection, law_name, chunks, law_mode)
+                if law_mode == "rebuild":
+                    # 재구축 시에는 기존 문서를 먼저 삭제해야 같은 ID의 새 문서가 남습니다.
+                    writer.submit("delete", collection_name, delete_ids)
+                    writer.submit("delete_articles", collection_name, delete_article_ids)
+                # 조문 원문과 희소 인덱스는 임베딩이 필요 없으므로 매번 모두 반영합니다. (파일이 없어도 복구됨)
+                writer.submit("upsert_articles", collection_name, articles)
+                writer.submit("index_sparse", collection_name, chunks)
+                embed_and_write(writer, collection_name, upsert_chunks)
+                if law_mode != "rebuild":
+                    writer.submit("delete", collection_name, delete_ids)
+                    writer.submit("delete_articles", collection_name, delete_article_ids)
+
+                reports[law_name] = diff
+                if law_mode == "rebuild" or diff["added"] or diff["updated"] or diff["deleted"] or diff["stale_removed"]:
+                    changed_laws.add(law_name)
+                print_sync_report(law_name, collection_name, diff, len(chunks))
+    finally:
+        writer.close()
+    # 모든 쓰기가 끝난 뒤에 백엔드를 기록하여, 중간에 실패하면 다음 실행에서 다시 재구축되게 합니다.
+    for collection in restamp_collections:
+        collection.modify(metadata={**(collection.metadata or {}), "embedding": EMBEDDING_ID})
+    bump_law_versions(changed_laws)
+    if changed_laws or restamp_collections or not os.path.exists(LAW_CENTROIDS_PATH):
+        update_law_centroids(client)
+    drop_legacy_collections(client)
+
+    if registry.is_loaded("ingest_embeddings"):
+        embeddings_model = get_ingest_embeddings()
+        print(f"임베딩 캐시: 적중 {embeddings_model.hits}개, 신규 계산 {embeddings_model.misses}개")
+    return reports
+
+def process_pdf_and_embed(pdf_file_path, mode="sync"):
+    """
+    PDF 파일을 로드, 파싱, 정리하여 ChromaDB에 임베딩합니다.
+    mode="sync"는 변경된 조문만 반영하고, mode="rebuild"는 해당 법률의 조문을 모두 다시 저장합니다.
+    """
+    reports = ingest_pdfs([pdf_file_path], mode=mode, workers=1)
+    return next(iter(reports.values()), None)
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="data 폴더의 법률 PDF를 ChromaDB에 임베딩합니다.")
+    parser.add_argument("--rebuild", action="store_true", help="변경 여부와 관계없이 모든 조문을 다시 저장합니다.")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="PDF 추출/파싱 프로세스 수")
+    args = parser.parse_args()
+
     # pdf 파일 목록을 확인
     pdf_files = glob(os.path.join('data', '*.pdf'))
     
     if not pdf_files:
         print("data 폴더에 PDF 파일이 없습니다. 파일을 추가해 주세요.")
     else:
-        for file_path in pdf_files:
-            process_pdf_and_embed(file_path)
\ No newline at end of file
+        ingest_pdfs(pdf_files, mode="rebuild" if args.rebuild else "sync", workers=args.workers)
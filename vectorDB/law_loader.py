@@ -0,0 +1,110 @@
+# vectorDB/law_loader.py
+# PDF 추출과 법률 파싱만 담당합니다. 임베딩 모델을 불러오지 않으므로 프로세스 풀 워커에서 사용할 수 있습니다.
+
+import os
+import re
+from textwrap import dedent
+from typing import Iterable, Iterator
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+
+from util.parse_law import parse_law_tree, split_article
+from vectorDB.embedding_cache import content_hash
+
+
+def strip_page_headers(pages: Iterable[Document], law_name: str) -> Iterator[str]:
+    """
+    페이지를 하나씩 받아 '법제처 N 국가법령정보센터' 헤더를 삭제한 텍스트를 내보냅니다.
+    """
+    header_pattern = re.compile(r"법제처\s+\d+\s+국가법령정보센터\n" + re.escape(law_name))
+    for page in pages:
+        yield header_pattern.sub("", page.page_content).strip()
+
+# 모든 법률을 하나의 컬렉션에 저장하고 metadata의 law(법률 이름)로 구분합니다.
+STATUTE_COLLECTION = os.getenv("STATUTE_COLLECTION", "statutes")
+
+def get_law_name(pdf_file_path):
+    """
+    파일 이름에서 법률 이름을 추출합니다. (예: '개인정보 보호법(법률)(...).pdf' → '개인정보 보호법')
+    """
+    law_name_raw = os.path.basename(pdf_file_path).split('(')[0].strip()
+    return law_name_raw.replace('법률', '').strip() or law_name_raw
+
+def get_article_id(law_name, chapter, number, article_text):
+    """
+    법률, 장, 조문 번호, 조문 내용 해시로 결정적인 조문 ID를 생성합니다.
+    '@' 앞부분(article_key)은 조문이 개정되어도 유지되고, 해시 부분만 바뀝니다.
+    """
+    article_key = f"{law_name.replace(' ', '')}/{chapter}/{number}"
+    return article_key, f"{article_key}@{content_hash(article_text)[:16]}"
+
+def load_law_text(pdf_file_path, law_name=None):
+    """
+    PDF 페이지를 하나씩 읽으면서 헤더를 삭제하고 하나의 법률 텍스트로 병합합니다.
+    """
+    law_name = law_name or get_law_name(pdf_file_path)
+    pages = PyPDFLoader(pdf_file_path).lazy_load()
+    return "\n".join(strip_page_headers(pages, law_name))
+
+# 항/호 단위 청크의 최대 길이. 이보다 긴 항은 호 단위로 나눕니다.
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "500"))
+
+def build_law_documents(pdf_file_path):
+    """
+    PDF 파일을 로드, 파싱하여 (법률 이름, 컬렉션 이름, 청크 Document 목록, 조문 Document 목록)을 반환합니다.
+    청크는 벡터 인덱스에, 조문(부모 문서)은 ArticleStore에 저장됩니다.
+    각 청크의 metadata에는 법률 이름(law), 장(chapter), 조문 번호(article),
+    부모 조문 ID(article_id), 청크 순번(chunk_index), 청크 ID(chunk_id)가 포함됩니다.
+    """
+    law_name = get_law_name(pdf_file_path)
+    collection_name = STATUTE_COLLECTION
+
+    # 법률 파싱 (장/절/조 트리). 항/호는 청크를 나눌 때 조문별로 필요한 만큼만 찾습니다.
+    law_tree = parse_law_tree(load_law_text(pdf_file_path, law_name))
+
+    chunk_docs = []
+    article_docs = []
+
+    # 파싱된 조문으로 부모(조문) Document와 자식(항/호) Document 생성
+    for article in law_tree['articles']:
+        chapter = article['chapter']
+        article_key, article_id = get_article_id(law_name, chapter, article['number'], article['text'])
+        metadata = {
+            "source": pdf_file_path,
+            "law": law_name,
+            "article": article['number'],
+            "article_key": article_key,
+            "article_id": article_id,
+        }
+        if chapter:
+            metadata["chapter"] = chapter
+        location = f"{law_name} {chapter}" if chapter else law_name
+        content = dedent(f"""
+        [법률정보]
+        다음 조항은 {location}에서 발췌한 내용입니다.
+
+        [법률조항]
+        {article['text']}
+        """)
+        article_docs.append(Document(page_content=content, metadata=metadata))
+
+        heading = f"{article['number']}({article['title']})"
+        chunks = split_article(article, CHUNK_MAX_CHARS)
+        for index, chunk in enumerate(chunks):
+            chunk_content = dedent(f"""
+            [법률정보]
+            다음 조항은 {location} {heading}에서 발췌한 내용입니다.
+
+            [법률조항]
+            {chunk if chunk.startswith(article['number']) else f"{heading} {chunk}"}
+            """)
+            chunk_metadata = {
+                **metadata,
+                "chunk_index": index,
+                "chunk_count": len(chunks),
+                "chunk_id": f"{article_id}#{index}",
+            }
+            chunk_docs.append(Document(page_content=chunk_content, metadata=chunk_metadata))
+
+    return law_name, collection_name, chunk_docs, article_docs
@@ -0,0 +1,117 @@
+# vectorDB/law_router.py
+
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from vectorDB.embeddings import embedding_id
+from vectorDB.sparse_index import extract_citations
+
+# --- 로컬 라우터 설정 ---
+# 수집 시 계산한 법률별 대표 벡터 파일
+LAW_CENTROIDS_PATH = os.getenv("LAW_CENTROIDS_PATH", "./chroma_db/law_centroids.npz")
+# 질문과 법률 대표 벡터의 코사인 유사도가 이 값 이상이어야 해당 법률을 검색합니다.
+LOCAL_ROUTER_MIN_SCORE = float(os.getenv("LOCAL_ROUTER_MIN_SCORE", "0.5"))
+# 최고 점수와의 차이가 이 값 이내인 법률은 함께 검색합니다. (여러 법률에 걸친 질문)
+LOCAL_ROUTER_MULTI_MARGIN = float(os.getenv("LOCAL_ROUTER_MULTI_MARGIN", "0.03"))
+# 선택한 법률과 선택하지 않은 법률의 점수 차이가 이 값보다 작으면 확신이 낮다고 보고 LLM 라우터를 사용합니다.
+LOCAL_ROUTER_MIN_MARGIN = float(os.getenv("LOCAL_ROUTER_MIN_MARGIN", "0.05"))
+# 최신 정보나 사례를 묻는 표현. 조문을 인용한 질문에서는 웹 검색을 함께 하고, 그 밖의 질문에서는 LLM 라우터에 맡깁니다.
+WEB_SEARCH_WORDS = ("최근", "최신", "요즘", "뉴스", "사례", "판례", "동향", "통계", "현황")
+
+
+def _normalize(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class LawRouter:
+    """
+    질문 임베딩을 법률별 대표 벡터(장 단위 청크 임베딩 평균)와 비교해 검색할 법률을 고르는 로컬 라우터입니다.
+    법률 점수는 그 법률 대표 벡터들과의 최대 코사인 유사도이고, 법률 선택이나 웹 검색 여부가 확실하지 않으면
+    confident=False를 돌려 LLM 라우터를 쓰게 합니다.
+    """
+
+    def __init__(self, laws: List[str], vectors, embedding: str = "",
+                 min_score: float = LOCAL_ROUTER_MIN_SCORE, multi_margin: float = LOCAL_ROUTER_MULTI_MARGIN,
+                 min_margin: float = LOCAL_ROUTER_MIN_MARGIN):
+        # laws[i]는 vectors[i]가 대표하는 법률 이름입니다. (법률 하나에 대표 벡터 여러 개)
+        self.laws = list(laws)
+        self.vectors = _normalize(vectors)
+        self.embedding = embedding
+        self.min_score = min_score
+        self.multi_margin = multi_margin
+        self.min_margin = min_margin
+
+    @classmethod
+    def from_embeddings(cls, embeddings, metadatas: Iterable[dict], embedding: str = "") -> "LawRouter":
+        """청크 임베딩을 (법률, 장)별로 평균해 대표 벡터를 만듭니다. 장이 없는 법률은 법률 전체 평균 하나를 사용합니다."""
+        groups: Dict[tuple, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            metadata = metadata or {}
+            if metadata.get("law"):
+                groups.setdefault((metadata["law"], metadata.get("chapter", "")), []).append(i)
+        embeddings = _normalize(embeddings) if groups else np.zeros((0, 0), dtype=np.float32)
+        keys = sorted(groups)
+        vectors = [embeddings[groups[key]].mean(axis=0) for key in keys]
+        return cls([law for law, _ in keys], np.stack(vectors) if vectors else np.zeros((0, 0)), embedding)
+
+    # --- 저장/불러오기 ---
+    def save(self, path: str = LAW_CENTROIDS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, laws=np.array(self.laws), vectors=self.vectors, embedding=np.array(self.embedding))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = LAW_CENTROIDS_PATH) -> Optional["LawRouter"]:
+        """저장된 대표 벡터를 불러옵니다. 파일이 없거나 다른 임베딩 백엔드로 만든 파일이면 None"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            embedding = str(data["embedding"])
+            if embedding != embedding_id():
+                print(f"---법률 대표 벡터의 임베딩 백엔드가 다릅니다 ({embedding}), 다시 계산합니다---")
+                return None
+            return cls([str(law) for law in data["laws"]], data["vectors"], embedding)
+
+    # --- 라우팅 ---
+    def scores(self, vector, laws: Optional[List[str]] = None) -> Dict[str, float]:
+        """법률별 점수 (대표 벡터와의 최대 코사인 유사도). laws를 주면 그 법률만 계산합니다."""
+        if not self.laws:
+            return {}
+        similarities = self.vectors @ _normalize(vector)
+        scores: Dict[str, float] = {}
+        for law, similarity in zip(self.laws, similarities.tolist()):
+            if laws is None or law in laws:
+                scores[law] = max(scores.get(law, -1.0), similarity)
+        return scores
+
+    def route(self, question: str, vector, laws: Optional[List[str]] = None) -> dict:
+        """
+        검색할 법률(여러 개 가능), 웹 검색 여부, 법률별 점수, 확신 여부를 반환합니다.
+        법률 대표 벡터로는 웹 검색이 필요한지 알 수 없으므로, 다음 경우에만 confident입니다.
+        - 질문이 조문을 인용하고(제N조) 법률 선택이 확실한 경우: 조문 질문이므로 법률 검색
+          (최신 정보나 사례를 함께 묻는 표현이 있으면 웹 검색도 함께)
+        - 조문 인용은 없지만 법률 하나만 확실히 선택되고 최신 정보를 묻는 표현이 없는 경우: 법률 검색만
+        법률 선택이 확실하다는 것은 최고 점수가 min_score 이상이고, 선택한 법률과 나머지 법률의 점수 차이가 min_margin 이상인 것입니다.
+        """
+        scores = self.scores(vector, laws)
+        best = max(scores.values(), default=0.0)
+        cutoff = max(self.min_score, best - self.multi_margin)
+        selected = [law for law, score in sorted(scores.items(), key=lambda x: x[1], reverse=True) if score >= cutoff]
+        rest = [score for law, score in scores.items() if law not in selected]
+        margin = min((scores[law] for law in selected), default=0.0) - max(rest, default=-1.0)
+        cites_article = bool(extract_citations(question))
+        asks_recent = any(word in question for word in WEB_SEARCH_WORDS)
+        laws_certain = bool(selected) and margin >= self.min_margin
+        return {
+            "laws": selected,
+            "web_search": cites_article and asks_recent,
+            "scores": {law: round(score, 4) for law, score in scores.items()},
+            "margin": round(margin, 4),
+            "cites_article": cites_article,
+            "confident": laws_certain and (cites_article or (len(selected) == 1 and not asks_recent)),
+        }
@@ -0,0 +1,39 @@
+# vectorDB/law_versions.py
+
+import json
+import os
+import time
+import uuid
+from typing import Dict, Iterable
+
+# 법률별 수집 버전 기록 파일. 법률이 다시 수집되어 내용이 바뀌면 버전이 갱신됩니다.
+LAW_VERSIONS_PATH = os.getenv("LAW_VERSIONS_PATH", "./chroma_db/law_versions.json")
+
+_cache = {"mtime": None, "versions": {}}
+
+
+def get_law_versions(path: str = LAW_VERSIONS_PATH) -> Dict[str, str]:
+    """법률 이름 → 버전 문자열을 반환합니다. 파일이 바뀌었을 때만 다시 읽습니다."""
+    if not os.path.exists(path):
+        return {}
+    mtime = os.path.getmtime(path)
+    if _cache["mtime"] != mtime:
+        with open(path, encoding="utf-8") as f:
+            _cache["versions"] = json.load(f)
+        _cache["mtime"] = mtime
+    return dict(_cache["versions"])
+
+
+def bump_law_versions(law_names: Iterable[str], path: str = LAW_VERSIONS_PATH):
+    """주어진 법률들의 버전을 새로 발급합니다."""
+    law_names = list(law_names)
+    if not law_names:
+        return
+    versions = get_law_versions(path)
+    for name in law_names:
+        versions[name] = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(versions, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
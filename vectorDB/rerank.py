@@ -0,0 +1,124 @@
+# vectorDB/rerank.py
+
+import asyncio
+import os
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from pydantic import ConfigDict
+
+from util.batching import LRUCache, MicroBatcher
+from util.registry import registry
+from util.tracing import areport_rerank, report_rerank
+from vectorDB.embedding_cache import content_hash
+
+# --- 재순위화 서비스 설정 ---
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "BAAI/bge-reranker-v2-m3")
+# 여러 Retriever에서 동시에 들어온 (질문, 문서) 쌍을 한 번의 추론으로 묶는 최대 쌍 수와 대기 시간
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+RERANK_BATCH_WAIT_MS = float(os.getenv("RERANK_BATCH_WAIT_MS", "10"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+
+def document_key(doc: Document) -> str:
+    """점수 캐시에 사용하는 문서 식별자 (청크 ID가 없으면 내용 해시)"""
+    return doc.metadata.get("chunk_id") or content_hash(doc.page_content)
+
+
+class RerankService:
+    """
+    Cross-encoder 점수 계산을 프로세스 안에서 공유하는 서비스입니다.
+    비동기 요청의 (질문, 문서) 쌍은 MicroBatcher로 모아 한 번의 forward pass로 계산하고,
+    계산한 점수는 (질문, 문서 ID) 키로 LRU 캐시에 저장합니다.
+    """
+
+    def __init__(self, model, batch_size: int = RERANK_BATCH_SIZE, max_wait_ms: float = RERANK_BATCH_WAIT_MS,
+                 cache_size: int = RERANK_CACHE_SIZE):
+        self.model = model
+        self.cache = LRUCache(cache_size)
+        self.batcher = MicroBatcher(self._score_batch, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+        # 동기 호출과 배치 호출이 같은 모델을 동시에 돌리지 않게 합니다.
+        self._model_lock = threading.Lock()
+        self.forward_passes = 0
+        self.scored_pairs = 0
+
+    def _score_batch(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        with self._model_lock:
+            scores = self.model.score(pairs)
+        self.forward_passes += 1
+        self.scored_pairs += len(pairs)
+        return [float(score) for score in scores]
+
+    def _cached(self, query: str, docs: Sequence[Document]):
+        keys = [(query, document_key(doc)) for doc in docs]
+        return keys, [self.cache.get(key) for key in keys]
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        keys, scores = self._cached(query, docs)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            computed = self._score_batch([(query, docs[i].page_content) for i in missing])
+            for i, score in zip(missing, computed):
+                scores[i] = score
+                self.cache.put(keys[i], score)
+        return scores
+
+    async def ascore(self, query: str, docs: Sequence[Document]) -> List[float]:
+        keys, scores = self._cached(query, docs)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            computed = await asyncio.gather(
+                *(self.batcher.submit((query, docs[i].page_content)) for i in missing)
+            )
+            for i, score in zip(missing, computed):
+                scores[i] = score
+                self.cache.put(keys[i], score)
+        return scores
+
+
+def _top_n(docs: Sequence[Document], scores: List[float], top_n: int) -> List[Document]:
+    ranked = sorted(zip(docs, scores), key=lambda x: x[1], reverse=True)[:top_n]
+    return [
+        Document(page_content=doc.page_content, metadata={**doc.metadata, "relevance_score": score})
+        for doc, score in ranked
+    ]
+
+
+class BatchedCrossEncoderReranker(BaseDocumentCompressor):
+    """RerankService로 점수를 계산하여 상위 top_n개 문서를 반환하는 Compressor (metadata에 relevance_score 기록)"""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    service: RerankService
+    top_n: int = 3
+
+    def compress_documents(self, documents: Sequence[Document], query: str,
+                           callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        if not documents:
+            return []
+        start = time.perf_counter()
+        scores = self.service.score(query, documents)
+        report_rerank(callbacks, time.perf_counter() - start, len(documents))
+        return _top_n(documents, scores, self.top_n)
+
+    async def acompress_documents(self, documents: Sequence[Document], query: str,
+                                  callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        if not documents:
+            return []
+        start = time.perf_counter()
+        scores = await self.service.ascore(query, documents)
+        # 재순위화 시간을 현재 노드의 span에 기록합니다.
+        await areport_rerank(callbacks, time.perf_counter() - start, len(documents))
+        return _top_n(documents, scores, self.top_n)
+
+
+# 모든 Retriever가 하나의 재순위화 서비스(모델 1개)를 공유합니다.
+@registry.resource("rerank_service")
+def _create_rerank_service():
+    from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+    return RerankService(HuggingFaceCrossEncoder(model_name=RERANK_MODEL_NAME))
+
+get_rerank_service = registry.getter("rerank_service")
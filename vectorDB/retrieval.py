@@ -1,47 +1,254 @@
 # vectorDB/retrieval.py
 
+import asyncio
+import os
+from typing import Dict, List, Optional
+
 from langchain_chroma import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables.config import run_in_executor
 from langchain.retrievers import ContextualCompressionRetriever
-from langchain.retrievers.document_compressors import CrossEncoderReranker
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 from langchain_community.retrievers import TavilySearchAPIRetriever
 
-def setup_retrievers():
+from vectorDB.article_store import ArticleStore, lookup_residual
+from vectorDB.embeddings import QueryEmbeddings, embedding_id, get_embedding_engine
+from vectorDB.law_loader import STATUTE_COLLECTION
+from vectorDB.law_router import LAW_CENTROIDS_PATH, LawRouter
+from vectorDB.rerank import BatchedCrossEncoderReranker, get_rerank_service
+from vectorDB.sparse_index import SparseIndex, extract_citations
+from util.registry import registry
+
+# --- 하이브리드 검색 설정 ---
+# 밀집(Chroma) 검색과 희소(BM25) 검색 결과를 Reciprocal Rank Fusion으로 결합합니다.
+DENSE_K = int(os.getenv("DENSE_K", "15"))
+SPARSE_K = int(os.getenv("SPARSE_K", "15"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = RRF_K) -> List[Document]:
+    """여러 검색 결과 순위를 RRF 점수로 결합합니다. 청크 ID(없으면 내용)로 같은 문서를 식별합니다."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc.metadata.get("chunk_id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+class HybridRetriever(BaseRetriever):
     """
-    법률 문서 및 웹 검색을 위한 Retriever들을 설정하고 반환합니다.
+    Chroma 밀집 검색과 한국어 BM25 희소 검색을 RRF로 결합하는 Retriever
+    법률을 지정한 검색에서 질문에 '제60조' 같은 조문 인용이 있으면 인용한 조문의 청크도 하나의 순위로 함께 결합하고,
+    질문이 조문 인용뿐이면('근로기준법 제60조 내용') 쿼리 임베딩 없이 인용한 조문만 바로 반환합니다.
     """
-    # 문서 임베딩 모델
-    embeddings_model = OllamaEmbeddings(model="bge-m3")
-
-    # Re-rank 모델
-    rerank_model = HuggingFaceCrossEncoder(model_name="BAAI/bge-reranker-v2-m3")
-    compressor = CrossEncoderReranker(model=rerank_model, top_n=2)
-
-    # 각 법률별 Chroma DB Retriever 설정
-    def create_db_retriever(collection_name):
-        db = Chroma(
-            embedding_function=embeddings_model,
-            collection_name=collection_name,
-            persist_directory="./chroma_db",
-        )
-        base_retriever = db.as_retriever(search_kwargs={"k": 5})
-        return ContextualCompressionRetriever(
-            base_compressor=compressor,
-            base_retriever=base_retriever,
+    vectorstore: Chroma
+    sparse_index: SparseIndex
+    dense_k: int = DENSE_K
+    sparse_k: int = SPARSE_K
+    where: Optional[dict] = None
+    # 검색 대상 법률 (where 필터와 같은 목록). 비어 있으면 전체 법률을 검색하며, 이때는 조문 인용을 찾지 않습니다.
+    laws: Optional[List[str]] = None
+
+    def _fetch(self, ids: List[str]) -> List[Document]:
+        """청크 ID 순서대로 Chroma에서 문서를 가져옵니다."""
+        if not ids:
+            return []
+        result = self.vectorstore.get(ids=ids, include=["documents", "metadatas"])
+        found = {
+            doc_id: Document(page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+        return [found[i] for i in ids if i in found]
+
+    def _lookup_citations(self, query: str) -> List[Document]:
+        # 법률을 지정하지 않으면 '제60조'가 모든 법률의 제60조를 가리키므로 찾지 않습니다.
+        citations = extract_citations(query) if self.laws else []
+        if not citations:
+            return []
+        return self._fetch(self.sparse_index.lookup_articles(citations, where=self.where))
+
+    def _citation_only(self, query: str) -> bool:
+        """법률 이름, 조문 번호, 조회 요청 표현을 빼면 남는 내용이 없는 질문인지 확인합니다."""
+        return not lookup_residual(query, self.laws or [])
+
+    def _sparse_search(self, query: str) -> List[Document]:
+        return self._fetch([doc_id for doc_id, _ in self.sparse_index.search(query, self.sparse_k, where=self.where)])
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        cited = self._lookup_citations(query)
+        if cited and self._citation_only(query):
+            return cited
+        dense = self.vectorstore.similarity_search(query, k=self.dense_k, filter=self.where)
+        return reciprocal_rank_fusion([dense, self._sparse_search(query), cited])
+
+    async def _adense_search(self, query: str) -> List[Document]:
+        # 질문 임베딩은 비동기로 계산하여 동시에 들어온 질문들이 한 배치로 묶이게 합니다.
+        embedding = await self.vectorstore.embeddings.aembed_query(query)
+        return await self.vectorstore.asimilarity_search_by_vector(embedding, k=self.dense_k, filter=self.where)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        cited = await run_in_executor(None, self._lookup_citations, query)
+        if cited and self._citation_only(query):
+            return cited
+        dense, sparse = await asyncio.gather(
+            self._adense_search(query),
+            run_in_executor(None, self._sparse_search, query),
         )
+        return reciprocal_rank_fusion([dense, sparse, cited])
+
+# --- 계층형 검색 설정 ---
+# 하이브리드 검색으로 찾은 항/호 청크를 재순위화한 뒤 상위 RERANK_TOP_N개만 부모 조문으로 확장합니다.
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))
+# 부모 조문이 이보다 길면 조문 전체 대신 일치한 청크와 앞뒤 NEIGHBOR_WINDOW개 청크만 사용합니다.
+PARENT_MAX_CHARS = int(os.getenv("PARENT_MAX_CHARS", "1500"))
+NEIGHBOR_WINDOW = int(os.getenv("NEIGHBOR_WINDOW", "1"))
+
+class ParentExpandingRetriever(BaseRetriever):
+    """
+    항/호 단위 청크로 검색·재순위화한 뒤, 최종 상위 결과만 부모 조문 또는 이웃 청크 창으로 확장하는 Retriever
+    추측 검색은 acandidates()로 재순위화 전 후보만 미리 가져오고, 선택된 법률의 후보만 afrom_candidates()로 마무리합니다.
+    """
+    child_retriever: ContextualCompressionRetriever
+    vectorstore: Chroma
+    article_store: ArticleStore
+    parent_max_chars: int = PARENT_MAX_CHARS
+    window: int = NEIGHBOR_WINDOW
+
+    def _expand_window(self, chunk: Document) -> Document:
+        index, count = chunk.metadata["chunk_index"], chunk.metadata["chunk_count"]
+        article_id = chunk.metadata["article_id"]
+        indices = range(max(0, index - self.window), min(count, index + self.window + 1))
+        result = self.vectorstore.get(ids=[f"{article_id}#{i}" for i in indices], include=["documents", "metadatas"])
+        neighbors = sorted(zip(result["metadatas"], result["documents"]), key=lambda x: x[0]["chunk_index"])
+        content = "\n".join(text for _, text in neighbors) or chunk.page_content
+        return Document(page_content=content, metadata={**chunk.metadata, "expanded": "window"})
+
+    def _expand(self, chunks: List[Document]) -> List[Document]:
+        """청크를 부모 조문 단위로 묶고, 짧은 조문은 전체로, 긴 조문은 이웃 청크 창으로 확장합니다."""
+        expanded = []
+        seen = set()
+        parents = {doc.metadata["article_id"]: doc for doc in self.article_store.get(
+            [c.metadata["article_id"] for c in chunks if "article_id" in c.metadata]
+        )}
+        for chunk in chunks:
+            article_id = chunk.metadata.get("article_id")
+            if article_id is None:
+                expanded.append(chunk)
+                continue
+            if article_id in seen:
+                continue
+            seen.add(article_id)
+            parent = parents.get(article_id)
+            if parent is not None and len(parent.page_content) <= self.parent_max_chars:
+                metadata = {**parent.metadata, "matched_chunk": chunk.metadata["chunk_id"], "expanded": "parent"}
+                # 재순위화 점수는 sub-agent의 조기 종료 판단에 사용하므로 부모 조문에도 남깁니다.
+                if "relevance_score" in chunk.metadata:
+                    metadata["relevance_score"] = chunk.metadata["relevance_score"]
+                expanded.append(Document(page_content=parent.page_content, metadata=metadata))
+            else:
+                expanded.append(self._expand_window(chunk))
+        return expanded
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        chunks = self.child_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self._expand(chunks)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        chunks = await self.child_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return await run_in_executor(None, self._expand, chunks)
+
+    async def acandidates(self, query: str) -> List[Document]:
+        """재순위화 전 하이브리드 검색 후보 청크만 가져옵니다."""
+        return await self.child_retriever.base_retriever.ainvoke(query)
+
+    async def afrom_candidates(self, query: str, candidates: List[Document]) -> List[Document]:
+        """미리 가져온 후보 청크(여러 법률의 후보를 합친 목록 가능)를 재순위화하고 부모 조문으로 확장합니다."""
+        chunks = await self.child_retriever.base_compressor.acompress_documents(candidates, query)
+        return await run_in_executor(None, self._expand, list(chunks))
+
+# --- 리소스 등록 ---
+# 모델과 클라이언트는 처음 사용할 때 생성하고 프로세스 안에서 공유합니다. (import 시에는 아무것도 로드하지 않음)
+@registry.resource("query_embeddings")
+def _create_query_embeddings():
+    # 질문 임베딩 (검색과 시맨틱 답변 캐시에서 함께 사용, 수집과 같은 임베딩 백엔드)
+    return QueryEmbeddings(get_embedding_engine())
+
+@registry.resource("article_store")
+def _create_article_store():
+    # 조문 원문 저장소 (부모 조문 확장 및 조문 직접 조회에 사용)
+    return ArticleStore()
+
+get_query_embeddings = registry.getter("query_embeddings")
+get_article_store = registry.getter("article_store")
+
+@registry.resource("statute_index")
+def _create_statute_index():
+    # 모든 법률이 저장된 단일 컬렉션과 희소 인덱스
+    db = Chroma(
+        embedding_function=get_query_embeddings(),
+        collection_name=STATUTE_COLLECTION,
+        persist_directory="./chroma_db",
+    )
+    return db, SparseIndex.load(SparseIndex.path_for(STATUTE_COLLECTION))
+
+@registry.resource("law_router")
+def _create_law_router():
+    # 수집 시 저장한 법률별 대표 벡터를 사용하고, 없으면 컬렉션의 청크 임베딩으로 한 번 계산해 저장합니다.
+    router = LawRouter.load(LAW_CENTROIDS_PATH)
+    if router is None:
+        db, _ = registry.get("statute_index")
+        data = db.get(include=["embeddings", "metadatas"])
+        router = LawRouter.from_embeddings(data["embeddings"], data["metadatas"], embedding_id())
+        router.save(LAW_CENTROIDS_PATH)
+    return router
+
+get_law_router = registry.getter("law_router")
+
+def law_filter(laws: Optional[List[str]]) -> Optional[dict]:
+    """법률 이름 목록을 Chroma/희소 인덱스 공통 메타데이터 필터로 변환합니다. (비어 있으면 전체 검색)"""
+    return {"law": {"$in": list(laws)}} if laws else None
+
+def build_law_retriever(laws: Optional[List[str]] = None) -> BaseRetriever:
+    """
+    주어진 법률들만 대상으로 하는 Retriever를 만듭니다. (하이브리드 청크 검색 → 재순위화 → 부모 조문 확장)
+    여러 법률을 지정해도 한 번의 ANN 검색과 한 번의 BM25 검색으로 처리합니다.
+    무거운 객체(컬렉션, 인덱스, 모델)는 모두 공유하므로 호출마다 만들어도 비용이 거의 없습니다.
+    """
+    db, sparse_index = registry.get("statute_index")
+    base_retriever = HybridRetriever(
+        vectorstore=db, sparse_index=sparse_index, where=law_filter(laws), laws=list(laws or []),
+    )
+    child_retriever = ContextualCompressionRetriever(
+        base_compressor=BatchedCrossEncoderReranker(service=get_rerank_service(), top_n=RERANK_TOP_N),
+        base_retriever=base_retriever,
+    )
+    return ParentExpandingRetriever(
+        child_retriever=child_retriever,
+        vectorstore=db,
+        article_store=get_article_store(),
+    )
+
+# 법률 Retriever 생성 함수. 벤치마크/테스트에서는 registry.override로 가짜 Retriever 생성 함수를 넣습니다.
+@registry.resource("law_retriever_factory")
+def _create_law_retriever_factory():
+    return build_law_retriever
+
+def get_law_retriever(laws: Optional[List[str]] = None) -> BaseRetriever:
+    return registry.get("law_retriever_factory")(laws)
 
-    personal_retriever = create_db_retriever("personal_law")
-    labor_retriever = create_db_retriever("labor_law")
-    housing_retriever = create_db_retriever("housing_law")
+def get_available_laws() -> List[str]:
+    """수집된 법률 이름 목록을 조문 저장소에서 가져옵니다."""
+    return sorted(get_article_store().laws())
 
+@registry.resource("retriever:web")
+def _create_web_retriever():
     # 웹 검색 Retriever
-    web_retriever = ContextualCompressionRetriever(
-        base_compressor=compressor,
+    return ContextualCompressionRetriever(
+        base_compressor=BatchedCrossEncoderReranker(service=get_rerank_service(), top_n=2),
         base_retriever=TavilySearchAPIRetriever(k=10),
     )
-    
-    return personal_retriever, labor_retriever, housing_retriever, web_retriever
 
-# Retriever 인스턴스 생성
-personal_db_retriever, labor_db_retriever, housing_db_retriever, web_retriever = setup_retrievers()
\ No newline at end of file
+def get_web_retriever() -> BaseRetriever:
+    return registry.get("retriever:web")
@@ -0,0 +1,160 @@
+# vectorDB/sparse_index.py
+
+import gzip
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 희소(BM25) 인덱스 저장 위치
+SPARSE_INDEX_DIR = os.getenv("SPARSE_INDEX_DIR", "./chroma_db/sparse")
+
+# 조문 인용 패턴 (예: 제60조, 제15조의2)
+CITATION_PATTERN = re.compile(r'제\s*(\d+)\s*조(?:\s*의\s*(\d+))?')
+_WORD_PATTERN = re.compile(r'[가-힣]+|[A-Za-z]+|\d+')
+_HANGUL_PATTERN = re.compile(r'[가-힣]+')
+
+
+def extract_citations(text: str) -> List[str]:
+    """텍스트에서 '제N조(의M)' 형식의 조문 번호를 정규화하여 추출합니다."""
+    return [f"제{no}조의{sub}" if sub else f"제{no}조" for no, sub in CITATION_PATTERN.findall(text)]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    한국어 법령 검색용 토크나이저입니다.
+    조문 인용(제60조)은 하나의 토큰으로 유지하고, 한글 어절은 글자 2-gram으로, 영문/숫자는 단어 단위로 나눕니다.
+    형태소 분석기 없이도 '계약갱신요구권'과 '계약 갱신 요구권'이 같은 토큰을 공유합니다.
+    """
+    tokens = extract_citations(text)
+    for word in _WORD_PATTERN.findall(CITATION_PATTERN.sub(" ", text)):
+        if _HANGUL_PATTERN.fullmatch(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+class SparseIndex:
+    """
+    컬렉션의 BM25 역색인입니다. 문서 ID별 토큰 빈도와 메타데이터만 디스크에 저장하고,
+    불러올 때 역색인(postings)을 다시 구성합니다.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_meta: Dict[str, dict] = {}
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.articles: Dict[str, set] = defaultdict(set)
+        self.doc_length: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def _index(self, doc_id: str):
+        terms = self.doc_terms[doc_id]
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+        self.doc_length[doc_id] = sum(terms.values())
+        self.total_length += self.doc_length[doc_id]
+        article = self.doc_meta[doc_id].get("article")
+        if article:
+            self.articles[article].add(doc_id)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[dict] = None):
+        """문서를 추가합니다. 같은 ID가 있으면 교체합니다."""
+        if doc_id in self.doc_terms:
+            self.remove([doc_id])
+        metadata = metadata or {}
+        self.doc_terms[doc_id] = dict(Counter(tokenize(text)))
+        self.doc_meta[doc_id] = {
+            key: metadata[key] for key in ("law", "article", "chunk_index") if key in metadata
+        }
+        self._index(doc_id)
+
+    def remove(self, doc_ids: Iterable[str]):
+        for doc_id in doc_ids:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                continue
+            for term in terms:
+                self.postings[term].pop(doc_id, None)
+                if not self.postings[term]:
+                    del self.postings[term]
+            self.total_length -= self.doc_length.pop(doc_id)
+            article = self.doc_meta.pop(doc_id).get("article")
+            if article:
+                self.articles[article].discard(doc_id)
+
+    def lookup_articles(self, citations: List[str], where: Optional[dict] = None) -> List[str]:
+        """조문 번호로 해당 조문의 청크 ID들을 조문·청크 순서대로 반환합니다."""
+        doc_ids = []
+        for article in dict.fromkeys(citations):
+            matched = [i for i in self.articles.get(article, ()) if self._matches(i, where)]
+            doc_ids.extend(sorted(matched, key=lambda i: self.doc_meta[i].get("chunk_index", 0)))
+        return doc_ids
+
+    def _matches(self, doc_id: str, where: Optional[dict]) -> bool:
+        if not where:
+            return True
+        meta = self.doc_meta[doc_id]
+        for key, condition in where.items():
+            if isinstance(condition, dict) and "$in" in condition:
+                if meta.get(key) not in condition["$in"]:
+                    return False
+            elif meta.get(key) != condition:
+                return False
+        return True
+
+    def search(self, query: str, k: int = 10, where: Optional[dict] = None) -> List[Tuple[str, float]]:
+        """BM25 점수 상위 k개의 (문서 ID, 점수)를 반환합니다."""
+        num_docs = len(self.doc_terms)
+        if not num_docs:
+            return []
+        avg_length = self.total_length / num_docs
+        scores = defaultdict(float)
+        for term, query_tf in Counter(tokenize(query)).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_length[doc_id] / avg_length)
+                scores[doc_id] += query_tf * idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        if where:
+            ranked = [(doc_id, score) for doc_id, score in ranked if self._matches(doc_id, where)]
+        return ranked[:k]
+
+    @staticmethod
+    def path_for(collection_name: str, directory: str = SPARSE_INDEX_DIR) -> str:
+        return os.path.join(directory, f"{collection_name}.json.gz")
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"doc_terms": self.doc_terms, "doc_meta": self.doc_meta}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SparseIndex":
+        """저장된 인덱스를 불러옵니다. 파일이 없으면 빈 인덱스를 반환합니다."""
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        index.doc_terms = data["doc_terms"]
+        index.doc_meta = data["doc_meta"]
+        for doc_id in index.doc_terms:
+            index._index(doc_id)
+        return index